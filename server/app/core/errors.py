@@ -23,7 +23,7 @@ def json_error(request: Request, status_code: int, code: str, message_key: str)
     payload = ErrorResponse(
         error=ErrorBody(
             code=code,  # type: ignore
-            message=msg(dialect, message_key),
+            message=msg(message_key, dialect),
             requestId=request_id,
         )
     )
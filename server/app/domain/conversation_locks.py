@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import asyncio
+import time
+import zlib
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from app.settings import settings
+
+
+class _Entry:
+    __slots__ = ("lock", "refs")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.refs = 0
+
+
+class ConversationLocks:
+    """
+    Async mutual exclusion per conversation key.
+    Turns of the same conversation run one at a time; different conversations
+    never wait on each other. Entries are refcounted and removed when the last
+    holder/waiter leaves, so the table only holds in-flight conversations. If it
+    reaches `max_entries`, new keys share one of `stripes` hashed locks instead
+    (still correct, just coarser). A key stays on its stripe while any holder or
+    waiter uses it, so a later turn cannot slip past it through a fresh entry.
+    """
+
+    def __init__(self, max_entries: int, stripes: int):
+        self.max_entries = max_entries
+        self._table: Dict[str, _Entry] = {}
+        self._stripes: List[Optional[asyncio.Lock]] = [None] * max(stripes, 1)
+        self._striped: Dict[str, int] = {}  # key -> holders/waiters routed to its stripe
+        self.acquired = 0
+        self.contended = 0
+        self.stripe_fallbacks = 0
+        self.peak_entries = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _stripe(self, key: str) -> asyncio.Lock:
+        i = zlib.crc32(key.encode("utf-8")) % len(self._stripes)
+        lock = self._stripes[i]
+        if lock is None:
+            lock = self._stripes[i] = asyncio.Lock()
+        return lock
+
+    @asynccontextmanager
+    async def hold(self, key: str) -> AsyncIterator[None]:
+        # all table bookkeeping happens between awaits, so the event loop serializes it
+        entry = None if key in self._striped else self._table.get(key)
+        if entry is None and key not in self._striped and len(self._table) < self.max_entries:
+            entry = self._table[key] = _Entry()
+            self.peak_entries = max(self.peak_entries, len(self._table))
+        if entry is not None:
+            entry.refs += 1
+            lock = entry.lock
+        else:
+            self.stripe_fallbacks += 1
+            self._striped[key] = self._striped.get(key, 0) + 1
+            lock = self._stripe(key)
+
+        try:
+            if lock.locked():
+                self.contended += 1
+                start = time.perf_counter()
+                await lock.acquire()
+                waited = time.perf_counter() - start
+                self.wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+            else:
+                await lock.acquire()
+            self.acquired += 1
+            try:
+                yield
+            finally:
+                lock.release()
+        finally:
+            if entry is not None:
+                entry.refs -= 1
+                if entry.refs == 0 and self._table.get(key) is entry:
+                    del self._table[key]
+            else:
+                self._striped[key] -= 1
+                if not self._striped[key]:
+                    del self._striped[key]
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "live": len(self._table),
+            "peak": self.peak_entries,
+            "max_entries": self.max_entries,
+            "stripes": len(self._stripes),
+            "acquired": self.acquired,
+            "contended": self.contended,
+            "contention_ratio": round(self.contended / self.acquired, 4) if self.acquired else 0.0,
+            "stripe_fallbacks": self.stripe_fallbacks,
+            "wait_seconds_total": round(self.wait_seconds, 6),
+            "wait_seconds_max": round(self.max_wait_seconds, 6),
+        }
+
+
+conversation_locks = ConversationLocks(
+    max_entries=settings.conversation_lock_max_entries,
+    stripes=settings.conversation_lock_stripes,
+)
@@ -1,73 +1,368 @@
 from __future__ import annotations
 
+import functools
+import json
+import sys
+import threading
 import time
-from dataclasses import dataclass, field
-from typing import Any, Dict, Optional, Literal, List
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from app.settings import settings
+
+# A delete-flow candidate: (task_id, title, score)
+DeleteCandidate = Tuple[str, str, float]
+
+
+def candidate_tuple(c: Union[DeleteCandidate, Dict[str, Any]]) -> DeleteCandidate:
+    if isinstance(c, tuple):
+        return c
+    return (c.get("taskId") or c.get("id"), c.get("title", ""), c.get("score"))
+
+
+def candidate_dict(c: DeleteCandidate) -> Dict[str, Any]:
+    return {"taskId": c[0], "title": c[1], "score": c[2]}
+
 
-@dataclass
 class ConversationState:
-    pending: bool = False
-    pending_intent: Optional[str] = None
-    expected_field: Optional[str] = None
-    entities: Dict[str, Any] = field(default_factory=dict)
-    created_at: float = field(default_factory=time.time)
-    pending_op: Dict[str, Any] = field(default_factory=dict)  # e.g., delete_task flow
-    # legacy delete fields (kept for backward compatibility)
-    mode: Optional[str] = None
-    step: Optional[str] = None
-    delete_query: Optional[str] = None
-    candidates: List[Dict[str, Any]] = field(default_factory=list)
-    selected_task_id: Optional[str] = None
-
-# In-memory store
-_store: Dict[str, ConversationState] = {}
+    """
+    Per-conversation state, slotted to keep 100k+ live conversations cheap.
+    The delete flow lives in one place: delete_stage (None when no flow is
+    active), delete_query, delete_candidates and selected_task_id.
+    """
+
+    __slots__ = (
+        "pending",
+        "pending_intent",
+        "expected_field",
+        "_entities",
+        "created_at",
+        "delete_stage",  # awaiting_query | awaiting_choice | awaiting_confirm
+        "delete_query",
+        "delete_candidates",
+        "selected_task_id",
+        "version",  # backend record version (0 = never saved)
+    )
+
+    def __init__(
+        self,
+        pending: bool = False,
+        pending_intent: Optional[str] = None,
+        expected_field: Optional[str] = None,
+        entities: Optional[Dict[str, Any]] = None,
+        created_at: Optional[float] = None,
+    ):
+        self.pending = pending
+        self.pending_intent = pending_intent
+        self.expected_field = expected_field
+        self._entities = entities  # allocated on first use
+        self.created_at = time.time() if created_at is None else created_at
+        self.delete_stage: Optional[str] = None
+        self.delete_query: Optional[str] = None
+        self.delete_candidates: Tuple[DeleteCandidate, ...] = ()
+        self.selected_task_id: Optional[str] = None
+        self.version = 0
+
+    @property
+    def entities(self) -> Dict[str, Any]:
+        if self._entities is None:
+            self._entities = {}
+        return self._entities
+
+    @entities.setter
+    def entities(self, value: Optional[Dict[str, Any]]) -> None:
+        self._entities = value
+
+    def candidate_dicts(self) -> List[Dict[str, Any]]:
+        return [candidate_dict(c) for c in self.delete_candidates]
+
+    def to_record(self) -> bytes:
+        """Compact JSON for shared state backends (version is kept by the backend)."""
+        return json.dumps(
+            [
+                self.pending,
+                self.pending_intent,
+                self.expected_field,
+                self._entities,
+                self.created_at,
+                self.delete_stage,
+                self.delete_query,
+                self.delete_candidates,
+                self.selected_task_id,
+            ],
+            ensure_ascii=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+
+    @classmethod
+    def from_record(cls, data: bytes, version: int) -> "ConversationState":
+        fields = json.loads(data)
+        state = cls(
+            pending=fields[0],
+            pending_intent=fields[1],
+            expected_field=fields[2],
+            entities=fields[3],
+            created_at=fields[4],
+        )
+        state.delete_stage = fields[5]
+        state.delete_query = fields[6]
+        state.delete_candidates = tuple(tuple(c) for c in fields[7])
+        state.selected_task_id = fields[8]
+        state.version = version
+        return state
+
+
+def _approx_size(obj: Any, _depth: int = 0) -> int:
+    """Rough recursive sys.getsizeof for the plain containers we keep in state."""
+    size = sys.getsizeof(obj)
+    if _depth > 4:
+        return size
+    if isinstance(obj, dict):
+        size += sum(_approx_size(k, _depth + 1) + _approx_size(v, _depth + 1) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(_approx_size(v, _depth + 1) for v in obj)
+    elif hasattr(obj, "__slots__"):
+        size += sum(_approx_size(getattr(obj, a, None), _depth + 1) for a in obj.__slots__)
+    elif hasattr(obj, "__dict__"):
+        size += _approx_size(vars(obj), _depth + 1)
+    return size
+
+
+class ConversationStore:
+    """
+    Bounded in-process store of ConversationState by conversation key.
+    LRU-ordered and capped at `max_states`; states idle (not updated) for
+    `ttl_seconds` are dropped on read and by a background sweeper thread,
+    so one-shot keys (e.g. requestId fallbacks) don't accumulate.
+    States are live objects: get() hands out the stored instance.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_states: int, ttl_seconds: float, sweep_interval: float):
+        self.max_states = max_states
+        self.ttl_seconds = ttl_seconds
+        self.sweep_interval = sweep_interval
+        self._states: "OrderedDict[str, ConversationState]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+        self.cleared = 0
+        self.sweeps = 0
+
+    def _expired(self, state: ConversationState, now: float) -> bool:
+        return now - state.created_at > self.ttl_seconds
+
+    def get(self, key: str) -> ConversationState:
+        self._ensure_sweeper()
+        with self._lock:
+            state = self._states.get(key)
+            if state is not None and self._expired(state, time.time()):
+                self._drop(key)
+                self.expired += 1
+                state = None
+            if state is None:
+                state = ConversationState(created_at=time.time())
+                self._states[key] = state
+                self.created += 1
+                self._account(key, state)
+                self._evict()
+            else:
+                self._states.move_to_end(key)
+            return state
+
+    def mutate(
+        self, key: str, fn: Callable[[ConversationState], None], expected_version: Optional[int] = None
+    ) -> ConversationState:
+        # expected_version is for shared backends: here get() hands out the live
+        # object and turns of one conversation are serialized by conversation_locks
+        with self._lock:
+            state = self.get(key)
+            fn(state)
+            self.touch(key)
+            return state
+
+    def touch(self, key: str) -> None:
+        """Refresh the TTL and size accounting after `key`'s state was modified."""
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                return
+            state.created_at = time.time()
+            self._states.move_to_end(key)
+            self._account(key, state)
+
+    def clear(self, key: str, expected_version: Optional[int] = None) -> int:
+        with self._lock:
+            if key in self._states:
+                self._drop(key)
+                self.cleared += 1
+        return 0
+
+    def sweep(self) -> int:
+        """Drop every expired state; returns how many were removed."""
+        now = time.time()
+        with self._lock:
+            dead = [k for k, st in self._states.items() if self._expired(st, now)]
+            for k in dead:
+                self._drop(k)
+            self.expired += len(dead)
+            self.sweeps += 1
+        return len(dead)
+
+    def _account(self, key: str, state: ConversationState) -> None:
+        size = _approx_size(state)
+        self._bytes += size - self._sizes.get(key, 0)
+        self._sizes[key] = size
+
+    def _drop(self, key: str) -> None:
+        self._states.pop(key, None)
+        self._bytes -= self._sizes.pop(key, 0)
+
+    def _evict(self) -> None:
+        while len(self._states) > self.max_states:
+            key = next(iter(self._states))
+            self._drop(key)
+            self.evicted += 1
+
+    def _ensure_sweeper(self) -> None:
+        if self._sweeper is not None or self.sweep_interval <= 0:
+            return
+        with self._lock:
+            if self._sweeper is None:
+                self._sweeper = threading.Thread(
+                    target=self._sweep_loop, name="conversation-sweeper", daemon=True
+                )
+                self._sweeper.start()
+
+    def _sweep_loop(self) -> None:
+        while not self._stop.wait(self.sweep_interval):
+            self.sweep()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": self.name,
+                "live": len(self._states),
+                "max_states": self.max_states,
+                "ttl_seconds": self.ttl_seconds,
+                "approx_bytes": self._bytes,
+                "created": self.created,
+                "expired": self.expired,
+                "evicted": self.evicted,
+                "cleared": self.cleared,
+                "sweeps": self.sweeps,
+            }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def _backend():
+    """The process-wide state backend chosen by CONVERSATION_STATE_BACKEND (built on first use)."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                from app.domain.state_backends import state_backend_from_env
+
+                _store = state_backend_from_env()
+    return _store
+
 
 def get_state(key: str) -> ConversationState:
-    # Cleanup old states (> 30 mins)
-    now = time.time()
-    if key in _store:
-        if now - _store[key].created_at > 1800:
-            del _store[key]
-    
-    if key not in _store:
-        _store[key] = ConversationState()
-    return _store[key]
-
-def clear_state(key: str):
-    if key in _store:
-        del _store[key]
+    return _backend().get(key)
+
+def clear_state(key: str, base: Optional[ConversationState] = None):
+    version = _backend().clear(key, None if base is None else base.version)
+    if base is not None:
+        base.version = version
 
 def update_state(key: str, **kwargs):
-    state = get_state(key)
-    for k, v in kwargs.items():
-        if hasattr(state, k):
-            setattr(state, k, v)
-    state.created_at = time.time() # Refresh TTL
-
-
-def clear_delete_state(key: str):
-    state = get_state(key)
-    state.pending_op = {}
-    state.mode = None
-    state.step = None
-    state.delete_query = None
-    state.candidates = []
-    state.selected_task_id = None
-    state.created_at = time.time()
-
-
-def set_delete_pending(key: str, *, candidates=None, stage="awaiting_query", selected=None, query=None):
-    state = get_state(key)
-    state.pending_op = {
-        "type": "delete_task",
-        "candidates": candidates or [],
-        "stage": stage,
-        "selected_task_id": selected,
-        "query": query,
-    }
-    state.mode = "delete"
-    state.step = stage
-    state.candidates = candidates or []
-    state.selected_task_id = selected
-    state.delete_query = query
-    state.created_at = time.time()
+    def apply(state: ConversationState) -> None:
+        for k, v in kwargs.items():
+            if hasattr(state, k):
+                setattr(state, k, v)
+
+    _backend().mutate(key, apply)  # also refreshes the TTL
+
+
+def stats() -> Dict[str, Any]:
+    return _backend().stats()
+
+
+def _mutate(key: str, apply: Callable[[ConversationState], None], base: Optional[ConversationState]) -> None:
+    """
+    With `base` (the state a chat turn read at its start) the write is refused if
+    the conversation was saved since, and `base.version` follows the write so the
+    turn's next write is checked against it too.
+    """
+    saved = _backend().mutate(key, apply, None if base is None else base.version)
+    if base is not None:
+        base.version = saved.version
+
+
+def clear_delete_state(key: str, base: Optional[ConversationState] = None):
+    def apply(state: ConversationState) -> None:
+        state.delete_stage = None
+        state.delete_query = None
+        state.delete_candidates = ()
+        state.selected_task_id = None
+
+    _mutate(key, apply, base)
+
+
+def set_delete_pending(
+    key: str, *, candidates=None, stage="awaiting_query", selected=None, query=None,
+    base: Optional[ConversationState] = None,
+):
+    """Enter/advance the delete flow; candidates may be (id, title, score) tuples or API dicts."""
+    cands = tuple(candidate_tuple(c) for c in candidates or ())
+
+    def apply(state: ConversationState) -> None:
+        state.delete_stage = stage
+        state.delete_candidates = cands
+        state.selected_task_id = selected
+        state.delete_query = query
+
+    _mutate(key, apply, base)
+
+
+# -- async API for the chat route ---------------------------------------------
+
+async def _run(fn: Callable, *args, **kwargs):
+    # the in-memory store is a dict behind a lock; shared backends do file or
+    # socket I/O, which runs on the task-store thread pool, off the event loop
+    if isinstance(_backend(), ConversationStore):
+        return fn(*args, **kwargs)
+    from app.domain.tasks import default_store_pool
+
+    return await default_store_pool().run(fn, *args, **kwargs)
+
+
+async def get_state_async(key: str) -> ConversationState:
+    return await _run(get_state, key)
+
+
+async def clear_state_async(key: str, base: Optional[ConversationState] = None) -> None:
+    await _run(clear_state, key, base)
+
+
+async def clear_delete_state_async(key: str, base: Optional[ConversationState] = None) -> None:
+    await _run(clear_delete_state, key, base)
+
+
+async def set_delete_pending_async(key: str, **kwargs) -> None:
+    await _run(functools.partial(set_delete_pending, key, **kwargs))
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from app.domain.tasks import TaskStore
+from app.domain.tasks import AsyncTaskStore
 
 
 
@@ -16,7 +16,7 @@ def _title_query_from_entities(entities: dict) -> str:
 
 
 
-def execute_intent(*, store: TaskStore, user_id: str, intent: str, entities: dict, clarification: str | None = None) -> dict:
+async def execute_intent(*, store: AsyncTaskStore, user_id: str, intent: str, entities: dict, clarification: str | None = None) -> dict:
     # ---- CLARIFY ----
     if intent == "clarify":
         return {
@@ -36,7 +36,7 @@ def execute_intent(*, store: TaskStore, user_id: str, intent: str, entities: dic
             return {"type": "clarify", "payload": {"key": "clarify_missing_title"}}
 
         try:
-            task = store.create_task(
+            task = await store.create_task(
                 user_id, 
                 title=title, 
                 description=description, 
@@ -55,7 +55,12 @@ def execute_intent(*, store: TaskStore, user_id: str, intent: str, entities: dic
         scope = entities.get("scope", "all")
         timezone = entities.get("timezone", "UTC")
         try:
-            tasks = [t.__dict__ for t in store.list_tasks(user_id, status=status, scope=scope, timezone=timezone)]
+            tasks = [
+                t.__dict__
+                for t in await store.list_tasks(
+                    user_id, status=status, scope=scope, timezone=timezone, now=entities.get("now")
+                )
+            ]
             return {"type": "list_tasks", "payload": {"tasks": tasks}}
         except Exception:
             return {"type": "message", "payload": {"message": "تعذر قراءة المهام حالياً."}}
@@ -80,7 +85,7 @@ def execute_intent(*, store: TaskStore, user_id: str, intent: str, entities: dic
                     "payload": {"key": "clarify_update_which_task"},
                 }
 
-            matches = store.search_tasks(user_id, q, limit=5)
+            matches = await store.search_tasks(user_id, q, limit=5)
 
             if len(matches) == 0:
                 return {
@@ -101,7 +106,7 @@ def execute_intent(*, store: TaskStore, user_id: str, intent: str, entities: dic
             task_id = matches[0].id
 
         try:
-            task = store.update_task(
+            task = await store.update_task(
                 user_id,
                 task_id,
                 title=title_patch,
@@ -134,7 +139,7 @@ def execute_intent(*, store: TaskStore, user_id: str, intent: str, entities: dic
                     "payload": {"key": "clarify_complete_which_task"},
                 }
 
-            matches = store.search_tasks(user_id, q, limit=5)
+            matches = await store.search_tasks(user_id, q, limit=5)
 
             if len(matches) == 0:
                 return {
@@ -154,7 +159,7 @@ def execute_intent(*, store: TaskStore, user_id: str, intent: str, entities: dic
             task_id = matches[0].id
 
         try:
-            task = store.update_task(user_id, task_id, status="done")
+            task = await store.update_task(user_id, task_id, status="done")
         except Exception:
             task = None
 
@@ -192,7 +197,7 @@ def execute_intent(*, store: TaskStore, user_id: str, intent: str, entities: dic
             }
 
         try:
-            ok = store.delete_task(user_id, task_id)
+            ok = await store.delete_task(user_id, task_id)
         except Exception:
             ok = False
         return {"type": "delete_task", "payload": {"ok": ok, "task_id": task_id}}
@@ -0,0 +1,391 @@
+from __future__ import annotations
+
+import abc
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from app.domain.conversation_state import ConversationState, ConversationStore
+from app.settings import settings
+
+# A stored state record: (version, payload)
+StateRecord = Tuple[int, bytes]
+
+
+class StateConflictError(RuntimeError):
+    """A conversation kept changing under us, or changed since the turn read it."""
+
+
+class SharedStateBackend(abc.ABC):
+    """
+    Conversation state kept outside the process, so turns of one conversation
+    can land on any worker. Every record carries a version; mutate() is an
+    optimistic read-modify-write that retries when another worker won the race.
+    Unlike the in-memory store, get() returns a detached copy and nothing is
+    written until the first mutate().
+    """
+
+    name = "shared"
+    MAX_CAS_RETRIES = 5
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._stats_lock = threading.Lock()
+        self.loads = 0
+        self.saves = 0
+        self.conflicts = 0
+        self.cleared = 0
+
+    # -- storage hooks ----------------------------------------------------
+
+    @contextmanager
+    def _session(self) -> Iterator[Any]:
+        """Per-mutation context (e.g. a dedicated connection)."""
+        yield None
+
+    @abc.abstractmethod
+    def _load(self, session: Any, key: str) -> Optional[StateRecord]:
+        ...
+
+    @abc.abstractmethod
+    def _store(self, session: Any, key: str, expected_version: int, data: bytes) -> bool:
+        """Write `data` as version expected_version + 1 iff the stored version is still expected_version."""
+
+    @abc.abstractmethod
+    def _delete(self, key: str) -> None:
+        ...
+
+    # -- state API --------------------------------------------------------
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _decode(self, record: Optional[StateRecord]) -> ConversationState:
+        self._count("loads")
+        if record is None:
+            return ConversationState()
+        return ConversationState.from_record(record[1], record[0])
+
+    def get(self, key: str) -> ConversationState:
+        with self._session() as session:
+            return self._decode(self._load(session, key))
+
+    def mutate(
+        self, key: str, fn: Callable[[ConversationState], None], expected_version: Optional[int] = None
+    ) -> ConversationState:
+        """
+        Apply `fn` and save. With `expected_version` (the version a chat turn read
+        at its start) the write only lands if nobody saved since; otherwise it
+        raises StateConflictError at once, since `fn` was decided on stale state.
+        Without it, a lost race is retried up to MAX_CAS_RETRIES times.
+        """
+        attempts = self.MAX_CAS_RETRIES if expected_version is None else 1
+        for _ in range(attempts):
+            with self._session() as session:
+                state = self._decode(self._load(session, key))
+                if expected_version is not None and state.version != expected_version:
+                    self._count("conflicts")
+                    raise StateConflictError(
+                        f"conversation {key!r} is at version {state.version}, turn read {expected_version}"
+                    )
+                fn(state)
+                state.created_at = time.time()
+                if self._store(session, key, state.version, state.to_record()):
+                    state.version += 1
+                    self._count("saves")
+                    return state
+            self._count("conflicts")
+        raise StateConflictError(f"conversation {key!r} changed {attempts} times during update")
+
+    def clear(self, key: str, expected_version: Optional[int] = None) -> int:
+        """Forget the conversation; returns the version a fresh read now sees."""
+        version = 0
+        if expected_version is None:
+            self._delete(key)
+        else:
+            # a versioned reset, so a clear decided on stale state is refused like any write
+            version = self.mutate(key, _reset, expected_version).version
+        self._count("cleared")
+        return version
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "backend": self.name,
+                "ttl_seconds": self.ttl_seconds,
+                "loads": self.loads,
+                "saves": self.saves,
+                "conflicts": self.conflicts,
+                "cleared": self.cleared,
+            }
+
+
+def _reset(state: ConversationState) -> None:
+    blank = ConversationState()
+    for name in ConversationState.__slots__:
+        if name not in ("version", "created_at"):
+            setattr(state, name, getattr(blank, name))
+
+
+# ---------------------------------------------------------
+# SQLite (WAL) — shared by workers on one host
+# ---------------------------------------------------------
+
+class SQLiteStateBackend(SharedStateBackend):
+    """
+    One row per conversation in a local SQLite file in WAL mode, so readers
+    never block the writer. Connections are per thread; expired rows are
+    ignored on read and purged every PURGE_EVERY writes.
+    """
+
+    name = "sqlite"
+    PURGE_EVERY = 500
+
+    def __init__(self, path: str, ttl_seconds: float):
+        super().__init__(ttl_seconds)
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        with self._conn() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS conversation_state ("
+                " key TEXT PRIMARY KEY, version INTEGER NOT NULL,"
+                " expires_at REAL NOT NULL, data BLOB NOT NULL)"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _load(self, session, key: str) -> Optional[StateRecord]:
+        row = self._conn().execute(
+            "SELECT version, data FROM conversation_state WHERE key = ? AND expires_at > ?",
+            (key, time.time()),
+        ).fetchone()
+        return (row[0], bytes(row[1])) if row else None
+
+    def _store(self, session, key: str, expected_version: int, data: bytes) -> bool:
+        conn = self._conn()
+        expires_at = time.time() + self.ttl_seconds
+        if expected_version == 0:
+            # new (or expired) conversation: insert, or take over an expired row
+            cur = conn.execute(
+                "INSERT INTO conversation_state (key, version, expires_at, data) VALUES (?, 1, ?, ?)"
+                " ON CONFLICT(key) DO UPDATE SET version = version + 1, expires_at = excluded.expires_at,"
+                " data = excluded.data WHERE conversation_state.expires_at <= ?",
+                (key, expires_at, data, time.time()),
+            )
+        else:
+            cur = conn.execute(
+                "UPDATE conversation_state SET version = version + 1, expires_at = ?, data = ?"
+                " WHERE key = ? AND version = ?",
+                (expires_at, data, key, expected_version),
+            )
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            conn.execute("DELETE FROM conversation_state WHERE expires_at <= ?", (time.time(),))
+        return cur.rowcount == 1
+
+    def _delete(self, key: str) -> None:
+        self._conn().execute("DELETE FROM conversation_state WHERE key = ?", (key,))
+
+
+# ---------------------------------------------------------
+# Redis protocol (RESP2)
+# ---------------------------------------------------------
+
+class RespError(RuntimeError):
+    pass
+
+
+class RespConnection:
+    """One blocking RESP2 connection; send() pipelines several commands in one write."""
+
+    def __init__(self, host: str, port: int, timeout: float):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._file = self.sock.makefile("rb")
+
+    @staticmethod
+    def _encode(args: Tuple[Any, ...]) -> bytes:
+        out = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode("utf-8")
+            out.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        return b"".join(out)
+
+    def _read(self) -> Any:
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("RESP server closed the connection")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            return RespError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            n = int(rest)
+            if n < 0:
+                return None
+            data = self._file.read(n + 2)
+            return data[:-2]
+        if kind == b"*":
+            n = int(rest)
+            return None if n < 0 else [self._read() for _ in range(n)]
+        raise RespError(f"bad RESP reply: {line!r}")
+
+    def pipeline(self, *commands: Tuple[Any, ...]) -> List[Any]:
+        self.sock.sendall(b"".join(self._encode(c) for c in commands))
+        return [self._read() for _ in commands]
+
+    def call(self, *args: Any) -> Any:
+        reply = self.pipeline(args)[0]
+        if isinstance(reply, RespError):
+            raise reply
+        return reply
+
+    def close(self) -> None:
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class RespStateBackend(SharedStateBackend):
+    """
+    Conversation state in Redis (or anything speaking RESP2).
+    Record value is b"<version>:<payload>" with a PX expiry. A mutation is two
+    pipelined round trips on a pooled connection: WATCH+GET, then
+    MULTI/SET/EXEC; EXEC returns nil if another worker wrote the key first.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, ttl_seconds: float, *, prefix: str = "conv:", timeout: float = 2.0, max_idle: int = 16):
+        super().__init__(ttl_seconds)
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int((parsed.path or "/0").lstrip("/") or 0)
+        self.prefix = prefix
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._idle: List[RespConnection] = []
+        self._pool_lock = threading.Lock()
+        self.round_trips = 0
+
+    def _connect(self) -> RespConnection:
+        conn = RespConnection(self.host, self.port, self.timeout)
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        if setup:
+            for reply in conn.pipeline(*setup):
+                if isinstance(reply, RespError):
+                    conn.close()
+                    raise reply
+        return conn
+
+    @contextmanager
+    def _session(self) -> Iterator[RespConnection]:
+        with self._pool_lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._connect()
+        try:
+            yield conn
+        except BaseException:
+            conn.close()
+            raise
+        with self._pool_lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def _pipeline(self, conn: RespConnection, *commands) -> List[Any]:
+        with self._stats_lock:
+            self.round_trips += 1
+        replies = conn.pipeline(*commands)
+        for reply in replies:
+            if isinstance(reply, RespError):
+                raise reply
+        return replies
+
+    def _load(self, conn: RespConnection, key: str) -> Optional[StateRecord]:
+        # WATCH first so the following MULTI/EXEC only applies if nobody wrote in between
+        _, raw = self._pipeline(conn, ("WATCH", self.prefix + key), ("GET", self.prefix + key))
+        if raw is None:
+            return None
+        version, _, data = raw.partition(b":")
+        return int(version), data
+
+    def get(self, key: str) -> ConversationState:
+        with self._session() as conn:
+            raw = self._pipeline(conn, ("GET", self.prefix + key))[0]
+        if raw is None:
+            return self._decode(None)
+        version, _, data = raw.partition(b":")
+        return self._decode((int(version), data))
+
+    def _store(self, conn: RespConnection, key: str, expected_version: int, data: bytes) -> bool:
+        value = b"%d:%s" % (expected_version + 1, data)
+        ttl_ms = int(self.ttl_seconds * 1000)
+        replies = self._pipeline(
+            conn, ("MULTI",), ("SET", self.prefix + key, value, "PX", ttl_ms), ("EXEC",)
+        )
+        return replies[-1] is not None
+
+    def _delete(self, key: str) -> None:
+        with self._session() as conn:
+            self._pipeline(conn, ("DEL", self.prefix + key))
+
+    def close(self) -> None:
+        with self._pool_lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        out = super().stats()
+        with self._pool_lock:
+            out["idle_connections"] = len(self._idle)
+        out["round_trips"] = self.round_trips
+        return out
+
+
+def state_backend_from_env():
+    """
+    Build the conversation-state backend selected by CONVERSATION_STATE_BACKEND:
+    memory (per process, default) | sqlite (CONVERSATION_STATE_SQLITE_PATH) |
+    redis (CONVERSATION_STATE_REDIS_URL).
+    """
+    name = settings.conversation_state_backend
+    ttl = settings.conversation_state_ttl_seconds
+    if name == "memory":
+        return ConversationStore(
+            max_states=settings.conversation_state_max,
+            ttl_seconds=ttl,
+            sweep_interval=settings.conversation_state_sweep_seconds,
+        )
+    if name == "sqlite":
+        return SQLiteStateBackend(settings.conversation_state_sqlite_path, ttl)
+    if name == "redis":
+        return RespStateBackend(settings.conversation_state_redis_url, ttl)
+    raise ValueError(f"Unknown CONVERSATION_STATE_BACKEND: {name!r}")
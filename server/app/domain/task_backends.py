@@ -0,0 +1,361 @@
+from __future__ import annotations
+
+import abc
+import bisect
+import logging
+import math
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# A stored task document: (task_id, fields) — fields use the Firestore names
+# (title, status, dueAt, createdAt, ...).
+TaskDoc = Tuple[str, Dict[str, Any]]
+
+
+class TaskBackend(abc.ABC):
+    """
+    Storage interface used by TaskStore.
+    Documents are scoped per user; backends own id generation and timestamps.
+    """
+
+    name = "base"
+
+    @abc.abstractmethod
+    def create(self, user_id: str, data: Dict[str, Any]) -> str:
+        ...
+
+    @abc.abstractmethod
+    def get(self, user_id: str, task_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abc.abstractmethod
+    def list(self, user_id: str, status: str = "all") -> List[TaskDoc]:
+        ...
+
+    def list_due_range(self, user_id: str, status: str, start: float, end: float) -> List[TaskDoc]:
+        """Tasks with start <= dueAt < end; backends with a dueAt index override this."""
+        return [
+            (tid, data)
+            for tid, data in self.list(user_id, status)
+            if _due_value(data) is not None and start <= _due_value(data) < end
+        ]
+
+    @abc.abstractmethod
+    def update(self, user_id: str, task_id: str, patch: Dict[str, Any]) -> Optional[int]:
+        """
+        Apply `patch` in one write; raises KeyError if the task does not exist.
+        Returns the new updatedAt (epoch seconds) when the backend knows it.
+        """
+
+    @abc.abstractmethod
+    def delete(self, user_id: str, task_id: str) -> bool:
+        """Delete in one write; False if the task did not exist."""
+
+
+def _due_value(data: Dict[str, Any]) -> Optional[float]:
+    due = data.get("dueAt")
+    if hasattr(due, "timestamp"):
+        return due.timestamp()
+    return due
+
+
+# ---------------------------------------------------------
+# Firestore
+# ---------------------------------------------------------
+
+class FirestoreTaskBackend(TaskBackend):
+    """
+    users/{userId}/tasks/{taskId} in Firestore.
+
+    list_due_range filters on status and dueAt in one query, which needs a
+    composite index on the `tasks` collection group (status ASC, dueAt ASC):
+
+        gcloud firestore indexes composite create --collection-group=tasks \
+            --field-config=field-path=status,order=ascending \
+            --field-config=field-path=dueAt,order=ascending
+
+    Until it exists Firestore answers FailedPrecondition; we then fall back to
+    streaming the status query and filtering dueAt in Python.
+    """
+
+    name = "firestore"
+
+    def _collection(self, user_id: str):
+        from app.services.firestore_client import get_db
+
+        db = get_db()
+        return db.collection("users").document(user_id).collection("tasks")
+
+    @staticmethod
+    def _server_timestamp():
+        from firebase_admin import firestore as fb_fs
+
+        return fb_fs.SERVER_TIMESTAMP
+
+    @staticmethod
+    def _must_exist():
+        from app.services.firestore_client import get_db
+
+        return get_db().write_option(exists=True)
+
+    def create(self, user_id: str, data: Dict[str, Any]) -> str:
+        doc_ref = self._collection(user_id).document()
+        ts = self._server_timestamp()
+        doc_ref.set({**data, "createdAt": ts, "updatedAt": ts})
+        return doc_ref.id
+
+    def get(self, user_id: str, task_id: str) -> Optional[Dict[str, Any]]:
+        doc = self._collection(user_id).document(task_id).get()
+        if not doc.exists:
+            return None
+        return doc.to_dict()
+
+    def list(self, user_id: str, status: str = "all") -> List[TaskDoc]:
+        query = self._collection(user_id)
+        if status != "all":
+            query = query.where("status", "==", status)
+        return [(doc.id, doc.to_dict()) for doc in query.stream()]
+
+    def list_due_range(self, user_id: str, status: str, start: float, end: float) -> List[TaskDoc]:
+        query = self._collection(user_id)
+        if status != "all":
+            query = query.where("status", "==", status)
+        if not math.isinf(start):
+            query = query.where("dueAt", ">=", start)
+        query = query.where("dueAt", "<", end).order_by("dueAt")
+        try:
+            return [(doc.id, doc.to_dict()) for doc in query.stream()]
+        except Exception as exc:
+            if exc.__class__.__name__ != "FailedPrecondition":
+                raise
+            logger.warning("tasks (status, dueAt) index missing; filtering dueAt in memory: %s", exc)
+            return super().list_due_range(user_id, status, start, end)
+
+    def update(self, user_id: str, task_id: str, patch: Dict[str, Any]) -> Optional[int]:
+        try:
+            result = self._collection(user_id).document(task_id).update(
+                {**patch, "updatedAt": self._server_timestamp()}
+            )
+        except Exception as exc:
+            if exc.__class__.__name__ == "NotFound":
+                raise KeyError(task_id) from exc
+            raise
+        # the server timestamp is resolved to the commit time
+        update_time = getattr(result, "update_time", None)
+        return int(update_time.timestamp()) if hasattr(update_time, "timestamp") else None
+
+    def delete(self, user_id: str, task_id: str) -> bool:
+        # exists=True precondition: a missing doc fails the write instead of needing a read first
+        try:
+            self._collection(user_id).document(task_id).delete(option=self._must_exist())
+        except Exception as exc:
+            if exc.__class__.__name__ == "NotFound":
+                return False
+            raise
+        return True
+
+
+# ---------------------------------------------------------
+# In-memory
+# ---------------------------------------------------------
+
+@dataclass
+class _UserTasks:
+    docs: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    by_status: Dict[str, Set[str]] = field(default_factory=dict)
+    by_due: List[Tuple[float, str]] = field(default_factory=list)  # sorted (dueAt, id)
+
+    def index(self, task_id: str, data: Dict[str, Any]) -> None:
+        self.by_status.setdefault(data.get("status", "todo"), set()).add(task_id)
+        due = _due_value(data)
+        if due is not None:
+            bisect.insort(self.by_due, (due, task_id))
+
+    def unindex(self, task_id: str, data: Dict[str, Any]) -> None:
+        ids = self.by_status.get(data.get("status", "todo"))
+        if ids is not None:
+            ids.discard(task_id)
+        due = _due_value(data)
+        if due is not None:
+            i = bisect.bisect_left(self.by_due, (due, task_id))
+            if i < len(self.by_due) and self.by_due[i] == (due, task_id):
+                del self.by_due[i]
+
+
+class InMemoryTaskBackend(TaskBackend):
+    """
+    Process-local backend for tests and offline load runs.
+    Per-user dicts with secondary indexes on status and dueAt.
+    """
+
+    name = "memory"
+
+    def __init__(self):
+        self._users: Dict[str, _UserTasks] = {}
+        self._lock = threading.RLock()
+
+    def _user(self, user_id: str) -> _UserTasks:
+        user = self._users.get(user_id)
+        if user is None:
+            user = self._users[user_id] = _UserTasks()
+        return user
+
+    def create(self, user_id: str, data: Dict[str, Any]) -> str:
+        task_id = uuid.uuid4().hex[:20]
+        now = int(time.time())
+        doc = {**data, "createdAt": now, "updatedAt": now}
+        with self._lock:
+            user = self._user(user_id)
+            user.docs[task_id] = doc
+            user.index(task_id, doc)
+        return task_id
+
+    def get(self, user_id: str, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            doc = self._user(user_id).docs.get(task_id)
+            return dict(doc) if doc is not None else None
+
+    def list(self, user_id: str, status: str = "all") -> List[TaskDoc]:
+        with self._lock:
+            user = self._user(user_id)
+            if status == "all":
+                return [(tid, dict(doc)) for tid, doc in user.docs.items()]
+            ids = user.by_status.get(status, set())
+            return [(tid, dict(user.docs[tid])) for tid in ids]
+
+    def list_due_range(self, user_id: str, status: str, start: float, end: float) -> List[TaskDoc]:
+        with self._lock:
+            user = self._user(user_id)
+            lo = bisect.bisect_left(user.by_due, (start, ""))
+            hi = bisect.bisect_left(user.by_due, (end, ""))
+            out: List[TaskDoc] = []
+            for _, tid in user.by_due[lo:hi]:
+                doc = user.docs[tid]
+                if status == "all" or doc.get("status", "todo") == status:
+                    out.append((tid, dict(doc)))
+            return out
+
+    def update(self, user_id: str, task_id: str, patch: Dict[str, Any]) -> Optional[int]:
+        with self._lock:
+            user = self._user(user_id)
+            doc = user.docs.get(task_id)
+            if doc is None:
+                raise KeyError(task_id)
+            user.unindex(task_id, doc)
+            doc.update(patch)
+            doc["updatedAt"] = int(time.time())
+            user.index(task_id, doc)
+            return doc["updatedAt"]
+
+    def delete(self, user_id: str, task_id: str) -> bool:
+        with self._lock:
+            user = self._user(user_id)
+            doc = user.docs.pop(task_id, None)
+            if doc is None:
+                return False
+            user.unindex(task_id, doc)
+            return True
+
+
+# ---------------------------------------------------------
+# Latency / failure injection
+# ---------------------------------------------------------
+
+class InjectedBackendError(RuntimeError):
+    pass
+
+
+class FaultInjectingBackend(TaskBackend):
+    """
+    Wraps another backend and adds per-call latency (base + uniform jitter)
+    and random failures, to approximate a remote store during load tests.
+    """
+
+    def __init__(
+        self,
+        inner: TaskBackend,
+        *,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        failure_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.inner = inner
+        self.name = f"{inner.name}+faults"
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+
+    def _inject(self, op: str) -> None:
+        with self._rng_lock:
+            self.calls += 1
+            delay = self.latency_ms + (self._rng.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0)
+            fail = self.failure_rate > 0 and self._rng.random() < self.failure_rate
+            if fail:
+                self.failures += 1
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+        if fail:
+            raise InjectedBackendError(f"injected failure in {op}")
+
+    def create(self, user_id, data):
+        self._inject("create")
+        return self.inner.create(user_id, data)
+
+    def get(self, user_id, task_id):
+        self._inject("get")
+        return self.inner.get(user_id, task_id)
+
+    def list(self, user_id, status="all"):
+        self._inject("list")
+        return self.inner.list(user_id, status)
+
+    def list_due_range(self, user_id, status, start, end):
+        self._inject("list_due_range")
+        return self.inner.list_due_range(user_id, status, start, end)
+
+    def update(self, user_id, task_id, patch):
+        self._inject("update")
+        return self.inner.update(user_id, task_id, patch)
+
+    def delete(self, user_id, task_id):
+        self._inject("delete")
+        return self.inner.delete(user_id, task_id)
+
+
+_BACKENDS = {
+    "firestore": FirestoreTaskBackend,
+    "memory": InMemoryTaskBackend,
+}
+
+
+def backend_from_env() -> TaskBackend:
+    """
+    Build the backend selected by TASK_STORE_BACKEND (firestore | memory),
+    wrapped with fault injection when TASK_STORE_LATENCY_MS / _JITTER_MS /
+    _FAILURE_RATE are set.
+    """
+    name = settings.task_store_backend
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown TASK_STORE_BACKEND: {name!r}")
+    backend: TaskBackend = _BACKENDS[name]()
+    if settings.task_store_latency_ms or settings.task_store_jitter_ms or settings.task_store_failure_rate:
+        backend = FaultInjectingBackend(
+            backend,
+            latency_ms=settings.task_store_latency_ms,
+            jitter_ms=settings.task_store_jitter_ms,
+            failure_rate=settings.task_store_failure_rate,
+        )
+    return backend
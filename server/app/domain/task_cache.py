@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from app.domain.task_index import TitleIndex
+
+if TYPE_CHECKING:
+    from app.domain.tasks import Task
+
+# Rough per-task cost of the snapshot beyond the strings themselves:
+# Task object, index postings, trigram rows and dict slots.
+_TASK_OVERHEAD_BYTES = 900
+
+
+def estimate_task_bytes(task: "Task") -> int:
+    text = (task.title or "") + (task.description or "")
+    # titles are stored raw, normalized, and again as tokens/trigrams
+    return _TASK_OVERHEAD_BYTES + 3 * sys.getsizeof(text)
+
+
+@dataclass
+class UserSnapshot:
+    """All of one user's tasks, with their title/trigram index."""
+
+    index: TitleIndex
+    loaded_at: float = 0.0
+    size_bytes: int = 0
+
+
+class TaskSnapshotCache:
+    """
+    Per-user read-through cache of task snapshots.
+    Entries are LRU-ordered and evicted once the estimated total size exceeds
+    `max_bytes`; they also expire after `ttl_seconds` so writes made by other
+    workers are eventually picked up. Callers hold `lock` while reading a snapshot.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.lock = threading.RLock()
+        self._entries: "OrderedDict[str, UserSnapshot]" = OrderedDict()
+        # bumped on every write, so a load that raced a write is not cached
+        self._generations: Dict[str, int] = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, user_id: str) -> Optional[UserSnapshot]:
+        with self.lock:
+            snap = self._entries.get(user_id)
+            if snap is not None and time.time() - snap.loaded_at >= self.ttl_seconds:
+                self._drop(user_id)
+                self.expirations += 1
+                snap = None
+            if snap is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return snap
+
+    def generation(self, user_id: str) -> int:
+        with self.lock:
+            return self._generations.get(user_id, 0)
+
+    def put(self, user_id: str, index: TitleIndex, generation: int) -> UserSnapshot:
+        snap = UserSnapshot(
+            index=index,
+            loaded_at=time.time(),
+            size_bytes=sum(estimate_task_bytes(t) for t in index.tasks()),
+        )
+        with self.lock:
+            if self._generations.get(user_id, 0) != generation:
+                # a write landed while we were loading; serve this result but don't cache it
+                return snap
+            self._drop(user_id)
+            self._entries[user_id] = snap
+            self._bytes += snap.size_bytes
+            self._evict()
+            return snap
+
+    def upsert(self, user_id: str, task: "Task") -> None:
+        with self.lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            snap = self._entries.get(user_id)
+            if snap is None:
+                return
+            old = snap.index.get(task.id)
+            delta = estimate_task_bytes(task) - (estimate_task_bytes(old) if old else 0)
+            snap.index.replace(task)
+            snap.size_bytes += delta
+            self._bytes += delta
+            self._evict()
+
+    def remove(self, user_id: str, task_id: str) -> None:
+        with self.lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            snap = self._entries.get(user_id)
+            if snap is None:
+                return
+            old = snap.index.get(task_id)
+            if old is None:
+                return
+            snap.index.remove(task_id)
+            delta = estimate_task_bytes(old)
+            snap.size_bytes -= delta
+            self._bytes -= delta
+
+    def invalidate(self, user_id: str) -> None:
+        with self.lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            self._drop(user_id)
+
+    def _drop(self, user_id: str) -> None:
+        snap = self._entries.pop(user_id, None)
+        if snap is not None:
+            self._bytes -= snap.size_bytes
+
+    def _evict(self) -> None:
+        # never evict the most recent entry, even if it alone exceeds the budget
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            user_id, snap = self._entries.popitem(last=False)
+            self._bytes -= snap.size_bytes
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "users": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import bisect
+import re
+from array import array
+from collections import Counter
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.utils.text_matcher import normalize_text
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+if TYPE_CHECKING:
+    from app.domain.tasks import Task
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def normalize_title(text: str) -> str:
+    return normalize_text(text)
+
+
+def title_tokens(text: str) -> List[str]:
+    return _TOKEN_RE.findall(normalize_title(text))
+
+
+def title_trigrams(text: str) -> Counter:
+    norm = " " + " ".join(title_tokens(text)) + " "
+    return Counter(norm[i:i + 3] for i in range(len(norm) - 2))
+
+
+class TrigramIndex:
+    """
+    Character-trigram index for fuzzy title lookup.
+    Each title is a sparse trigram count vector stored column-wise (trigram ->
+    packed row ids + counts). A query scores every row in one vectorized pass
+    (Dice overlap of the count vectors via bincount) and returns the top-k rows
+    via argpartition. Removed rows are tombstoned and compacted lazily.
+    """
+
+    def __init__(self):
+        self._row_ids: List[Optional[str]] = []  # row -> task id (None when removed)
+        self._row_of: Dict[str, int] = {}
+        self._row_len: array = array("i")
+        self._row_status: array = array("b")  # 1 = done
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._dead = 0
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def add(self, task_id: str, title: str, status: str) -> None:
+        if task_id in self._row_of:
+            self.remove(task_id)
+        grams = title_trigrams(title)
+        row = len(self._row_ids)
+        self._row_ids.append(task_id)
+        self._row_of[task_id] = row
+        self._row_len.append(sum(grams.values()))
+        self._row_status.append(1 if status == "done" else 0)
+        for gram, count in grams.items():
+            posting = self._postings.get(gram)
+            if posting is None:
+                posting = self._postings[gram] = (array("i"), array("i"))
+            posting[0].append(row)
+            posting[1].append(count)
+
+    def remove(self, task_id: str) -> None:
+        row = self._row_of.pop(task_id, None)
+        if row is None:
+            return
+        self._row_ids[row] = None
+        self._row_len[row] = 0
+        self._dead += 1
+        if self._dead > 64 and self._dead * 4 > len(self._row_ids):
+            self._compact()
+
+    def _compact(self) -> None:
+        live = [(tid, row) for row, tid in enumerate(self._row_ids) if tid is not None]
+        remap = {old: new for new, (_, old) in enumerate(live)}
+        postings: Dict[str, Tuple[array, array]] = {}
+        for gram, (rows, counts) in self._postings.items():
+            new_rows, new_counts = array("i"), array("i")
+            for r, c in zip(rows, counts):
+                if r in remap:
+                    new_rows.append(remap[r])
+                    new_counts.append(c)
+            if new_rows:
+                postings[gram] = (new_rows, new_counts)
+        self._postings = postings
+        self._row_len = array("i", (self._row_len[old] for _, old in live))
+        self._row_status = array("b", (self._row_status[old] for _, old in live))
+        self._row_ids = [tid for tid, _ in live]
+        self._row_of = {tid: new for new, (tid, _) in enumerate(live)}
+        self._dead = 0
+
+    def top_k(self, query: str, k: int, *, status: Optional[str] = None) -> List[Tuple[str, float]]:
+        """Return up to k (task_id, dice) pairs sharing at least one trigram with `query`."""
+        q_grams = title_trigrams(query)
+        if not q_grams or not self._row_of:
+            return []
+        q_len = sum(q_grams.values())
+        if np is None:
+            return self._top_k_python(q_grams, q_len, k, status)
+
+        n = len(self._row_ids)
+        rows_parts, weight_parts = [], []
+        for gram, qc in q_grams.items():
+            posting = self._postings.get(gram)
+            if posting is None:
+                continue
+            rows_parts.append(np.frombuffer(posting[0], dtype=np.int32))
+            weight_parts.append(np.minimum(np.frombuffer(posting[1], dtype=np.int32), qc))
+        if not rows_parts:
+            return []
+        shared = np.bincount(
+            np.concatenate(rows_parts), weights=np.concatenate(weight_parts), minlength=n
+        )
+        row_len = np.frombuffer(self._row_len, dtype=np.int32)
+        scores = 2.0 * shared / (q_len + row_len)
+        scores[row_len == 0] = 0.0
+        if status in ("todo", "done"):
+            done = np.frombuffer(self._row_status, dtype=np.int8).astype(bool)
+            scores[done if status == "todo" else ~done] = 0.0
+
+        hits = np.flatnonzero(scores)
+        if hits.size > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [(self._row_ids[r], float(scores[r])) for r in hits]
+
+    def _top_k_python(self, q_grams: Counter, q_len: int, k: int, status: Optional[str]) -> List[Tuple[str, float]]:
+        shared: Dict[int, int] = {}
+        for gram, qc in q_grams.items():
+            posting = self._postings.get(gram)
+            if posting is None:
+                continue
+            for r, c in zip(*posting):
+                shared[r] = shared.get(r, 0) + min(c, qc)
+        scored = []
+        for r, s in shared.items():
+            if self._row_ids[r] is None:
+                continue
+            if status == "todo" and self._row_status[r] or status == "done" and not self._row_status[r]:
+                continue
+            scored.append((self._row_ids[r], 2.0 * s / (q_len + self._row_len[r])))
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:k]
+
+
+class TitleIndex:
+    """
+    Per-user inverted index: normalized title token -> task ids.
+    Keeps the indexed Task snapshots so searches never touch the backend.
+    Substring semantics match the old `query in title.lower()` scan, but the
+    scan runs over the (small) token vocabulary instead of every task.
+    """
+
+    def __init__(self, tasks: Iterable["Task"] = ()):
+        self._tasks: Dict[str, "Task"] = {}
+        self._norm_titles: Dict[str, str] = {}
+        self._seq: Dict[str, int] = {}
+        self._next_seq = 0
+        self._postings: Dict[str, Set[str]] = {}
+        self._vocab: List[str] = []  # sorted, for prefix lookups
+        self._term_cache: Dict[str, List[str]] = {}
+        self.trigrams = TrigramIndex()
+        for t in tasks:
+            self.add(t)
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def get(self, task_id: str) -> Optional["Task"]:
+        return self._tasks.get(task_id)
+
+    def tasks(self, status: Optional[str] = None) -> List["Task"]:
+        """Indexed tasks in insertion order, optionally filtered by status ("all" = no filter)."""
+        out = sorted(self._tasks.values(), key=lambda t: self._seq[t.id])
+        if status in (None, "all"):
+            return out
+        return [t for t in out if t.status == status]
+
+    def add(self, task: "Task") -> None:
+        if task.id in self._tasks:
+            self.remove(task.id)
+        self._tasks[task.id] = task
+        self._norm_titles[task.id] = normalize_title(task.title)
+        self._seq[task.id] = self._next_seq
+        self._next_seq += 1
+        self.trigrams.add(task.id, task.title, task.status)
+        for tok in set(title_tokens(task.title)):
+            ids = self._postings.get(tok)
+            if ids is None:
+                self._postings[tok] = {task.id}
+                bisect.insort(self._vocab, tok)
+                self._term_cache.clear()
+            else:
+                ids.add(task.id)
+
+    def remove(self, task_id: str) -> None:
+        task = self._tasks.pop(task_id, None)
+        if task is None:
+            return
+        self._norm_titles.pop(task_id, None)
+        self._seq.pop(task_id, None)
+        self.trigrams.remove(task_id)
+        for tok in set(title_tokens(task.title)):
+            ids = self._postings.get(tok)
+            if ids is None:
+                continue
+            ids.discard(task_id)
+            if not ids:
+                del self._postings[tok]
+                i = bisect.bisect_left(self._vocab, tok)
+                if i < len(self._vocab) and self._vocab[i] == tok:
+                    del self._vocab[i]
+                self._term_cache.clear()
+
+    def replace(self, task: "Task") -> None:
+        # keep original ordering position for updated tasks
+        seq = self._seq.get(task.id)
+        self.add(task)
+        if seq is not None:
+            self._seq[task.id] = seq
+
+    def _terms_containing(self, token: str) -> List[str]:
+        terms = self._term_cache.get(token)
+        if terms is None:
+            lo = bisect.bisect_left(self._vocab, token)
+            hi = bisect.bisect_left(self._vocab, token + "\uffff")
+            prefix = self._vocab[lo:hi]
+            # non-prefix substring hits (e.g. "حليب" inside "بالحليب")
+            inner = [v for v in self._vocab[:lo] + self._vocab[hi:] if token in v]
+            terms = prefix + inner
+            self._term_cache[token] = terms
+        return terms
+
+    def search(self, query: str, *, status: Optional[str] = "todo", limit: int = 5) -> List["Task"]:
+        nq = normalize_title(query).strip()
+        q_tokens = _TOKEN_RE.findall(nq)
+        if not q_tokens:
+            return []
+
+        candidates: Optional[Set[str]] = None
+        for tok in q_tokens:
+            ids: Set[str] = set()
+            for term in self._terms_containing(tok):
+                ids |= self._postings[term]
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                return []
+
+        out: List["Task"] = []
+        for tid in sorted(candidates, key=self._seq.__getitem__):
+            task = self._tasks[tid]
+            if status not in (None, "all") and task.status != status:
+                continue
+            # phrase check keeps exact substring semantics for multi-word queries
+            if nq not in self._norm_titles[tid]:
+                continue
+            out.append(task)
+            if len(out) >= limit:
+                break
+        return out
+
+    def fuzzy_candidates(self, query: str, k: int, *, status: Optional[str] = None) -> List["Task"]:
+        """Top-k tasks by trigram similarity, in insertion order (so rerank ties stay stable)."""
+        ids = [tid for tid, _ in self.trigrams.top_k(query, k, status=status)]
+        return [self._tasks[tid] for tid in sorted(ids, key=self._seq.__getitem__)]
@@ -1,10 +1,55 @@
 from __future__ import annotations
 
+import asyncio
+import dataclasses
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
-from app.services.firestore_client import get_db
-from firebase_admin import firestore as fb_fs
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pytz
+
+from app.domain.task_backends import TaskBackend, backend_from_env
+from app.domain.task_cache import TaskSnapshotCache
+from app.domain.task_index import TitleIndex
+from app.utils.clock import timezone_or_utc
 from app.utils.text_matcher import is_relevant, candidate_score
+from app.settings import settings
+
+# First day of the "week" scope (Monday=0 ... Saturday=5, Sunday=6)
+WEEK_START_WEEKDAY = 5
+DEFAULT_UPCOMING_DAYS = 7
+
+
+def _local_midnight(tz, day: date) -> float:
+    return tz.localize(datetime(day.year, day.month, day.day)).timestamp()
+
+
+def due_window(scope: str, timezone: str = "UTC", now: Optional[float] = None) -> Optional[Tuple[float, float]]:
+    """
+    [start, end) epoch-seconds range on dueAt for a list scope, or None for "all".
+    Scopes: today | week | overdue | upcoming | upcoming:<days>.
+    """
+    if not scope or scope == "all":
+        return None
+    tz = timezone_or_utc(timezone)
+    now_ts = datetime.now(pytz.UTC).timestamp() if now is None else now
+    today = datetime.fromtimestamp(now_ts, tz).date()
+
+    if scope == "today":
+        return _local_midnight(tz, today), _local_midnight(tz, today + timedelta(days=1))
+    if scope == "week":
+        start = today - timedelta(days=(today.weekday() - WEEK_START_WEEKDAY) % 7)
+        return _local_midnight(tz, start), _local_midnight(tz, start + timedelta(days=7))
+    if scope == "overdue":
+        return float("-inf"), now_ts
+    if scope == "upcoming" or scope.startswith("upcoming:"):
+        _, _, days = scope.partition(":")
+        n = int(days) if days.isdigit() else DEFAULT_UPCOMING_DAYS
+        return now_ts, now_ts + n * 86400
+    raise ValueError(f"Unknown list scope: {scope!r}")
+
 
 @dataclass
 class Task:
@@ -21,16 +66,31 @@ class Task:
 
 class TaskStore:
     """
-    Firestore task storage.
+    Task storage over a pluggable TaskBackend (Firestore by default).
     Scoped per userId: users/{userId}/tasks/{taskId}
+    Reads are served from a per-user snapshot cache (one collection read per user
+    per TTL); create/update/delete write through to the backend and the cache.
     """
 
-    def __init__(self):
-        pass
+    # Trigram shortlist size for fuzzy_search_tasks: max(limit * factor, minimum)
+    FUZZY_CANDIDATE_FACTOR = 8
+    FUZZY_MIN_CANDIDATES = 50
+
+    def __init__(self, backend: Optional[TaskBackend] = None, cache: Optional[TaskSnapshotCache] = None):
+        self.backend = backend or backend_from_env()
+        self.cache = cache or TaskSnapshotCache(
+            max_bytes=settings.task_cache_max_bytes,
+            ttl_seconds=settings.task_cache_ttl_seconds,
+        )
 
-    def _get_collection(self, user_id: str):
-        db = get_db()
-        return db.collection("users").document(user_id).collection("tasks")
+    def _snapshot(self, user_id: str) -> TitleIndex:
+        """The user's cached tasks + title index; one full collection read on a miss."""
+        snap = self.cache.get(user_id)
+        if snap is not None:
+            return snap.index
+        generation = self.cache.generation(user_id)
+        index = TitleIndex(self._map_to_task(task_id, data) for task_id, data in self.backend.list(user_id, "all"))
+        return self.cache.put(user_id, index, generation).index
 
     def create_task(
         self,
@@ -42,9 +102,6 @@ class TaskStore:
         source: str = "ui",
         duration_minutes: Optional[int] = None,
     ) -> Task:
-        coll = self._get_collection(user_id)
-        doc_ref = coll.document()
-        
         task_data = {
             "title": title,
             "description": description,
@@ -53,13 +110,11 @@ class TaskStore:
             "status": "todo",
             "source": source,
             "durationMinutes": duration_minutes,
-            "createdAt": fb_fs.SERVER_TIMESTAMP,
-            "updatedAt": fb_fs.SERVER_TIMESTAMP
         }
-        doc_ref.set(task_data)
+        task_id = self.backend.create(user_id, task_data)
         
-        return Task(
-            id=doc_ref.id, 
+        task = Task(
+            id=task_id, 
             title=title, 
             status="todo", 
             description=description, 
@@ -68,49 +123,40 @@ class TaskStore:
             source=source,
             durationMinutes=duration_minutes,
         )
+        self.cache.upsert(user_id, task)
+        return task
 
     def list_tasks(
         self, 
         user_id: str, 
         status: str = "todo", 
         scope: str = "all", 
-        timezone: str = "UTC"
+        timezone: str = "UTC",
+        now: Optional[float] = None,
     ) -> List[Task]:
-        coll = self._get_collection(user_id)
-        
-        # Base query
-        query = coll
-        
-        # Filter by status
-        if status != "all":
-            query = query.where("status", "==", status)
-            
-        # Execute query
-        docs = query.stream()
-        
-        tasks: List[Task] = []
-        for doc in docs:
-            tasks.append(self._map_to_task(doc.id, doc.to_dict()))
-            
-        # Filter by scope (in memory/python because firestore range queries on multiple fields are tricky without composite indexes)
-        if scope == "today":
-            from datetime import datetime
-            import pytz
-            try:
-                tz = pytz.timezone(timezone)
-            except:
-                tz = pytz.UTC
-            
-            now = datetime.now(tz)
-            start_of_day = now.replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
-            end_of_day = now.replace(hour=23, minute=59, second=59, microsecond=999999).timestamp()
-            
-            filtered_tasks = []
-            for t in tasks:
-                if t.dueAt and start_of_day <= t.dueAt <= end_of_day:
-                    filtered_tasks.append(t)
-            return filtered_tasks
-            
+        """
+        Tasks of `status` within `scope` (see due_window). Scoped lists are sorted by
+        dueAt; they come from the cached snapshot when there is one, otherwise from a
+        dueAt range query so the whole collection is not read for a handful of tasks.
+        `now` (epoch seconds) is the request's clock; defaults to the current time.
+        """
+        window = due_window(scope, timezone, now)
+        if window is None:
+            index = self._snapshot(user_id)
+            with self.cache.lock:
+                return index.tasks(status)
+
+        start, end = window
+        snap = self.cache.get(user_id)
+        if snap is not None:
+            with self.cache.lock:
+                tasks = [t for t in snap.index.tasks(status) if t.dueAt is not None and start <= t.dueAt < end]
+        else:
+            tasks = [
+                self._map_to_task(task_id, data)
+                for task_id, data in self.backend.list_due_range(user_id, status, start, end)
+            ]
+        tasks.sort(key=lambda t: t.dueAt)
         return tasks
 
     def _map_to_task(self, doc_id: str, data: dict) -> Task:
@@ -147,13 +193,14 @@ class TaskStore:
         )
 
     def get_task(self, user_id: str, task_id: str) -> Optional[Task]:
-        coll = self._get_collection(user_id)
-        doc = coll.document(task_id).get()
-        
-        if not doc.exists:
+        snap = self.cache.get(user_id)
+        if snap is not None:
+            with self.cache.lock:
+                return snap.index.get(task_id)
+        data = self.backend.get(user_id, task_id)
+        if data is None:
             return None
-            
-        return self._map_to_task(doc.id, doc.to_dict())
+        return self._map_to_task(task_id, data)
 
     def update_task(
         self,
@@ -167,10 +214,7 @@ class TaskStore:
         status: str | None = None,
         duration_minutes: int | None = None,
     ) -> Optional[Task]:
-        coll = self._get_collection(user_id)
-        doc_ref = coll.document(task_id)
-        
-        update_data = {"updatedAt": fb_fs.SERVER_TIMESTAMP}
+        update_data = {}
         if title is not None:
             update_data["title"] = title
         if description is not None:
@@ -184,35 +228,53 @@ class TaskStore:
         if duration_minutes is not None:
             update_data["durationMinutes"] = duration_minutes
             
-        doc_ref.update(update_data)
-        return self.get_task(user_id, task_id)
+        snap = self.cache.get(user_id)
+        cached: Optional[Task] = None
+        if snap is not None:
+            with self.cache.lock:
+                cached = snap.index.get(task_id)
+        try:
+            updated_at = self.backend.update(user_id, task_id, update_data)
+            # merge onto the cached copy; only read the doc back when we have none
+            data = None if cached is not None else self.backend.get(user_id, task_id)
+        except KeyError:
+            self.cache.remove(user_id, task_id)
+            return None
+        except Exception:
+            # the write may or may not have landed; reload on next read
+            self.cache.invalidate(user_id)
+            raise
+        if cached is not None:
+            task = dataclasses.replace(cached, **update_data, updatedAt=updated_at or cached.updatedAt)
+        elif data is not None:
+            task = self._map_to_task(task_id, data)
+        else:
+            self.cache.remove(user_id, task_id)
+            return None
+        self.cache.upsert(user_id, task)
+        return task
 
     def delete_task(self, user_id: str, task_id: str) -> bool:
-        coll = self._get_collection(user_id)
-        doc_ref = coll.document(task_id)
-        
-        if not doc_ref.get().exists:
-            return False
-            
-        doc_ref.delete()
-        return True
+        try:
+            ok = self.backend.delete(user_id, task_id)
+        except Exception:
+            self.cache.invalidate(user_id)
+            raise
+        self.cache.remove(user_id, task_id)
+        return ok
 
     def search_tasks(self, user_id: str, query: str, *, limit: int = 5) -> List[Task]:
-        q = (query or "").strip().lower()
+        """Substring/prefix search over todo titles, answered from the cached token index."""
+        q = (query or "").strip()
         if not q:
             return []
 
         try:
-            all_tasks = self.list_tasks(user_id)
+            index = self._snapshot(user_id)
         except Exception:
             return []
-        matches = []
-        for t in all_tasks:
-            if q in t.title.lower():
-                matches.append(t)
-            if len(matches) >= limit:
-                break
-        return matches
+        with self.cache.lock:
+            return index.search(q, status="todo", limit=limit)
 
     def fuzzy_search_tasks(
         self,
@@ -226,13 +288,21 @@ class TaskStore:
         """
         Relevance-based fuzzy search.
         Returns list of (Task, similarity, overlap) sorted by overlap then similarity.
+        Unscoped searches shortlist candidates from the user's trigram index and only
+        run is_relevant on that shortlist instead of on every title.
         """
         q = (query or "").strip()
         if not q:
             return []
 
         try:
-            tasks = self.list_tasks(user_id, status=status, scope=scope)
+            if scope == "all":
+                index = self._snapshot(user_id)
+                k = max(limit * self.FUZZY_CANDIDATE_FACTOR, self.FUZZY_MIN_CANDIDATES)
+                with self.cache.lock:
+                    tasks = index.fuzzy_candidates(q, k, status=None if status == "all" else status)
+            else:
+                tasks = self.list_tasks(user_id, status=status, scope=scope)
         except Exception:
             return []
         scored: List[Tuple[Task, float, int]] = []
@@ -244,3 +314,124 @@ class TaskStore:
 
         scored.sort(key=lambda item: (item[2], item[1]), reverse=True)
         return scored[:limit]
+
+
+class StoreOverloadedError(RuntimeError):
+    """Raised when the store pool already has `max_pending` calls queued or running."""
+
+
+class StorePool:
+    """
+    Bounded thread pool for blocking TaskStore calls.
+    Admission is capped at `max_pending` (running + queued); beyond that calls fail
+    fast with StoreOverloadedError instead of piling up behind a slow backend.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int):
+        self.max_workers = max_workers
+        self.max_pending = max(max_pending, max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="taskstore")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._max_queue_depth = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+
+    def _call(self, fn: Callable, *args, **kwargs):
+        with self._lock:
+            self._running += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    def _finished(self, job: Future) -> None:
+        # runs when the job itself ends (or is cancelled before it started), not
+        # when its caller stops awaiting it: a cancelled request must not free the
+        # slot of a call that is still running in a worker
+        with self._lock:
+            self._pending -= 1
+            if job.cancelled():
+                return
+            if job.exception() is None:
+                self._completed += 1
+            else:
+                self._failed += 1
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise StoreOverloadedError(f"task store busy ({self._pending} pending)")
+            self._pending += 1
+            self._submitted += 1
+            self._max_queue_depth = max(self._max_queue_depth, self._pending - self._running)
+        job = self._executor.submit(self._call, fn, *args, **kwargs)
+        job.add_done_callback(self._finished)
+        return await asyncio.wrap_future(job)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "running": self._running,
+                "queue_depth": max(self._pending - self._running, 0),
+                "max_queue_depth": self._max_queue_depth,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+            }
+
+
+_default_pool: Optional[StorePool] = None
+_default_pool_lock = threading.Lock()
+
+
+def default_store_pool() -> StorePool:
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = StorePool(
+                max_workers=settings.task_store_max_workers,
+                max_pending=settings.task_store_max_pending,
+            )
+        return _default_pool
+
+
+class AsyncTaskStore:
+    """
+    Awaitable facade over a TaskStore.
+    Each call runs on the shared bounded StorePool, so slow Firestore round trips
+    overlap across requests instead of serializing the event loop.
+    """
+
+    def __init__(self, store: TaskStore, pool: Optional[StorePool] = None):
+        self.store = store
+        self.pool = pool or default_store_pool()
+
+    async def create_task(self, user_id: str, title: str, **kwargs) -> Task:
+        return await self.pool.run(self.store.create_task, user_id, title, **kwargs)
+
+    async def list_tasks(self, user_id: str, **kwargs) -> List[Task]:
+        return await self.pool.run(self.store.list_tasks, user_id, **kwargs)
+
+    async def get_task(self, user_id: str, task_id: str) -> Optional[Task]:
+        return await self.pool.run(self.store.get_task, user_id, task_id)
+
+    async def update_task(self, user_id: str, task_id: str, **kwargs) -> Optional[Task]:
+        return await self.pool.run(self.store.update_task, user_id, task_id, **kwargs)
+
+    async def delete_task(self, user_id: str, task_id: str) -> bool:
+        return await self.pool.run(self.store.delete_task, user_id, task_id)
+
+    async def search_tasks(self, user_id: str, query: str, **kwargs) -> List[Task]:
+        return await self.pool.run(self.store.search_tasks, user_id, query, **kwargs)
+
+    async def fuzzy_search_tasks(self, user_id: str, query: str, **kwargs) -> List[Tuple[Task, float, int]]:
+        return await self.pool.run(self.store.fuzzy_search_tasks, user_id, query, **kwargs)
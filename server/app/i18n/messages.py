@@ -14,6 +14,10 @@ MESSAGES: Dict[str, Dict[str, str]] = {
         "not_implemented": "هالميزة لسه مش جاهزة، بس رح نضيفها قريب.",
         "clarify": "ممكن توضّحي/توضح أكتر؟",
         "task_completed": "تمام! علّمتها كمُنجزة ✅",
+        "ERR_UNAUTHORIZED": "لازم تسجّل دخول أول.",
+        "ERR_INVALID_REQUEST": "الطلب مش مكتمل أو فيه خطأ.",
+        "ERR_INTERNAL": "صار خطأ داخلي بسيط. جرّب مرة ثانية.",
+        "ERR_IDEMPOTENCY_CONFLICT": "رقم الطلب هاد انبعت قبل مع رسالة ثانية.",
 
     },
     "egy": {
@@ -25,6 +29,10 @@ MESSAGES: Dict[str, Dict[str, str]] = {
         "not_implemented": "الميزة دي لسه مش جاهزة، بس هنضيفها قريب.",
         "clarify": "ممكن توضحلي أكتر؟",
         "task_completed": "تمام! علّمتها كإنها خلصت ✅",
+        "ERR_UNAUTHORIZED": "لازم تسجّل دخول الأول.",
+        "ERR_INVALID_REQUEST": "الطلب ناقص أو فيه غلط.",
+        "ERR_INTERNAL": "حصل خطأ داخلي بسيط. جرّب تاني.",
+        "ERR_IDEMPOTENCY_CONFLICT": "رقم الطلب ده اتبعت قبل كده برسالة تانية.",
 
     },
     "khg": {
@@ -34,6 +42,10 @@ MESSAGES: Dict[str, Dict[str, str]] = {
         "task_completed": "تم إنجاز المهمة 👌",
         "clarify": "ممكن توضّحين أكثر؟",
         "not_implemented": "الميزة هذي لسه غير متوفرة",
+        "ERR_UNAUTHORIZED": "لازم تسجّل دخول أول.",
+        "ERR_INVALID_REQUEST": "الطلب ناقص أو فيه خطأ.",
+        "ERR_INTERNAL": "صار خطأ داخلي بسيط. جرّب مرة ثانية.",
+        "ERR_IDEMPOTENCY_CONFLICT": "رقم الطلب هذا انرسل قبل برسالة ثانية.",
     },
 }
 
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import functools
+import hashlib
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, FrozenSet, Optional
+
+
+@functools.lru_cache(maxsize=8)
+def parse_intents(csv: str) -> FrozenSet[str]:
+    return frozenset(p.strip() for p in (csv or "").split(",") if p.strip())
+
+
+class FastPathStats:
+    """
+    Counters for the rule-based fast path in interpret_intent: how many fresh
+    messages were answered locally, how many model calls that saved, and, for
+    the sampled share of local answers that were also sent to the model, how
+    often the two agreed on the intent. The last few disagreements are kept
+    for inspection, without the message itself (the stats endpoint is public):
+    the intent pair, the local confidence and a short hash that shows repeats.
+    """
+
+    def __init__(self, keep_disagreements: int = 20):
+        self._lock = threading.Lock()
+        self.messages = 0
+        self.local_hits = 0
+        self.llm_calls_avoided = 0
+        self.by_intent: Dict[str, int] = {}
+        self.below_threshold = 0
+        self.sampled = 0
+        self.agreements = 0
+        self.disagreements = 0
+        self.sample_errors = 0
+        self.recent_disagreements: Deque[Dict[str, Any]] = deque(maxlen=keep_disagreements)
+
+    def record(self, intent: str, local: bool, llm_available: bool) -> None:
+        with self._lock:
+            self.messages += 1
+            if not local:
+                self.below_threshold += 1
+                return
+            self.local_hits += 1
+            self.by_intent[intent] = self.by_intent.get(intent, 0) + 1
+            if llm_available:
+                self.llm_calls_avoided += 1
+
+    def record_sample(
+        self, message: str, local_intent: str, llm_intent: Optional[str], local_confidence: float = 0.0
+    ) -> None:
+        with self._lock:
+            self.sampled += 1
+            if llm_intent is None:
+                self.sample_errors += 1
+            elif llm_intent == local_intent:
+                self.agreements += 1
+            else:
+                self.disagreements += 1
+                self.recent_disagreements.append(
+                    {
+                        "message_hash": hashlib.sha256(message.encode("utf-8")).hexdigest()[:12],
+                        "local": local_intent,
+                        "llm": llm_intent,
+                        "confidence": local_confidence,
+                    }
+                )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            compared = self.agreements + self.disagreements
+            return {
+                "messages": self.messages,
+                "local_hits": self.local_hits,
+                "local_hit_rate": round(self.local_hits / self.messages, 4) if self.messages else 0.0,
+                "llm_calls_avoided": self.llm_calls_avoided,
+                "below_threshold": self.below_threshold,
+                "by_intent": dict(self.by_intent),
+                "sampled": self.sampled,
+                "agreements": self.agreements,
+                "disagreements": self.disagreements,
+                "agreement_rate": round(self.agreements / compared, 4) if compared else None,
+                "sample_errors": self.sample_errors,
+                "recent_disagreements": list(self.recent_disagreements),
+            }
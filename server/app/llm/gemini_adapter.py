@@ -1,10 +1,12 @@
 ﻿from __future__ import annotations
 
+import asyncio
 import json
 import logging
+import random
 import time
-from datetime import datetime
-from typing import Any, Dict, Literal, Optional, Tuple
+from datetime import datetime, timedelta
+from typing import Any, Dict, Literal, Optional, Set, Tuple
 import re
 
 from pydantic import BaseModel, Field, validator
@@ -12,9 +14,12 @@ from google import genai
 from google.genai import types
 
 from app.settings import settings
+from app.llm.fast_path import FastPathStats, parse_intents
 from app.llm.gemini_keypool import GeminiKeyPool
-from app.utils.arabic_duration_parser import parse_duration_minutes, strip_duration_phrase, extract_duration_minutes_and_clean
-from app.utils.arabic_time_parser import extract_due_datetime_and_clean
+from app.llm.intent_cache import CacheKey, IntentCache
+from app.llm.single_flight import SingleFlight, flight_key
+from app.utils.clock import resolve_timezone
+from app.utils.parsed_message import ParsedMessage, extract_title_hint
 
 logger = logging.getLogger(__name__)
 
@@ -101,6 +106,24 @@ except Exception as e:
 _AVAILABLE_MODELS: list[str] = []
 
 
+def key_pool_stats() -> Dict[str, Any]:
+    if not _key_pool:
+        return {"keys_count": 0}
+    return {"keys_count": len(_key_pool.keys), **_key_pool.client_stats(), **_key_pool.capacity_stats()}
+
+
+def key_pool_health() -> Dict[str, Any]:
+    if not _key_pool:
+        return {"keys_count": 0, "keys": []}
+    return _key_pool.health_stats()
+
+
+async def close_key_pool() -> None:
+    """Close the per-key HTTP pools; called once on app shutdown."""
+    if _key_pool:
+        await _key_pool.aclose_clients()
+
+
 # ---------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------
@@ -138,7 +161,7 @@ def _response_schema() -> Dict[str, Any]:
 
 def _list_models(api_key: str) -> list[str]:
     try:
-        client = genai.Client(api_key=api_key)
+        client = _key_pool.client_for(api_key) if _key_pool else genai.Client(api_key=api_key)
         models = client.models.list()
         names = [m.name for m in models if getattr(m, "supported_generation_methods", None)]
         return names
@@ -147,87 +170,32 @@ def _list_models(api_key: str) -> list[str]:
         return []
 
 
-def _extract_title_hint(text: str) -> Optional[str]:
-    import re
-
-    hint = (text or "").strip()
-    lead_patterns = [
-        r"^احذف\s*",
-        r"^أحذف\s*",
-        r"^حذف\s*",
-        r"^امسح\s*",
-        r"^شيل\s*",
-        r"^اشطب\s*",
-        r"^الغ\s*",
-        r"^ألغي\s*",
-        r"^بدي\s+",
-        r"^بدّي\s+",
-        r"^ذكّرني\s+ب?\s*",
-        r"^ذكرني\s+ب?\s*",
-        r"^لازم\s+",
-        r"^مهمة\s*[:\-]?\s*",
-        r"^موعد\s*[:\-]?\s*",
-    ]
-    for pat in lead_patterns:
-        hint = re.sub(pat, "", hint, flags=re.IGNORECASE).strip()
-    if len(hint) > 60:
-        hint = hint[:60].strip()
-    return hint or None
-
-
 def _iso_from_ts(ts: int, timezone: str) -> str:
-    try:
-        import pytz
-
-        tz = pytz.timezone(timezone)
-    except Exception:
-        tz = None
+    tz = resolve_timezone(timezone)
     dt = datetime.fromtimestamp(ts, tz) if tz else datetime.fromtimestamp(ts)
     return dt.isoformat()
 
 
-def _clean_title(text: str) -> str:
-    if not text:
-        return ""
-    try:
-        from datetime import timezone
-        now = datetime.now(timezone.utc)
-        due_dt, cleaned = extract_due_datetime_and_clean(text, "UTC", now)
-        duration, cleaned = extract_duration_minutes_and_clean(cleaned)
-        cleaned = _extract_title_hint(cleaned) or cleaned
-        prefixes = ["بدي", "بدّي", "أضف", "ضيف", "اضف", "سجل", "سجلي", "اعمل", "خلينا", "مهمة", "task", "لو سمحت", "ممكن"]
-        for p in prefixes:
-            cleaned = re.sub(rf"^{re.escape(p)}\\s+", "", cleaned, flags=re.IGNORECASE)
-        cleaned = re.sub(r"\\s+", " ", cleaned).strip(" -،،,:")
-        if len(cleaned) > 60:
-            cleaned = cleaned[:60].strip()
-        return cleaned
-    except Exception:
-        return text.strip()
-
-
-def rule_based_extract(message: str, timezone: str) -> IntentResult:
+def rule_based_extract(message: str, timezone: str, parsed: Optional[ParsedMessage] = None) -> IntentResult:
     """
-    Lightweight Arabic heuristic extractor used when Gemini is unavailable.
+    Lightweight Arabic heuristic extractor: the fast path for confident messages
+    and the fallback when Gemini is unavailable. `confidence` is what the fast
+    path gates on: high for a single unambiguous trigger with what the intent
+    needs, lower when triggers conflict or the due is incomplete.
+    Reuses `parsed` when the caller already parsed the message for this request.
     """
-    text = message.strip()
-    lower = text.lower()
-
-    delete_triggers = ["احذف", "حذف", "امسح", "شيل", "اشطب", "الغ", "إلغاء مهمة", "delete", "remove"]
-    create_triggers = ["بدي", "بدّي", "ذكرني", "ذكّرني", "ذكّر", "ذكر", "لازم", "مهمة", "موعد", "تذكير", "حجز", "اضف", "ضيف", "سجل", "create", "add"]
-    list_triggers = ["مهامي", "شو مهامي", "اعرض المهام", "ورجيني مهامي", "ما هي المهام", "شو عندي"]
-
-    # Duration detection and clean title
-    duration_minutes, cleaned_after_duration = extract_duration_minutes_and_clean(text)
-
-    # Due extraction
-    from datetime import timezone as _tz
-    now = datetime.now(_tz.utc)
-    due_dt, cleaned_title = extract_due_datetime_and_clean(cleaned_after_duration, timezone, now)
+    if parsed is None:
+        from datetime import timezone as _tz
+        parsed = ParsedMessage.parse(message, timezone, datetime.now(_tz.utc))
+    text = parsed.text
+    lower = parsed.lower
+    triggers = parsed.triggers
+    duration_minutes = parsed.duration_minutes
+    due_dt = parsed.due
 
     # Delete intent first to avoid misclassification
-    if any(k in lower for k in delete_triggers):
-        query = _extract_title_hint(text)
+    if "delete" in triggers:
+        query = extract_title_hint(text)
         needs_clarify = not bool(query)
         confirm_msg = f"بدك أحذف: {query} ؟ (نعم/لا)" if query else None
         return IntentResult(
@@ -237,11 +205,17 @@ def rule_based_extract(message: str, timezone: str) -> IntentResult:
             clarify_question="أكيد—أي مهمة بدك تحذف؟ اكتب كلمة من عنوانها." if needs_clarify else None,
             needs_confirmation=bool(query),
             confirm_message=confirm_msg,
-            confidence=0.62,
+            # mixed with list or create commands it is the model's call
+            confidence=round(
+                (0.9 if query else 0.85)
+                - (0.3 if "list" in triggers else 0.0)
+                - (0.3 if parsed.has_create_command else 0.0),
+                2,
+            ),
         )
 
     # Detect list intent
-    if any(k in lower for k in list_triggers):
+    if "list" in triggers:
         return IntentResult(
             intent="list_tasks",
             title=None,
@@ -250,14 +224,15 @@ def rule_based_extract(message: str, timezone: str) -> IntentResult:
             needs_clarification=False,
             clarify_question=None,
             needs_confirmation=False,
-            confidence=0.5,
+            # "بدي اعرف شو مهامي" reads as list, but mixed triggers go to the model
+            confidence=0.6 if "create" in triggers else 0.9,
         )
 
     # Detect create intent
-    is_create = any(k in lower for k in create_triggers) or bool(duration_minutes) or bool(due_dt)
+    is_create = "create" in triggers or bool(duration_minutes) or bool(due_dt)
     intent = "create_task" if is_create else "chat"
 
-    title = _clean_title(cleaned_title if intent == "create_task" else text) if intent == "create_task" else None
+    title = parsed.title if intent == "create_task" else None
 
     # Time detection for due using extracted due_dt
     due_kind = "none"
@@ -268,15 +243,25 @@ def rule_based_extract(message: str, timezone: str) -> IntentResult:
         due_iso = due_dt.isoformat()
         due_conf = 0.6
     else:
-        import re
-        has_day_word = bool(re.search(r"اليوم|بكرة|غدا|غداً|بعد بكرة|لبكرة", lower))
-        has_time = bool(re.search(r"الساعة|صباح|مساء|am|pm|:\\d", lower))
+        has_day_word = bool(re.search(r"اليوم|بكر[ةه]|غدا|غداً", lower))
+        has_time = bool(re.search(r"الساع[ةه]|صباح|مساء|am|pm|:\d", lower))
         if has_day_word and not has_time:
             due_kind = "missing"
 
     needs_clarify = intent == "create_task" and due_kind == "missing"
     clarify_question = "تمام—إمتى بدك أذكّرك؟" if needs_clarify else None
 
+    confidence = 0.3
+    if intent == "create_task":
+        # only a command word ("ذكرني", "ضيف") says "new task"; a bare noun ("مهمة",
+        # "موعد") also shows up in updates and questions, so it stays under the gate
+        confidence = 0.6 if parsed.has_create_command else 0.4
+        if title and due_kind != "missing":
+            confidence += 0.2
+        if due_kind == "resolved":
+            # "الساعة 2" with no morning/evening word may mean 02:00 or 14:00: let Gemini decide
+            confidence += -0.1 if parsed.ambiguous_hour else 0.1
+
     return IntentResult(
         intent=intent,
         title=title or None,
@@ -285,7 +270,7 @@ def rule_based_extract(message: str, timezone: str) -> IntentResult:
         needs_clarification=needs_clarify,
         clarify_question=clarify_question,
         needs_confirmation=False,
-        confidence=0.45 if intent == "create_task" else 0.3,
+        confidence=round(confidence, 2),
     )
 
 
@@ -293,12 +278,149 @@ def rule_based_extract(message: str, timezone: str) -> IntentResult:
 # Main interpret function
 # ---------------------------------------------------------
 
-def interpret_intent(message: str, timezone: str, now_iso: str) -> Tuple[IntentResult, Dict[str, Any]]:
-    """
-    Interpret intent using Gemini with structured output; falls back to rule-based extractor.
-    Returns (IntentResult, debug_meta)
-    """
-    debug_meta = {
+RETRY_BACKOFF_SECONDS = 0.5
+_ANSWER_TOKENS_ESTIMATE = 150
+# "retryDelay": "27s" in RetryInfo details, or "Please retry in 27.6s."
+_RETRY_DELAY_RE = re.compile(r"retry(?:delay['\"]?\s*:\s*['\"]|\s+in\s+)(\d+(?:\.\d+)?)s", re.IGNORECASE)
+
+_RETRYABLE_MARKERS = (
+    "429",
+    "resource exhausted",
+    "503",
+    "service unavailable",
+    "internal server error",
+    "timed out",
+    "deadline exceeded",
+    "aborted",
+)
+
+
+_fast_path = FastPathStats()
+_shadow_tasks: Set["asyncio.Task"] = set()
+
+
+def fast_path_stats() -> Dict[str, Any]:
+    return {
+        "enabled": settings.rule_fast_path_enabled,
+        "min_confidence": settings.rule_fast_path_min_confidence,
+        "intents": sorted(parse_intents(settings.rule_fast_path_intents)),
+        "sample_rate": settings.rule_fast_path_sample_rate,
+        **_fast_path.stats(),
+    }
+
+
+def _now_from_iso(now_iso: str) -> datetime:
+    try:
+        return datetime.fromisoformat(now_iso)
+    except (TypeError, ValueError):
+        from datetime import timezone as _tz
+        return datetime.now(_tz.utc)
+
+
+def _try_fast_path(
+    message: str, timezone: str, parsed: ParsedMessage
+) -> Optional[Tuple[IntentResult, Dict[str, Any]]]:
+    """Rule-based answer when it clears the confidence gate, else None (ask Gemini)."""
+    if not settings.rule_fast_path_enabled:
+        return None
+    res = rule_based_extract(message, timezone, parsed)
+    local = (
+        res.intent in parse_intents(settings.rule_fast_path_intents)
+        and res.confidence >= settings.rule_fast_path_min_confidence
+    )
+    _fast_path.record(res.intent, local, llm_available=bool(_key_pool))
+    if not local:
+        return None
+    debug_meta = _new_debug_meta()
+    debug_meta.update({"llm_used": "rule_fast_path", "tokens_source": "rule_based", "rule_confidence": res.confidence})
+    return res, debug_meta
+
+
+def _sampled() -> bool:
+    rate = settings.rule_fast_path_sample_rate
+    return bool(_key_pool) and rate > 0 and random.random() < rate
+
+
+async def _shadow_check(message: str, timezone: str, now_iso: str, local: IntentResult) -> None:
+    try:
+        res, meta = await _interpret_llm_async(message, timezone, now_iso)
+        llm_intent = res.intent if meta.get("llm_used") == "gemini" else None
+    except Exception:
+        llm_intent = None
+    _fast_path.record_sample(message, local.intent, llm_intent, local.confidence)
+
+
+_intent_cache = IntentCache(
+    max_entries=settings.intent_cache_max_entries,
+    ttl_seconds=settings.intent_cache_ttl_seconds,
+    bucket_seconds=settings.intent_cache_bucket_seconds,
+)
+
+
+def intent_cache_stats() -> Dict[str, Any]:
+    return {"enabled": settings.intent_cache_enabled, **_intent_cache.stats()}
+
+
+def _cache_lookup(
+    message: str, timezone: str, parsed: ParsedMessage
+) -> Tuple[Optional[CacheKey], Optional[Tuple[IntentResult, Dict[str, Any]]]]:
+    """(key, cached answer or None); key is None when the cache is off."""
+    if not settings.intent_cache_enabled:
+        return None, None
+    key = _intent_cache.key(message, timezone, parsed.now)
+
+    def reanchor(entry: Tuple[IntentResult, timedelta]) -> Optional[Tuple[IntentResult, timedelta]]:
+        # the stored due was resolved against an earlier "now": keep the model's
+        # offset from the local parse, applied to this request's parse
+        result, delta = entry
+        if parsed.due is None:
+            return None
+        due = Due(kind="resolved", iso=(parsed.due + delta).isoformat(), confidence=result.due.confidence)
+        return result.model_copy(update={"due": due}), delta
+
+    hit = _intent_cache.get(key, reanchor)
+    if hit is None:
+        return key, None
+    debug_meta = _new_debug_meta()
+    debug_meta.update({"llm_used": "intent_cache", "tokens_source": "cache"})
+    return key, (hit[0], debug_meta)
+
+
+def _cache_store(
+    key: Optional[CacheKey], result: IntentResult, debug_meta: Dict[str, Any], parsed: ParsedMessage
+) -> None:
+    # only real model answers; fallbacks are cheap and may be degraded
+    if key is None or debug_meta.get("llm_used") != "gemini":
+        return
+    resolved = result.due.kind == "resolved"
+    delta = None
+    if resolved and parsed.due is not None:
+        try:
+            delta = datetime.fromisoformat(result.due.iso) - parsed.due
+        except (TypeError, ValueError):
+            delta = None  # unparseable or naive model iso: not re-anchorable
+    _intent_cache.put(key, (result, delta), resolved=resolved, anchorable=delta is not None)
+
+
+_single_flight = SingleFlight()
+
+
+def single_flight_stats() -> Dict[str, Any]:
+    return {"enabled": settings.single_flight_enabled, **_single_flight.stats()}
+
+
+def _shared_copy(
+    answer: Tuple[IntentResult, Dict[str, Any]], shared: bool
+) -> Tuple[IntentResult, Dict[str, Any]]:
+    # followers get their own copies: callers mutate debug_meta
+    result, debug_meta = answer
+    if not shared:
+        return answer
+    return result.model_copy(deep=True), {**debug_meta, "coalesced": True}
+
+
+def _new_debug_meta() -> Dict[str, Any]:
+    return {
         "llm_used": "gemini",
         "model": settings.gemini_model,
         "keys_count": len(_key_pool.keys) if _key_pool else 0,
@@ -309,114 +431,269 @@ def interpret_intent(message: str, timezone: str, now_iso: str) -> Tuple[IntentR
         "tokens_source": "gemini",
     }
 
+
+def _fallback(
+    message: str, timezone: str, debug_meta: Dict[str, Any], parsed: Optional[ParsedMessage] = None
+) -> Tuple[IntentResult, Dict[str, Any]]:
+    res = rule_based_extract(message, timezone, parsed)
+    debug_meta.update({"llm_used": "fallback_rule", "tokens_source": "rule_based"})
+    return res, debug_meta
+
+
+def _resolve_model(model_to_use: str, debug_meta: Dict[str, Any]) -> str:
+    if model_to_use not in _AVAILABLE_MODELS and _AVAILABLE_MODELS:
+        # fallback to a flash-like model if present
+        fallback = next((m for m in _AVAILABLE_MODELS if "flash" in m), _AVAILABLE_MODELS[0])
+        debug_meta["model_substitution"] = {"from": model_to_use, "to": fallback}
+        return fallback
+    return model_to_use
+
+
+def _generate_config() -> types.GenerateContentConfig:
+    return types.GenerateContentConfig(
+        system_instruction=_SYSTEM_PROMPT,
+        temperature=0.1,
+        top_p=0.7,
+        response_mime_type="application/json",
+        response_schema=_response_schema(),
+    )
+
+
+def _parse_response(response) -> IntentResult:
+    if not response.text:
+        raise ValueError("Empty response from Gemini")
+    data = json.loads(response.text)
+    return IntentResult(**data)
+
+
+def _classify_error(e: Exception) -> Tuple[str, bool]:
+    """Return (error_type, is_retryable) for a failed Gemini call."""
+    err_msg = str(e).lower()
+    if "not found" in err_msg and "model" in err_msg:
+        return "model_not_found", False
+    is_retryable = any(k in err_msg for k in _RETRYABLE_MARKERS)
+
+    error_type = "unknown"
+    if "429" in err_msg or "resource exhausted" in err_msg:
+        error_type = "quota"
+    elif "timed out" in err_msg or "deadline exceeded" in err_msg:
+        error_type = "timeout"
+    elif "401" in err_msg or "unauthorized" in err_msg:
+        error_type = "auth"
+    elif "invalid argument" in err_msg or "400" in err_msg:
+        error_type = "client_error"
+    return error_type, is_retryable
+
+
+def _estimate_tokens(payload: str) -> int:
+    # Arabic runs close to 3 characters per token; the answer is a small JSON object
+    return (len(_SYSTEM_PROMPT) + len(payload)) // 3 + _ANSWER_TOKENS_ESTIMATE
+
+
+def _extra_tokens(response, estimate: int) -> int:
+    # real usage minus what was reserved; 0 when the response carries no usage
+    usage = getattr(response, "usage_metadata", None)
+    total = getattr(usage, "total_token_count", None)
+    return total - estimate if isinstance(total, int) else 0
+
+
+def _retry_after(e: Exception) -> Optional[float]:
+    """Server-suggested wait in seconds from a quota error (Retry-After header or RetryInfo), if any."""
+    response = getattr(e, "response", None)
+    header = getattr(response, "headers", {}).get("retry-after") if response is not None else None
+    if header:
+        try:
+            return float(header)
+        except ValueError:
+            pass
+    m = _RETRY_DELAY_RE.search(str(e))
+    return float(m.group(1)) if m else None
+
+
+def _interpret_llm(
+    message: str, timezone: str, now_iso: str, parsed: Optional[ParsedMessage] = None
+) -> Tuple[IntentResult, Dict[str, Any]]:
+    global _AVAILABLE_MODELS
+    debug_meta = _new_debug_meta()
+
     if not _key_pool:
-        res = rule_based_extract(message, timezone)
-        debug_meta.update({
-            "llm_used": "fallback_rule",
-            "tokens_source": "rule_based",
-        })
-        return res, debug_meta
+        return _fallback(message, timezone, debug_meta, parsed)
 
     max_attempts = len(_key_pool.keys)
     attempts = 0
     last_error = None
-    schema = _response_schema()
-
     model_to_use = settings.gemini_model
+    payload = f"tz={timezone}\nnow={now_iso}\nmessage: {message}"
+    estimate = _estimate_tokens(payload)
 
     while attempts < max_attempts:
         attempts += 1
-        key = _key_pool.next_key()
+        handle = _key_pool.acquire(estimate, timeout=settings.gemini_capacity_wait_seconds)
+        if handle is None:
+            debug_meta["last_error_type"] = "capacity"
+            break
         debug_meta["attempted_keys"] = attempts
+        started = time.perf_counter()
 
         try:
-            key_index = _key_pool.keys.index(key)
-        except ValueError:
-            key_index = -1
-
-        try:
-            client = genai.Client(api_key=key)
-            # Validate model availability once per attempt
-            global _AVAILABLE_MODELS
+            client = _key_pool.client_for(handle)
+            # Validate model availability once per process
             if not _AVAILABLE_MODELS:
-                _AVAILABLE_MODELS = _list_models(key)
-            if model_to_use not in _AVAILABLE_MODELS and _AVAILABLE_MODELS:
-                # fallback to a flash-like model if present
-                fallback = next((m for m in _AVAILABLE_MODELS if "flash" in m), _AVAILABLE_MODELS[0])
-                debug_meta["model_substitution"] = {"from": model_to_use, "to": fallback}
-                model_to_use = fallback
-
-            payload = f"tz={timezone}\nnow={now_iso}\nmessage: {message}"
+                _AVAILABLE_MODELS = _list_models(handle.key)
+            model_to_use = _resolve_model(model_to_use, debug_meta)
+
             response = client.models.generate_content(
                 model=model_to_use,
                 contents=payload,
-                config=types.GenerateContentConfig(
-                    system_instruction=_SYSTEM_PROMPT,
-                    temperature=0.1,
-                    top_p=0.7,
-                    response_mime_type="application/json",
-                    response_schema=schema,
-                ),
+                config=_generate_config(),
             )
-
-            if not response.text:
-                raise ValueError("Empty response from Gemini")
-
-            data = json.loads(response.text)
-            result = IntentResult(**data)
-            debug_meta["used_key_index"] = key_index
+            result = _parse_response(response)
+            _key_pool.record_success(handle, time.perf_counter() - started, _extra_tokens(response, estimate))
+            debug_meta["used_key_index"] = handle.index
             return result, debug_meta
 
         except Exception as e:
             last_error = e
-            err_msg = str(e).lower()
-            if "not found" in err_msg and "model" in err_msg:
-                debug_meta["last_error_type"] = "model_not_found"
-                debug_meta["last_error_message"] = str(e)[:160]
-                res = rule_based_extract(message, timezone)
-                debug_meta.update({"llm_used": "fallback_rule", "tokens_source": "rule_based"})
+            error_type, is_retryable = _classify_error(e)
+            _key_pool.record_failure(handle, error_type, time.perf_counter() - started)
+            debug_meta["last_error_type"] = error_type
+            debug_meta["last_error_message"] = str(e)[:160]
+            if error_type == "model_not_found":
                 # Surface issue only in debug metadata; don't force clarification on the user
-                return res, debug_meta
-            is_retryable = any(
-                k in err_msg
-                for k in (
-                    "429",
-                    "resource exhausted",
-                    "503",
-                    "service unavailable",
-                    "internal server error",
-                    "timed out",
-                    "deadline exceeded",
-                    "aborted",
-                )
-            )
+                return _fallback(message, timezone, debug_meta, parsed)
+
+            if error_type == "quota":
+                _key_pool.cool_down(handle, _retry_after(e))
+            if is_retryable:
+                time.sleep(RETRY_BACKOFF_SECONDS)
+            continue
+
+    # All keys failed -> rule-based fallback
+    logger.error(f"All Gemini attempts failed. Last error: {last_error}")
+    return _fallback(message, timezone, debug_meta, parsed)
+
+
+async def _interpret_llm_async(
+    message: str, timezone: str, now_iso: str, parsed: Optional[ParsedMessage] = None
+) -> Tuple[IntentResult, Dict[str, Any]]:
+    global _AVAILABLE_MODELS
+    debug_meta = _new_debug_meta()
 
-            error_type = "unknown"
-            if "429" in err_msg or "resource exhausted" in err_msg:
-                error_type = "quota"
-            elif "timed out" in err_msg or "deadline exceeded" in err_msg:
-                error_type = "timeout"
-            elif "401" in err_msg or "unauthorized" in err_msg:
-                error_type = "auth"
-            elif "invalid argument" in err_msg or "400" in err_msg:
-                error_type = "client_error"
+    if not _key_pool:
+        return _fallback(message, timezone, debug_meta, parsed)
+
+    max_attempts = len(_key_pool.keys)
+    attempts = 0
+    last_error = None
+    model_to_use = settings.gemini_model
+    payload = f"tz={timezone}\nnow={now_iso}\nmessage: {message}"
+    estimate = _estimate_tokens(payload)
+
+    while attempts < max_attempts:
+        attempts += 1
+        handle = await _key_pool.acquire_async(estimate, timeout=settings.gemini_capacity_wait_seconds)
+        if handle is None:
+            debug_meta["last_error_type"] = "capacity"
+            break
+        debug_meta["attempted_keys"] = attempts
+        started = time.perf_counter()
+
+        try:
+            client = _key_pool.client_for(handle)
+            if not _AVAILABLE_MODELS:
+                _AVAILABLE_MODELS = await asyncio.to_thread(_list_models, handle.key)
+            model_to_use = _resolve_model(model_to_use, debug_meta)
 
+            response = await client.aio.models.generate_content(
+                model=model_to_use,
+                contents=payload,
+                config=_generate_config(),
+            )
+            result = _parse_response(response)
+            _key_pool.record_success(handle, time.perf_counter() - started, _extra_tokens(response, estimate))
+            debug_meta["used_key_index"] = handle.index
+            return result, debug_meta
+
+        except asyncio.CancelledError:
+            # the caller went away; the key did nothing wrong
+            _key_pool.release(handle)
+            raise
+        except Exception as e:
+            last_error = e
+            error_type, is_retryable = _classify_error(e)
+            _key_pool.record_failure(handle, error_type, time.perf_counter() - started)
             debug_meta["last_error_type"] = error_type
             debug_meta["last_error_message"] = str(e)[:160]
+            if error_type == "model_not_found":
+                return _fallback(message, timezone, debug_meta, parsed)
 
-            _key_pool.cool_down(key)
+            if error_type == "quota":
+                _key_pool.cool_down(handle, _retry_after(e))
             if is_retryable:
-                time.sleep(0.5)
-                continue
+                await asyncio.sleep(RETRY_BACKOFF_SECONDS)
             continue
 
-    # All keys failed -> rule-based fallback
     logger.error(f"All Gemini attempts failed. Last error: {last_error}")
-    res = rule_based_extract(message, timezone)
-    debug_meta.update(
-        {
-            "llm_used": "fallback_rule",
-            "tokens_source": "rule_based",
-        }
-    )
-    return res, debug_meta
+    return _fallback(message, timezone, debug_meta, parsed)
+
+
+def interpret_intent(
+    message: str, timezone: str, now_iso: str, parsed: Optional[ParsedMessage] = None
+) -> Tuple[IntentResult, Dict[str, Any]]:
+    """
+    Interpret intent: confident rule-based answers are returned locally, then the
+    intent cache is consulted, and everything else goes to Gemini with structured
+    output, falling back to the rule-based extractor. Identical messages already
+    in flight wait for that call instead of making their own.
+    (Disagreement sampling runs only on the async path.)
+    Returns (IntentResult, debug_meta)
+    """
+    if parsed is None:
+        parsed = ParsedMessage.parse(message, timezone, _now_from_iso(now_iso))
+    local = _try_fast_path(message, timezone, parsed)
+    if local is not None:
+        return local
+    key, cached = _cache_lookup(message, timezone, parsed)
+    if cached is not None:
+        return cached
+
+    def call() -> Tuple[IntentResult, Dict[str, Any]]:
+        result, debug_meta = _interpret_llm(message, timezone, now_iso, parsed)
+        _cache_store(key, result, debug_meta, parsed)
+        return result, debug_meta
+
+    if not settings.single_flight_enabled:
+        return call()
+    return _shared_copy(*_single_flight.do(flight_key(message, timezone, parsed.now), call))
+
+
+async def interpret_intent_async(
+    message: str, timezone: str, now_iso: str, parsed: Optional[ParsedMessage] = None
+) -> Tuple[IntentResult, Dict[str, Any]]:
+    """
+    Async twin of interpret_intent: uses the SDK's aio client and asyncio.sleep backoff
+    so a slow Gemini call never blocks the event loop. A sampled share of local answers
+    is also sent to Gemini in the background to measure agreement.
+    Returns (IntentResult, debug_meta)
+    """
+    if parsed is None:
+        parsed = ParsedMessage.parse(message, timezone, _now_from_iso(now_iso))
+    local = _try_fast_path(message, timezone, parsed)
+    if local is not None:
+        if _sampled():
+            task = asyncio.create_task(_shadow_check(message, timezone, now_iso, local[0]))
+            _shadow_tasks.add(task)
+            task.add_done_callback(_shadow_tasks.discard)
+        return local
+    key, cached = _cache_lookup(message, timezone, parsed)
+    if cached is not None:
+        return cached
+
+    async def call() -> Tuple[IntentResult, Dict[str, Any]]:
+        result, debug_meta = await _interpret_llm_async(message, timezone, now_iso, parsed)
+        _cache_store(key, result, debug_meta, parsed)
+        return result, debug_meta
+
+    if not settings.single_flight_enabled:
+        return await call()
+    return _shared_copy(*await _single_flight.do_async(flight_key(message, timezone, parsed.now), call))
@@ -1,18 +1,145 @@
+import asyncio
 import os
-import itertools
+import threading
 import time
-from dataclasses import dataclass
-from typing import List, Optional
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import httpx
+from google import genai
+from google.genai import types
+
+from app.settings import settings
+
+_MIN_WAIT = 0.005  # floor for capacity sleeps, so float rounding never spins the loop
+_LATENCY_ALPHA = 0.2  # EWMA weight of the newest call
+
+
+def _http_limits() -> httpx.Limits:
+    # One keep-alive pool per key keeps the TLS session warm between chat turns
+    # instead of re-handshaking per request.
+    return httpx.Limits(
+        max_connections=settings.gemini_http_max_connections,
+        max_keepalive_connections=settings.gemini_http_max_keepalive,
+        keepalive_expiry=settings.gemini_http_keepalive_expiry,
+    )
+
+
+def _open_connections(http_client: Any) -> int:
+    # httpx does not expose pool size publicly; read httpcore's pool defensively
+    pool = getattr(getattr(http_client, "_transport", None), "_pool", None)
+    conns = getattr(pool, "connections", None)
+    return len(conns) if conns is not None else 0
+
+
+class _TokenBucket:
+    """
+    Per-minute quota as a token bucket: starts full, refills continuously at
+    `per_minute / 60` per second. Usage reported after the fact may push it
+    below zero, which simply delays the next grant.
+    """
+
+    __slots__ = ("capacity", "rate", "tokens", "updated")
+
+    def __init__(self, per_minute: int, now: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = now
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def headroom(self, now: float) -> float:
+        self._refill(now)
+        return max(self.tokens, 0.0) / self.capacity
+
+    def wait(self, n: float, now: float) -> float:
+        """Seconds until `n` tokens are there (a request bigger than the bucket waits for a full one)."""
+        self._refill(now)
+        n = min(n, self.capacity)
+        return 0.0 if self.tokens >= n else (n - self.tokens) / self.rate
+
+    def take(self, n: float) -> None:
+        self.tokens = max(self.tokens - n, -self.capacity)
+
+
+@dataclass(frozen=True)
+class KeyHandle:
+    """A key as handed out by the pool; `index` is its fixed position in `keys`."""
+
+    index: int
+    key: str
+
+
+class _KeyState:
+    __slots__ = (
+        "rpm", "tpm", "cooldown_until",
+        "in_flight", "successes", "failures", "errors", "latency_ewma_ms", "last_error_type",
+    )
+
+    def __init__(self, rpm_limit: int, tpm_limit: int, now: float):
+        self.rpm = _TokenBucket(rpm_limit, now) if rpm_limit > 0 else None
+        self.tpm = _TokenBucket(tpm_limit, now) if tpm_limit > 0 else None
+        self.cooldown_until = 0.0
+        self.in_flight = 0
+        self.successes = 0
+        self.failures = 0
+        self.errors: Dict[str, int] = {}
+        self.latency_ewma_ms: Optional[float] = None
+        self.last_error_type: Optional[str] = None
+
+    def observe_latency(self, seconds: float) -> None:
+        ms = seconds * 1000.0
+        prev = self.latency_ewma_ms
+        self.latency_ewma_ms = ms if prev is None else prev + _LATENCY_ALPHA * (ms - prev)
+
+    def wait(self, tokens: float, now: float) -> float:
+        wait = max(self.cooldown_until - now, 0.0)
+        if self.rpm is not None:
+            wait = max(wait, self.rpm.wait(1, now))
+        if self.tpm is not None:
+            wait = max(wait, self.tpm.wait(tokens, now))
+        return wait
+
+    def headroom(self, now: float) -> float:
+        # the scarcer of the two quotas decides how loaded the key is
+        return min((b.headroom(now) for b in (self.rpm, self.tpm) if b is not None), default=1.0)
+
+
+@dataclass
+class _ClientEntry:
+    client: Any
+    http_client: httpx.Client
+    async_http_client: httpx.AsyncClient
+    created_at: float = field(default_factory=time.time)
+    uses: int = 0
 
 
 @dataclass
 class GeminiKeyPool:
     keys: List[str]
     cooldown_seconds: int = 15
+    base_url: Optional[str] = None
+    rpm_limit: int = 0  # requests per minute per key; 0 = not enforced locally
+    tpm_limit: int = 0  # tokens per minute per key; 0 = not enforced locally
 
     def __post_init__(self):
-        self._cycle = itertools.cycle(self.keys)
-        self._cooldowns = {k: 0.0 for k in self.keys}  # unix timestamp when key is usable again
+        now = time.monotonic()
+        self._lock = threading.Lock()
+        self._handles = [KeyHandle(i, k) for i, k in enumerate(self.keys)]
+        self._states = [_KeyState(self.rpm_limit, self.tpm_limit, now) for _ in self.keys]
+        self._rr = 0
+        self._acquired = 0
+        self._waits = 0
+        self._wait_seconds = 0.0
+        self._capacity_timeouts = 0
+        self._retry_after_cooldowns = 0
+        self._clients: Dict[str, _ClientEntry] = {}
+        self._clients_lock = threading.Lock()
+        self._clients_created = 0
+        self._client_requests = 0
 
     @staticmethod
     def from_env() -> "GeminiKeyPool":
@@ -20,16 +147,244 @@ class GeminiKeyPool:
         keys = [k.strip() for k in raw.split(",") if k.strip()]
         if not keys:
             raise RuntimeError("GEMINI_API_KEYS is not set or empty")
-        return GeminiKeyPool(keys=keys)
-
-    def next_key(self) -> str:
-        # try at most len(keys) times to find a non-cooled-down key
-        for _ in range(len(self.keys)):
-            k = next(self._cycle)
-            if time.time() >= self._cooldowns.get(k, 0.0):
-                return k
-        # if all keys are cooling down, just return next (caller can sleep or fallback)
-        return next(self._cycle)
-
-    def cool_down(self, key: str, seconds: Optional[int] = None) -> None:
-        self._cooldowns[key] = time.time() + float(seconds or self.cooldown_seconds)
+        return GeminiKeyPool(
+            keys=keys,
+            base_url=os.getenv("GEMINI_BASE_URL") or None,
+            rpm_limit=int(os.getenv("GEMINI_RPM_PER_KEY", "0")),
+            tpm_limit=int(os.getenv("GEMINI_TPM_PER_KEY", "0")),
+        )
+
+    # -----------------------------------------------------
+    # Capacity scheduling
+    # -----------------------------------------------------
+
+    def _try_acquire(self, tokens: float) -> Tuple[Optional[KeyHandle], float]:
+        """(handle, 0) for the least-loaded key that can take the call now, else (None, seconds to wait)."""
+        now = time.monotonic()
+        with self._lock:
+            n = len(self._states)
+            best, best_load, soonest = -1, None, float("inf")
+            # start after the last pick so equally loaded keys still take turns
+            for i in range(n):
+                idx = (self._rr + i) % n
+                state = self._states[idx]
+                wait = state.wait(tokens, now)
+                if wait > 0:
+                    soonest = min(soonest, wait)
+                    continue
+                load = (-state.headroom(now), state.in_flight)
+                if best_load is None or load < best_load:
+                    best, best_load = idx, load
+            if best < 0:
+                return None, soonest
+            state = self._states[best]
+            if state.rpm is not None:
+                state.rpm.take(1)
+            if state.tpm is not None:
+                state.tpm.take(tokens)
+            state.in_flight += 1
+            self._rr = (best + 1) % n
+            self._acquired += 1
+            return self._handles[best], 0.0
+
+    def acquire(self, tokens: float = 0, timeout: float = 0.0) -> Optional[KeyHandle]:
+        """
+        Reserve one request and `tokens` estimated tokens on the least-loaded key,
+        sleeping for capacity up to `timeout` seconds. None when no key frees up in
+        time; the caller should fall back rather than send a call bound to fail.
+        Every handle returned must be settled with `record_success`, `record_failure`
+        or, when the call never got an answer (cancelled), `release`.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            key, wait = self._try_acquire(tokens)
+            if key is not None:
+                return key
+            if not self._should_wait(wait, deadline):
+                return None
+            time.sleep(max(wait, _MIN_WAIT))
+
+    async def acquire_async(self, tokens: float = 0, timeout: float = 0.0) -> Optional[KeyHandle]:
+        """Async twin of `acquire`: waits for capacity with asyncio.sleep."""
+        deadline = time.monotonic() + timeout
+        while True:
+            key, wait = self._try_acquire(tokens)
+            if key is not None:
+                return key
+            if not self._should_wait(wait, deadline):
+                return None
+            await asyncio.sleep(max(wait, _MIN_WAIT))
+
+    def _should_wait(self, wait: float, deadline: float) -> bool:
+        with self._lock:
+            # no point sleeping if capacity only comes back after the deadline
+            if time.monotonic() + wait > deadline:
+                self._capacity_timeouts += 1
+                return False
+            self._waits += 1
+            self._wait_seconds += wait
+            return True
+
+    def record_success(self, handle: KeyHandle, latency_seconds: float, extra_tokens: float = 0) -> None:
+        """
+        Settle a call that succeeded. `extra_tokens` corrects the TPM bucket once the
+        real token count is known (positive = more than estimated).
+        """
+        with self._lock:
+            state = self._states[handle.index]
+            state.in_flight = max(state.in_flight - 1, 0)
+            state.successes += 1
+            state.observe_latency(latency_seconds)
+            if state.tpm is not None and extra_tokens:
+                state.tpm.take(extra_tokens)
+
+    def record_failure(self, handle: KeyHandle, error_type: str, latency_seconds: Optional[float] = None) -> None:
+        with self._lock:
+            state = self._states[handle.index]
+            state.in_flight = max(state.in_flight - 1, 0)
+            state.failures += 1
+            state.errors[error_type] = state.errors.get(error_type, 0) + 1
+            state.last_error_type = error_type
+            if latency_seconds is not None:
+                state.observe_latency(latency_seconds)
+
+    def release(self, handle: KeyHandle) -> None:
+        """Settle a call abandoned by its caller: frees the slot, says nothing about the key."""
+        with self._lock:
+            state = self._states[handle.index]
+            state.in_flight = max(state.in_flight - 1, 0)
+
+    def cool_down(self, handle: KeyHandle, seconds: Optional[float] = None) -> None:
+        """
+        Keep the key out of rotation for `seconds` (a server retry-after hint) or the
+        default cooldown. Meant for quota errors: other failures say nothing about
+        the key's remaining quota.
+        """
+        with self._lock:
+            state = self._states[handle.index]
+            if seconds:
+                self._retry_after_cooldowns += 1
+            until = time.monotonic() + float(seconds or self.cooldown_seconds)
+            state.cooldown_until = max(state.cooldown_until, until)
+
+    def capacity_stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            per_key = []
+            for i, state in enumerate(self._states):
+                per_key.append(
+                    {
+                        "index": i,
+                        "headroom": round(state.headroom(now), 4),
+                        "cooling_for": round(max(state.cooldown_until - now, 0.0), 2),
+                        "rpm_available": None if state.rpm is None else int(state.rpm.tokens),
+                        "tpm_available": None if state.tpm is None else int(state.tpm.tokens),
+                    }
+                )
+            return {
+                "rpm_limit": self.rpm_limit,
+                "tpm_limit": self.tpm_limit,
+                "acquired": self._acquired,
+                "capacity_waits": self._waits,
+                "capacity_wait_seconds": round(self._wait_seconds, 3),
+                "capacity_timeouts": self._capacity_timeouts,
+                "retry_after_cooldowns": self._retry_after_cooldowns,
+                "keys": per_key,
+            }
+
+    def health_stats(self) -> Dict[str, Any]:
+        """Per-key outcome counts, success rate and latency EWMA, by stable index (keys themselves are never shown)."""
+        now = time.monotonic()
+        with self._lock:
+            per_key = []
+            for i, state in enumerate(self._states):
+                calls = state.successes + state.failures
+                per_key.append(
+                    {
+                        "index": i,
+                        "calls": calls,
+                        "successes": state.successes,
+                        "failures": state.failures,
+                        "success_rate": round(state.successes / calls, 4) if calls else None,
+                        "latency_ewma_ms": None if state.latency_ewma_ms is None else round(state.latency_ewma_ms, 1),
+                        "errors": dict(state.errors),
+                        "last_error_type": state.last_error_type,
+                        "in_flight": state.in_flight,
+                        "cooling_for": round(max(state.cooldown_until - now, 0.0), 2),
+                    }
+                )
+            return {"keys_count": len(per_key), "keys": per_key}
+
+    # -----------------------------------------------------
+    # Client registry
+    # -----------------------------------------------------
+
+    def _build_client(self, key: str) -> _ClientEntry:
+        timeout = settings.gemini_http_timeout_seconds
+        http_client = httpx.Client(limits=_http_limits(), timeout=timeout)
+        async_http_client = httpx.AsyncClient(limits=_http_limits(), timeout=timeout)
+        http_options = types.HttpOptions(
+            base_url=self.base_url,
+            httpx_client=http_client,
+            httpx_async_client=async_http_client,
+        )
+        client = genai.Client(api_key=key, http_options=http_options)
+        return _ClientEntry(client=client, http_client=http_client, async_http_client=async_http_client)
+
+    def client_for(self, key: Union[str, KeyHandle]):
+        """
+        Return the shared genai.Client for `key` (a key or its handle), creating it on first use.
+        The client owns keep-alive httpx pools (sync and async), so later calls reuse
+        warm connections.
+        """
+        if isinstance(key, KeyHandle):
+            key = key.key
+        with self._clients_lock:
+            self._client_requests += 1
+            entry = self._clients.get(key)
+            if entry is None:
+                entry = self._build_client(key)
+                self._clients[key] = entry
+                self._clients_created += 1
+            entry.uses += 1
+            return entry.client
+
+    def _take_clients(self) -> List[_ClientEntry]:
+        with self._clients_lock:
+            entries = list(self._clients.values())
+            self._clients.clear()
+        for entry in entries:
+            try:
+                entry.http_client.close()
+            except Exception:
+                pass
+        return entries
+
+    def close_clients(self) -> None:
+        """Drop every client and close the sync pools; async pools need aclose_clients()."""
+        self._take_clients()
+
+    async def aclose_clients(self) -> None:
+        """Drop every client and close both its sync and async pools (app shutdown)."""
+        for entry in self._take_clients():
+            try:
+                await entry.async_http_client.aclose()
+            except Exception:
+                pass
+
+    def client_stats(self) -> Dict[str, Any]:
+        with self._clients_lock:
+            entries = dict(self._clients)
+            created = self._clients_created
+            requests = self._client_requests
+        reused = max(requests - created, 0)
+        return {
+            "clients": len(entries),
+            "clients_created": created,
+            "client_requests": requests,
+            "reuse_ratio": round(reused / requests, 4) if requests else 0.0,
+            "open_connections": sum(
+                _open_connections(e.http_client) + _open_connections(e.async_http_client)
+                for e in entries.values()
+            ),
+        }
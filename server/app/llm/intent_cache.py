@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.utils.arabic_normalizer import normalize
+
+_SPACES_RE = re.compile(r"\s+")
+_TRAILING_PUNCT = " .!?؟،,"
+
+CacheKey = Tuple[str, str, int]
+
+
+def message_key(message: str) -> str:
+    """Cache identity of a message: normalized, lowercased, whitespace and trailing punctuation folded."""
+    return _SPACES_RE.sub(" ", normalize(message or "").lower()).strip(_TRAILING_PUNCT)
+
+
+class _Entry:
+    __slots__ = ("result", "anchored", "expires_at")
+
+    def __init__(self, result: Any, anchored: bool, expires_at: float):
+        self.result = result
+        self.anchored = anchored
+        self.expires_at = expires_at
+
+
+class IntentCache:
+    """
+    LRU + TTL cache of model intent results, keyed by (normalized message, timezone,
+    time bucket). The bucket is the local time divided into `bucket_seconds` slots,
+    so "بكرة" asked today and tomorrow never share an entry.
+
+    A result whose due is resolved to an absolute time is only cached when the
+    local parser also found a due in the message ("anchored"): on a hit the due is
+    re-anchored to the current request's parse instead of replaying the stored
+    instant. Resolved results the local parser cannot reproduce are not cached.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, bucket_seconds: float):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.bucket_seconds = max(bucket_seconds, 1.0)
+        self._entries: "OrderedDict[CacheKey, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.reanchored = 0
+        self.bypassed_resolved = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def key(self, message: str, timezone: str, now: datetime) -> CacheKey:
+        offset = now.utcoffset()
+        local_ts = now.timestamp() + (offset.total_seconds() if offset else 0.0)
+        return message_key(message), timezone or "UTC", int(local_ts // self.bucket_seconds)
+
+    def get(self, key: CacheKey, reanchor: Callable[[Any], Optional[Any]]) -> Optional[Any]:
+        """
+        Cached result for `key`, or None. Anchored entries go through `reanchor`,
+        which returns the result with its due recomputed for this request (or
+        None if it cannot, which counts as a miss).
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= now:
+                del self._entries[key]
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+        if entry.anchored:
+            result = reanchor(entry.result)
+            with self._lock:
+                if result is None:
+                    self.misses += 1
+                    return None
+                self.hits += 1
+                self.reanchored += 1
+            return result
+        with self._lock:
+            self.hits += 1
+        return entry.result
+
+    def put(self, key: CacheKey, result: Any, resolved: bool, anchorable: bool) -> bool:
+        if resolved and not anchorable:
+            with self._lock:
+                self.bypassed_resolved += 1
+            return False
+        with self._lock:
+            self._entries[key] = _Entry(result, resolved, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            self.stores += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "bucket_seconds": self.bucket_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "stores": self.stores,
+                "reanchored": self.reanchored,
+                "bypassed_resolved": self.bypassed_resolved,
+                "expired": self.expired,
+                "evicted": self.evicted,
+            }
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from app.llm.intent_cache import message_key
+
+FlightKey = Tuple[str, str, int]
+
+
+def flight_key(message: str, timezone: str, now: datetime) -> FlightKey:
+    """(normalized message, timezone, local minute): what makes two calls interchangeable."""
+    offset = now.utcoffset()
+    local_ts = now.timestamp() + (offset.total_seconds() if offset else 0.0)
+    return message_key(message), timezone or "UTC", int(local_ts // 60)
+
+
+class _Call:
+    __slots__ = ("done", "value", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one: the first caller
+    (the leader) runs the work, callers arriving while it is in flight wait for
+    its result instead of starting their own. Nothing is remembered once the
+    call finishes; that is the intent cache's job.
+
+    The async side runs the work as a task and every caller awaits it shielded,
+    so a leader whose request is cancelled does not cancel its followers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._tasks: Dict[Hashable, "asyncio.Task"] = {}
+        self._waiters: Dict[Hashable, int] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.max_waiters = 0
+
+    def _joined(self, waiters: int) -> None:
+        self.coalesced += 1
+        self.max_waiters = max(self.max_waiters, waiters)
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run `fn` once per in-flight `key`; returns (value, shared)."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                call.waiters += 1
+                self._joined(call.waiters)
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+        try:
+            call.value = fn()
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.value, False
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Async twin of `do`; callers share one task per in-flight `key` and event loop."""
+        loop = asyncio.get_running_loop()
+        key = (key, id(loop))
+        with self._lock:
+            task = self._tasks.get(key)
+            shared = task is not None
+            if shared:
+                self._waiters[key] += 1
+                self._joined(self._waiters[key])
+            else:
+                task = self._tasks[key] = loop.create_task(fn())
+                self._waiters[key] = 0
+                self.leaders += 1
+                task.add_done_callback(lambda t, k=key: self._finished(k, t))
+        return await asyncio.shield(task), shared
+
+    def _finished(self, key: Hashable, task: "asyncio.Task") -> None:
+        with self._lock:
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+                del self._waiters[key]
+            if task.cancelled() or task.exception() is not None:
+                self.errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = self.leaders + self.coalesced
+            return {
+                "in_flight": len(self._calls) + len(self._tasks),
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+                "coalesced_rate": round(self.coalesced / calls, 4) if calls else 0.0,
+                "llm_calls_saved": self.coalesced,
+                "max_waiters": self.max_waiters,
+                "errors": self.errors,
+            }
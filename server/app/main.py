@@ -3,6 +3,8 @@ from __future__ import annotations
 from dotenv import load_dotenv
 load_dotenv()
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
@@ -13,7 +15,9 @@ from app.routes.health import router as health_router
 from app.routes.chat import router as chat_router
 from app.middlewares.request_id import RequestIdMiddleware
 from app.middlewares.auth import AuthMiddleware
+from app.middlewares.idempotency import IdempotencyMiddleware
 from app.core.logging import log_middleware
+from app.llm.gemini_adapter import close_key_pool
 from app.core.errors import (
     validation_exception_handler,
     unhandled_exception_handler,
@@ -32,12 +36,22 @@ class UTF8JSONResponse(JSONResponse):
             separators=(",", ":"),
         ).encode("utf-8")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # the async Gemini pools belong to this event loop: close them before it stops
+    await close_key_pool()
+
+
 app = FastAPI(
     title="AI Tasks Chatbot",
-    default_response_class=UTF8JSONResponse
+    default_response_class=UTF8JSONResponse,
+    lifespan=lifespan,
 )
 
 # --- Middlewares ---
+# added first = innermost: replays only ever happen after auth and request-id ran
+app.add_middleware(IdempotencyMiddleware)
 app.add_middleware(RequestIdMiddleware)
 app.add_middleware(AuthMiddleware)
 app.middleware("http")(log_middleware)
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import Request
+
+from app.core.errors import json_error
+from app.settings import settings
+
+IdemKey = Tuple[str, str]
+
+_REPLAY_HEADER = (b"idempotent-replayed", b"true")
+
+
+class _Stored:
+    __slots__ = ("fingerprint", "status", "headers", "body", "expires_at", "done")
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.status = 0
+        self.headers: List[Tuple[bytes, bytes]] = []
+        self.body = b""
+        self.expires_at = 0.0
+        self.done = asyncio.Event()
+
+
+class IdempotencyStore:
+    """
+    Finished /v1/chat responses per (userId, requestId), kept for `ttl_seconds`
+    and bounded to `max_entries` (least recently used dropped first). An entry
+    exists from the moment the original request starts, so a retry arriving
+    mid-flight waits for it instead of running the turn a second time.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._entries: "OrderedDict[IdemKey, _Stored]" = OrderedDict()
+        self.stores = 0
+        self.replays = 0
+        self.waited = 0
+        self.conflicts = 0
+        self.abandoned = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def claim(self, key: IdemKey, fingerprint: str) -> Tuple[_Stored, bool]:
+        """(entry, owner): owner is True when this caller must run the request."""
+        entry = self._entries.get(key)
+        if entry is not None and entry.done.is_set() and entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expired += 1
+            entry = None
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry, False
+        entry = self._entries[key] = _Stored(fingerprint)
+        return entry, True
+
+    def finish(self, key: IdemKey, entry: _Stored, status: int, headers, body: bytes) -> None:
+        entry.status, entry.headers, entry.body = status, list(headers), body
+        entry.expires_at = time.monotonic() + self.ttl
+        entry.done.set()
+        self.stores += 1
+        while len(self._entries) > self.max_entries:
+            oldest_key, oldest = next(iter(self._entries.items()))
+            if not oldest.done.is_set():
+                break  # never drop an in-flight original; its waiters hold it
+            del self._entries[oldest_key]
+            self.evicted += 1
+
+    def abandon(self, key: IdemKey, entry: _Stored) -> None:
+        # the original failed without a response worth replaying: let the next retry run
+        if self._entries.get(key) is entry:
+            del self._entries[key]
+        self.abandoned += 1
+        entry.done.set()
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        in_progress = sum(1 for e in self._entries.values() if not e.done.is_set())
+        return {
+            "enabled": settings.idempotency_enabled,
+            "size": len(self._entries),
+            "in_progress": in_progress,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "stores": self.stores,
+            "replays": self.replays,
+            "waited": self.waited,
+            "conflicts": self.conflicts,
+            "abandoned": self.abandoned,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+
+idempotency_store = IdempotencyStore(
+    max_entries=settings.idempotency_max_entries,
+    ttl_seconds=settings.idempotency_ttl_seconds,
+)
+
+
+def _request_key(body: bytes) -> Optional[Tuple[IdemKey, str]]:
+    """(key, fingerprint) for a replayable body, else None. The fingerprint is taken
+    over canonical JSON, so a retry serialized with other key order or spacing matches."""
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    user_id, request_id = data.get("userId"), data.get("requestId")
+    if not isinstance(user_id, str) or not isinstance(request_id, str) or not request_id:
+        return None
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return (user_id, request_id), hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class IdempotencyMiddleware:
+    """
+    Replays the stored response for a repeated (userId, requestId) on POST /v1/chat
+    byte for byte, so client retries never re-run the pipeline or create a task
+    twice. Responses with a 5xx status are not kept, nor turns the route flagged
+    as failed (`request.state.chat_failed`: it answers internal errors with a 200
+    asking the user to try again). A retry whose body differs from the original
+    gets 409.
+
+    Plain ASGI rather than BaseHTTPMiddleware: it has to read the request body
+    and hand it on, and capture the response body as it is sent.
+    """
+
+    def __init__(self, app, store: Optional[IdempotencyStore] = None):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"] != "/v1/chat"
+            or not settings.idempotency_enabled
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        body, more = b"", True
+        while more:
+            message = await receive()
+            if message["type"] != "http.request":
+                await self.app(scope, receive, send)  # disconnected before the body arrived
+                return
+            body += message.get("body", b"")
+            more = message.get("more_body", False)
+
+        replayed = False
+
+        async def replay_receive():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        parsed = _request_key(body)
+        if parsed is None:
+            await self.app(scope, replay_receive, send)
+            return
+
+        key, fingerprint = parsed
+        store = self.store or idempotency_store
+        while True:
+            entry, owner = store.claim(key, fingerprint)
+            if owner:
+                break
+            if entry.fingerprint != fingerprint:
+                store.conflicts += 1
+                response = json_error(Request(scope), 409, "invalid_request", "ERR_IDEMPOTENCY_CONFLICT")
+                await response(scope, replay_receive, send)
+                return
+            if not entry.done.is_set():
+                store.waited += 1
+                await entry.done.wait()
+                if not entry.status:
+                    continue  # the original was abandoned; claim again
+            store.replays += 1
+            scope.setdefault("state", {})["user_id"] = key[0]
+            await self._send(send, entry.status, entry.headers + [_REPLAY_HEADER], entry.body)
+            return
+
+        status, headers, chunks = 0, [], []
+
+        async def capture_send(message):
+            nonlocal status, headers
+            if message["type"] == "http.response.start":
+                status, headers = message["status"], message.get("headers", [])
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        except BaseException:
+            store.abandon(key, entry)
+            raise
+        if status and status < 500 and not scope.get("state", {}).get("chat_failed"):
+            store.finish(key, entry, status, headers, b"".join(chunks))
+        else:
+            store.abandon(key, entry)
+
+    @staticmethod
+    async def _send(send, status: int, headers, body: bytes) -> None:
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body, "more_body": False})
+
@@ -1,18 +1,22 @@
 ﻿from __future__ import annotations
 
 import logging
-from datetime import datetime
+import re
 
 from fastapi import APIRouter, Request
 
 from app.core.types import ChatRequest, ChatResponse
 from app.domain.executor import execute_intent
 from app.domain.reply_builder import build_reply
-from app.domain.tasks import TaskStore
+from app.domain.tasks import AsyncTaskStore, TaskStore
 from app.domain import conversation_state
+from app.domain.conversation_locks import conversation_locks
+from app.domain.state_backends import StateConflictError
 from app.utils.arabic_duration_parser import strip_duration_phrase, parse_duration_minutes, extract_duration_minutes_and_clean
 from app.utils.arabic_time_parser import extract_due_datetime_and_clean
-from app.llm.gemini_adapter import interpret_intent
+from app.utils.clock import RequestClock
+from app.utils.parsed_message import ParsedMessage
+from app.llm.gemini_adapter import interpret_intent_async
 from app.settings import settings
 
 router = APIRouter()
@@ -27,6 +31,9 @@ CANCEL_PROMPT = "تم الإلغاء."
 LAST_ERROR = {}
 
 
+_UPCOMING_DAYS_RE = re.compile(r"(?:خلال|بال|في ال)\s*(\d+)\s*(?:ايام|أيام|يوم)")
+
+
 def _detect_list_scope(message: str) -> tuple[str, str]:
     """Return (status, scope) based on message hints."""
     lower = message.lower()
@@ -34,6 +41,16 @@ def _detect_list_scope(message: str) -> tuple[str, str]:
     scope = "all"
     if "اليوم" in lower or "اليوم" in message:
         scope = "today"
+    elif "الأسبوع" in lower or "الاسبوع" in lower:
+        scope = "week"
+    elif "متأخر" in lower or "متاخر" in lower or "فات موعد" in lower:
+        scope = "overdue"
+    else:
+        m = _UPCOMING_DAYS_RE.search(lower.translate(str.maketrans("٠١٢٣٤٥٦٧٨٩", "0123456789")))
+        if m:
+            scope = f"upcoming:{int(m.group(1))}"
+        elif "القادمة" in lower or "الجاية" in lower or "الجاي" in lower:
+            scope = "upcoming"
     if "منجزة" in lower or "مخلصة" in lower or "منجّزة" in lower:
         status = "done"
     if "الكل" in lower or "الجميع" in lower:
@@ -65,8 +82,8 @@ def _parse_choice(message: str, max_n: int) -> int | None:
     return idx if 1 <= idx <= max_n else None
 
 
-def _score_candidates(user_id: str, query: str):
-    matches = store.fuzzy_search_tasks(user_id, query, limit=5, status="all", scope="all")
+async def _score_candidates(astore: AsyncTaskStore, user_id: str, query: str):
+    matches = await astore.fuzzy_search_tasks(user_id, query, limit=5, status="all", scope="all")
     candidates = []
     for task, sim, overlap in matches:
         if sim < MIN_MATCH_THRESHOLD and overlap < 1:
@@ -111,7 +128,17 @@ async def chat(req: ChatRequest, request: Request):
     rid = req.requestId or getattr(request.state, "request_id", None) or ""
 
     conv_key = req.conversationId or req.requestId or req.userId
-    state = conversation_state.get_state(conv_key)
+    # one turn at a time per conversation: state reads and writes below must not interleave
+    async with conversation_locks.hold(conv_key):
+        response = await _chat_turn(req, rid, dialect, conv_key)
+    if not response.get("meta", {}).get("ok", True):
+        # still a 200 for the client, but not a result to replay on retry
+        request.state.chat_failed = True
+    return response
+
+
+async def _chat_turn(req: ChatRequest, rid: str, dialect: str, conv_key: str):
+    astore = AsyncTaskStore(store)
 
     action = None
     debug_meta = {
@@ -122,166 +149,51 @@ async def chat(req: ChatRequest, request: Request):
         "used_key_index": -1,
         "tokens_source": None,
     }
-    timezone = req.timezone or "UTC"
-    try:
-        import pytz
-
-        now_iso = datetime.now(pytz.timezone(timezone)).isoformat()
-    except Exception:
-        now_iso = datetime.utcnow().isoformat()
+    # zone resolved and "now" read once; everything below uses this clock
+    clock = RequestClock(req.timezone or "UTC")
+    timezone = clock.timezone
 
     text_message = req.message.strip()
-
-    def _parse_due_message(message: str):
-        now_dt = datetime.fromisoformat(now_iso)
-        due_dt, _ = extract_due_datetime_and_clean(message, timezone, now_dt)
-        return due_dt
-
-    def search_and_prompt(query: str):
-        cands = _score_candidates(req.userId, query)
-        if not cands:
-            conversation_state.update_state(
-                conv_key,
-                mode="delete",
-                step="ask_query",
-                delete_query=None,
-                candidates=[],
-                selected_task_id=None,
-            )
-            return {"type": "clarify", "payload": {"message": NO_MATCH_PROMPT}}
-
-        strong_single = len(cands) == 1 and cands[0]["score"] >= STRONG_MATCH_THRESHOLD
-        if strong_single:
-            sel = cands[0]
-            conversation_state.update_state(
-                conv_key,
-                mode="delete",
-                step="confirm",
-                delete_query=query,
-                candidates=[sel],
-                selected_task_id=sel["taskId"],
-            )
-            return {
-                "type": "clarify",
-                "payload": {
-                    "message": f"بدك أحذف: {sel['title']} ؟ (نعم/لا)",
-                    "candidates": [sel],
-                    "needsConfirmation": True,
-                },
-            }
-
-        conversation_state.update_state(
-            conv_key,
-            mode="delete",
-            step="show_candidates",
-            delete_query=query,
-            candidates=cands,
-            selected_task_id=None,
-        )
-        return {
-            "type": "clarify",
-            "payload": {"message": _format_candidates_message(cands), "candidates": cands},
-        }
-
-    def handle_delete_flow(user_message: str):
-        if _is_cancel(user_message):
-            conversation_state.clear_delete_state(conv_key)
-            return {"type": "clarify", "payload": {"message": CANCEL_PROMPT}}
-
-        if state.step in (None, "ask_query"):
-            return search_and_prompt(user_message)
-
-        if state.step == "show_candidates":
-            import re
-            cleaned = re.sub(r"^اختيار\s*[:：]?\s*", "", user_message.strip(), flags=re.IGNORECASE)
-            choice = _parse_choice(cleaned, len(state.candidates or []))
-            selected = None
-            if choice:
-                selected = (state.candidates or [])[choice - 1]
-            else:
-                # direct title/text match among current candidates only
-                for cand in state.candidates or []:
-                    if cleaned.lower() == cand.get("title", "").lower():
-                        selected = cand
-                        break
-            if selected:
-                conversation_state.update_state(
-                    conv_key,
-                    mode="delete",
-                    step="confirm",
-                    selected_task_id=selected.get("taskId"),
-                    candidates=[selected],
-                )
-                return {
-                    "type": "clarify",
-                    "payload": {
-                        "message": f"بدك أحذف: {selected.get('title', '')} ؟ (نعم/لا)",
-                        "candidates": [selected],
-                        "needsConfirmation": True,
-                    },
-                }
-            # no match, repeat options once
-            return {
-                "type": "clarify",
-                "payload": {"message": _format_candidates_message(state.candidates), "candidates": state.candidates},
-            }
-
-        if state.step == "confirm":
-            if _is_yes(user_message):
-                task_id = state.selected_task_id
-                if task_id:
-                    action_del = execute_intent(
-                        store=store,
-                        user_id=req.userId,
-                        intent="delete_task",
-                        entities={"task_id": task_id, "confirmed": True},
-                    )
-                else:
-                    action_del = {"type": "clarify", "payload": {"message": DELETE_QUERY_PROMPT}}
-                conversation_state.clear_delete_state(conv_key)
-                return action_del
-            if _is_no(user_message):
-                conversation_state.clear_delete_state(conv_key)
-                return {"type": "clarify", "payload": {"message": CANCEL_PROMPT}}
-            return {"type": "clarify", "payload": {"message": "بس أكد: نعم أو لا"}}
-
-        conversation_state.clear_delete_state(conv_key)
-        return {"type": "clarify", "payload": {"message": DELETE_QUERY_PROMPT}}
+    parsed = None
 
     try:
+        # every write below passes base=state: it only lands if no other worker
+        # saved this conversation since this read (StateConflictError otherwise)
+        state = await conversation_state.get_state_async(conv_key)
+
         # ---- 1) Handle ongoing delete flow ----
-        pending_op = getattr(state, "pending_op", {}) or {}
-        if pending_op.get("type") == "delete_task":
-            stage = pending_op.get("stage") or state.step
-            candidates_state = pending_op.get("candidates") or state.candidates or []
+        if state.delete_stage is not None:
+            stage = state.delete_stage
+            candidates_state = state.candidate_dicts()
 
-            def set_pending(stage, candidates=None, selected=None, query=None):
-                conversation_state.set_delete_pending(
+            async def set_pending(stage, candidates=None, selected=None, query=None):
+                await conversation_state.set_delete_pending_async(
                     conv_key,
                     candidates=candidates or candidates_state,
                     stage=stage,
                     selected=selected,
-                    query=query or pending_op.get("query"),
+                    query=query or state.delete_query,
+                    base=state,
                 )
 
-            if stage in (None, "awaiting_query", "ask_query"):
+            if stage == "awaiting_query":
                 # treat current message as query
-                cands = _score_candidates(req.userId, text_message)
+                cands = await _score_candidates(astore, req.userId, text_message)
                 if not cands:
-                    set_pending("awaiting_query", [])
+                    await set_pending("awaiting_query", [])
                     action = {
                         "type": "clarify",
                         "payload": {"message": "ما لقيت مهمة مشابهة… اكتب كلمة أدق من العنوان"},
                     }
                 elif len(cands) == 1 and cands[0]["score"] >= STRONG_MATCH_THRESHOLD:
                     sel = cands[0]
-                    set_pending("awaiting_confirm", [sel], sel["taskId"], text_message)
+                    await set_pending("awaiting_confirm", [sel], sel["taskId"], text_message)
                     action = {
                         "type": "clarify",
                         "payload": {"message": f"تأكيد: أحذف مهمة '{sel['title']}'؟ (نعم/لا)", "candidates": [sel]},
                     }
                 else:
-                    set_pending("awaiting_choice", cands, query=text_message)
+                    await set_pending("awaiting_choice", cands, query=text_message)
                     action = {
                         "type": "clarify",
                         "payload": {"message": _format_candidates_message(cands), "candidates": cands},
@@ -302,7 +214,7 @@ async def chat(req: ChatRequest, request: Request):
                             selected = cand
                             break
                 if selected:
-                    set_pending("awaiting_confirm", [selected], selected.get("taskId"))
+                    await set_pending("awaiting_confirm", [selected], selected.get("taskId"))
                     action = {
                         "type": "clarify",
                         "payload": {
@@ -312,7 +224,7 @@ async def chat(req: ChatRequest, request: Request):
                     }
                 else:
                     # repeat once
-                    set_pending("awaiting_choice", candidates_state)
+                    await set_pending("awaiting_choice", candidates_state)
                     action = {
                         "type": "clarify",
                         "payload": {"message": _format_candidates_message(candidates_state), "candidates": candidates_state},
@@ -321,31 +233,36 @@ async def chat(req: ChatRequest, request: Request):
 
             elif stage == "awaiting_confirm":
                 if _is_yes(text_message):
-                    task_id = pending_op.get("selected_task_id") or state.selected_task_id
+                    task_id = state.selected_task_id
                     if task_id:
-                        action = execute_intent(
-                            store=store,
+                        action = await execute_intent(
+                            store=astore,
                             user_id=req.userId,
                             intent="delete_task",
                             entities={"task_id": task_id, "confirmed": True},
                         )
                         # include title if we have it
-                        if pending_op.get("candidates"):
-                            action.setdefault("payload", {})["title"] = pending_op["candidates"][0].get("title")
+                        if candidates_state:
+                            action.setdefault("payload", {})["title"] = candidates_state[0]["title"]
                     else:
                         action = {"type": "clarify", "payload": {"message": DELETE_QUERY_PROMPT}}
-                    conversation_state.clear_delete_state(conv_key)
+                    await conversation_state.clear_delete_state_async(conv_key, base=state)
                 elif _is_no(text_message):
-                    conversation_state.clear_delete_state(conv_key)
+                    await conversation_state.clear_delete_state_async(conv_key, base=state)
                     action = {"type": "clarify", "payload": {"message": CANCEL_PROMPT}}
                 else:
                     action = {"type": "clarify", "payload": {"message": "بس جاوب نعم أو لا للتأكيد"}}
                 debug_meta.update({"llm_used": "delete_flow", "stage": "awaiting_confirm"})
 
+        # duration/due/title are parsed once here and shared by the follow-up, the
+        # rule-based extractor and the create branch below
+        if not action:
+            parsed = ParsedMessage.parse(req.message, timezone, clock.now)
+
         # ---- 2) Handle pending clarification (legacy create) ----
         if not action and state.pending and state.pending_intent == "create_task":
             if state.expected_field == "dueAt":
-                parsed_due_dt = _parse_due_message(text_message)
+                parsed_due_dt = parsed.due
                 if parsed_due_dt is None:
                     action = {"type": "clarify", "payload": {"message": state.entities.get("clarify_question") or "تمام—إمتى بدك أذكّرك؟"}}
                 else:
@@ -354,22 +271,22 @@ async def chat(req: ChatRequest, request: Request):
                         entities["due_at"] = int(parsed_due_dt.timestamp())
                     except Exception:
                         entities["due_at"] = None
-                    action = execute_intent(
-                        store=store,
+                    action = await execute_intent(
+                        store=astore,
                         user_id=req.userId,
                         intent="create_task",
                         entities=entities,
                     )
-                    conversation_state.clear_state(conv_key)
+                    await conversation_state.clear_state_async(conv_key, base=state)
                 debug_meta.update({"llm_used": "pending_followup", "tokens_source": "none"})
 
         # ---- 3) Fresh message -> LLM + fallback rule extractor ----
         if not action:
-            intent_result, debug_meta = interpret_intent(req.message, timezone, now_iso)
+            intent_result, debug_meta = await interpret_intent_async(req.message, timezone, clock.iso, parsed)
 
             if intent_result.intent == "delete_task":
                 # initialize pending
-                conversation_state.set_delete_pending(conv_key, stage="awaiting_query")
+                await conversation_state.set_delete_pending_async(conv_key, stage="awaiting_query", base=state)
                 query = (intent_result.title_query or "").strip()
                 if not query:
                     action = {
@@ -377,22 +294,22 @@ async def chat(req: ChatRequest, request: Request):
                         "payload": {"message": intent_result.clarify_question or DELETE_QUERY_PROMPT},
                     }
                 else:
-                    cands = _score_candidates(req.userId, query)
+                    cands = await _score_candidates(astore, req.userId, query)
                     if not cands:
-                        conversation_state.set_delete_pending(conv_key, stage="awaiting_query", candidates=[])
+                        await conversation_state.set_delete_pending_async(conv_key, stage="awaiting_query", candidates=[], base=state)
                         action = {
                             "type": "clarify",
                             "payload": {"message": "ما لقيت مهمة مشابهة… اكتب كلمة أدق من العنوان"},
                         }
                     elif len(cands) == 1 and cands[0]["score"] >= STRONG_MATCH_THRESHOLD:
                         sel = cands[0]
-                        conversation_state.set_delete_pending(conv_key, stage="awaiting_confirm", candidates=[sel], selected=sel["taskId"], query=query)
+                        await conversation_state.set_delete_pending_async(conv_key, stage="awaiting_confirm", candidates=[sel], selected=sel["taskId"], query=query, base=state)
                         action = {
                             "type": "clarify",
                             "payload": {"message": f"تأكيد: أحذف مهمة '{sel['title']}'؟ (نعم/لا)", "candidates": [sel]},
                         }
                     else:
-                        conversation_state.set_delete_pending(conv_key, stage="awaiting_choice", candidates=cands, query=query)
+                        await conversation_state.set_delete_pending_async(conv_key, stage="awaiting_choice", candidates=cands, query=query, base=state)
                         action = {
                             "type": "clarify",
                             "payload": {"message": _format_candidates_message(cands), "candidates": cands},
@@ -400,10 +317,18 @@ async def chat(req: ChatRequest, request: Request):
 
             elif intent_result.intent == "create_task":
                 raw_title = (intent_result.title or intent_result.title_query or "").strip()
-                duration_minutes, after_duration = extract_duration_minutes_and_clean(raw_title)
-                now_dt = datetime.fromisoformat(now_iso)
-                due_dt, cleaned_title = extract_due_datetime_and_clean(after_duration, timezone, now_dt)
-                title = cleaned_title
+                duration_minutes, due_dt = parsed.duration_minutes, parsed.due
+                if raw_title == parsed.title:
+                    # rule-based title: already cleaned of duration and due phrases
+                    title = raw_title
+                else:
+                    # model-written title may still carry them; the message-level values win
+                    title_duration, after_duration = extract_duration_minutes_and_clean(raw_title)
+                    title_due, title = extract_due_datetime_and_clean(after_duration, timezone, clock.now)
+                    if duration_minutes is None:
+                        duration_minutes = title_duration
+                    if due_dt is None:
+                        due_dt = title_due
                 if not title:
                     action = {"type": "clarify", "payload": {"key": "clarify_missing_title"}}
                 else:
@@ -416,27 +341,27 @@ async def chat(req: ChatRequest, request: Request):
                     if duration_minutes is not None:
                         entities["duration_minutes"] = duration_minutes
 
-                    action = execute_intent(
-                        store=store,
+                    action = await execute_intent(
+                        store=astore,
                         user_id=req.userId,
                         intent="create_task",
                         entities=entities,
                     )
-                    conversation_state.clear_state(conv_key)
+                    await conversation_state.clear_state_async(conv_key, base=state)
 
             elif intent_result.intent == "list_tasks":
                 status, scope = _detect_list_scope(req.message)
-                entities = {"status": status, "scope": scope, "timezone": timezone}
-                action = execute_intent(
-                    store=store,
+                entities = {"status": status, "scope": scope, "timezone": timezone, "now": clock.ts}
+                action = await execute_intent(
+                    store=astore,
                     user_id=req.userId,
                     intent="list_tasks",
                     entities=entities,
                 )
 
             elif intent_result.intent == "update_task":
-                action = execute_intent(
-                    store=store,
+                action = await execute_intent(
+                    store=astore,
                     user_id=req.userId,
                     intent="update_task",
                     entities={"task_title": intent_result.title_query},
@@ -461,6 +386,8 @@ async def chat(req: ChatRequest, request: Request):
         ]
 
         meta = debug_meta or {}
+        if parsed is not None:
+            meta["parse"] = parsed.timings
 
         logging.info(
             f"REQ:{rid} intent:{debug_meta.get('llm_used')} action:{action.get('type')}"
@@ -476,6 +403,11 @@ async def chat(req: ChatRequest, request: Request):
             "meta": {**meta, "ok": True},
         }
 
+    except StateConflictError as exc:
+        # another worker moved this conversation on mid-turn; nothing of this turn was saved
+        logging.warning(f"Chat state conflict rid={rid}: {exc}")
+        return build_error_response(rid, exc, "STATE_CONFLICT")
+
     except Exception as exc:
         error_code = "UNKNOWN"
         LAST_ERROR.update({
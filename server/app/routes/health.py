@@ -1,6 +1,17 @@
 from fastapi import APIRouter
 from app.settings import settings
 from app.routes import chat
+from app.llm.gemini_adapter import (
+    fast_path_stats,
+    intent_cache_stats,
+    key_pool_health,
+    key_pool_stats,
+    single_flight_stats,
+)
+from app.domain.tasks import default_store_pool
+from app.domain import conversation_state
+from app.domain.conversation_locks import conversation_locks
+from app.middlewares.idempotency import idempotency_store
 
 router = APIRouter()
 
@@ -19,3 +30,44 @@ def health_v1():
 @router.get("/v1/debug/last-error")
 def last_error():
     return chat.LAST_ERROR or {"ok": True}
+
+@router.get("/v1/debug/gemini-pool")
+def gemini_pool():
+    return key_pool_stats()
+
+@router.get("/v1/debug/keypool")
+def keypool_health():
+    return key_pool_health()
+
+@router.get("/v1/debug/task-store")
+def task_store():
+    return {"pool": default_store_pool().stats(), "cache": chat.store.cache.stats()}
+
+
+@router.get("/v1/debug/conversation-state")
+def conversation_state_stats():
+    return conversation_state.stats()
+
+@router.get("/v1/debug/conversation-locks")
+def conversation_lock_stats():
+    return conversation_locks.stats()
+
+
+@router.get("/v1/debug/fast-path")
+def fast_path():
+    return fast_path_stats()
+
+
+@router.get("/v1/debug/intent-cache")
+def intent_cache():
+    return intent_cache_stats()
+
+
+@router.get("/v1/debug/single-flight")
+def single_flight():
+    return single_flight_stats()
+
+
+@router.get("/v1/debug/idempotency")
+def idempotency():
+    return idempotency_store.stats()
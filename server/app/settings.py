@@ -12,10 +12,63 @@ class Settings(BaseModel):
     # Gemini
     gemini_api_key: str = ""
     gemini_model: str = "gemini-1.5-flash"
+    gemini_capacity_wait_seconds: float = 2.0  # longest wait for a key with quota left before falling back
+
+    # Keep-alive HTTP pools per Gemini key (one sync and one async client each)
+    gemini_http_max_connections: int = 20
+    gemini_http_max_keepalive: int = 10
+    gemini_http_keepalive_expiry: float = 60.0
+    gemini_http_timeout_seconds: float = 30.0
     
     # Mock Mode (bypasses LLM)
     mock_llm: bool = False
 
+    # Task store backend (firestore | memory) + optional fault injection
+    task_store_backend: str = "firestore"
+    task_store_latency_ms: float = 0.0
+    task_store_jitter_ms: float = 0.0
+    task_store_failure_rate: float = 0.0
+
+    # Task store thread pool (AsyncTaskStore)
+    task_store_max_workers: int = 16
+    task_store_max_pending: int = 256
+
+    # Per-user task snapshot cache (TaskStore)
+    task_cache_max_bytes: int = 64 * 1024 * 1024
+    task_cache_ttl_seconds: float = 120.0
+
+    # Conversation state store (memory | sqlite | redis)
+    conversation_state_backend: str = "memory"
+    conversation_state_sqlite_path: str = "conversation_state.db"
+    conversation_state_redis_url: str = "redis://127.0.0.1:6379/0"
+    conversation_state_max: int = 100_000
+    conversation_state_ttl_seconds: float = 1800.0
+    conversation_state_sweep_seconds: float = 30.0
+
+    # Per-conversation turn locks
+    conversation_lock_max_entries: int = 10_000
+    conversation_lock_stripes: int = 64
+
+    # Rule-based fast path: confident local answers skip Gemini
+    rule_fast_path_enabled: bool = True
+    rule_fast_path_min_confidence: float = 0.8
+    rule_fast_path_intents: str = "list_tasks,delete_task,create_task"
+    rule_fast_path_sample_rate: float = 0.0  # share of local answers also checked against Gemini
+
+    # Gemini intent result cache (normalized message + timezone + time bucket)
+    intent_cache_enabled: bool = True
+    intent_cache_max_entries: int = 10_000
+    intent_cache_ttl_seconds: float = 600.0
+    intent_cache_bucket_seconds: float = 3600.0
+
+    # Identical messages in flight at once share one Gemini call
+    single_flight_enabled: bool = True
+
+    # /v1/chat responses replayed for a repeated (userId, requestId)
+    idempotency_enabled: bool = True
+    idempotency_max_entries: int = 10_000
+    idempotency_ttl_seconds: float = 900.0
+
 
 def _env(name: str) -> str:
     v = os.getenv(name, "")
@@ -32,8 +85,41 @@ def load_settings() -> Settings:
     return Settings(
         gemini_api_key=gemini_key,
         gemini_model=os.getenv("GEMINI_MODEL", "gemini-1.5-flash"),
+        gemini_capacity_wait_seconds=float(os.getenv("GEMINI_CAPACITY_WAIT_SECONDS", "2")),
+        gemini_http_max_connections=int(os.getenv("GEMINI_HTTP_MAX_CONNECTIONS", "20")),
+        gemini_http_max_keepalive=int(os.getenv("GEMINI_HTTP_MAX_KEEPALIVE", "10")),
+        gemini_http_keepalive_expiry=float(os.getenv("GEMINI_HTTP_KEEPALIVE_EXPIRY", "60")),
+        gemini_http_timeout_seconds=float(os.getenv("GEMINI_HTTP_TIMEOUT", "30")),
         mock_llm=mock_llm,
         debug=os.getenv("DEBUG", "0").lower() in ("1", "true", "yes", "on"),
+        task_store_backend=os.getenv("TASK_STORE_BACKEND", "firestore").strip().lower(),
+        task_store_latency_ms=float(os.getenv("TASK_STORE_LATENCY_MS", "0")),
+        task_store_jitter_ms=float(os.getenv("TASK_STORE_JITTER_MS", "0")),
+        task_store_failure_rate=float(os.getenv("TASK_STORE_FAILURE_RATE", "0")),
+        task_store_max_workers=int(os.getenv("TASK_STORE_MAX_WORKERS", "16")),
+        task_store_max_pending=int(os.getenv("TASK_STORE_MAX_PENDING", "256")),
+        task_cache_max_bytes=int(os.getenv("TASK_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+        task_cache_ttl_seconds=float(os.getenv("TASK_CACHE_TTL_SECONDS", "120")),
+        conversation_state_backend=os.getenv("CONVERSATION_STATE_BACKEND", "memory").strip().lower(),
+        conversation_state_sqlite_path=os.getenv("CONVERSATION_STATE_SQLITE_PATH", "conversation_state.db"),
+        conversation_state_redis_url=os.getenv("CONVERSATION_STATE_REDIS_URL", "redis://127.0.0.1:6379/0"),
+        conversation_state_max=int(os.getenv("CONVERSATION_STATE_MAX", "100000")),
+        conversation_state_ttl_seconds=float(os.getenv("CONVERSATION_STATE_TTL_SECONDS", "1800")),
+        conversation_state_sweep_seconds=float(os.getenv("CONVERSATION_STATE_SWEEP_SECONDS", "30")),
+        conversation_lock_max_entries=int(os.getenv("CONVERSATION_LOCK_MAX_ENTRIES", "10000")),
+        conversation_lock_stripes=int(os.getenv("CONVERSATION_LOCK_STRIPES", "64")),
+        rule_fast_path_enabled=os.getenv("RULE_FAST_PATH", "1").lower() in ("1", "true", "yes", "on"),
+        rule_fast_path_min_confidence=float(os.getenv("RULE_FAST_PATH_MIN_CONFIDENCE", "0.8")),
+        rule_fast_path_intents=os.getenv("RULE_FAST_PATH_INTENTS", "list_tasks,delete_task,create_task"),
+        rule_fast_path_sample_rate=float(os.getenv("RULE_FAST_PATH_SAMPLE_RATE", "0")),
+        intent_cache_enabled=os.getenv("INTENT_CACHE", "1").lower() in ("1", "true", "yes", "on"),
+        intent_cache_max_entries=int(os.getenv("INTENT_CACHE_MAX_ENTRIES", "10000")),
+        intent_cache_ttl_seconds=float(os.getenv("INTENT_CACHE_TTL_SECONDS", "600")),
+        intent_cache_bucket_seconds=float(os.getenv("INTENT_CACHE_BUCKET_SECONDS", "3600")),
+        single_flight_enabled=os.getenv("SINGLE_FLIGHT", "1").lower() in ("1", "true", "yes", "on"),
+        idempotency_enabled=os.getenv("IDEMPOTENCY", "1").lower() in ("1", "true", "yes", "on"),
+        idempotency_max_entries=int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000")),
+        idempotency_ttl_seconds=float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "900")),
     )
 
 
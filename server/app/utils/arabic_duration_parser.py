@@ -2,9 +2,10 @@
 from __future__ import annotations
 
 import re
-import unicodedata
 from typing import Optional
 
+from app.utils.arabic_normalizer import normalize, normalize_with_offsets
+
 # Units in minutes
 UNIT_MINUTES = {
     "دقيقة": 1,
@@ -28,24 +29,20 @@ UNIT_MINUTES = {
 
 INTRODUCERS = ["لمدة", "مدة", "مدتها", "مدته", "على مدار"]
 UNIT_PATTERN = r"دقيقة|دقائق|دقايق|دقيقتين|ساعة|ساعات|ساعتين|يوم|يومين|أيام|ايام|أسبوعين|اسبوعين|أسبوع|اسبوع|شهرين|شهر"
+# "بعد ساعتين" is a due offset for the time parser, not a duration
+_OFFSET_RE = re.compile(rf"بعد\s+(?:\d+(?:\.\d+)?\s*)?(?:(?:نص|ربع)\s+ساعة|{UNIT_PATTERN})", re.IGNORECASE)
 
 
-def _normalize(text: str) -> str:
-    if not text:
-        return ""
-    text = unicodedata.normalize("NFKC", text)
-    text = "".join(ch for ch in unicodedata.normalize("NFD", text) if unicodedata.category(ch) != "Mn")
-    text = text.replace("أ", "ا").replace("إ", "ا").replace("آ", "ا")
-    text = text.replace("ى", "ي")
-    text = text.translate(str.maketrans("٠١٢٣٤٥٦٧٨٩", "0123456789"))
-    return text
+def _mask_offsets(norm: str) -> str:
+    # same-length blanking keeps spans valid against the normalized text
+    return _OFFSET_RE.sub(lambda m: " " * len(m.group()), norm)
 
 
 def parse_duration_to_minutes(text: str) -> Optional[int]:
     """Parse Arabic duration phrase into minutes; never raises."""
     try:
-        norm = _normalize(text)
-        if not norm:
+        norm = _mask_offsets(normalize(text))
+        if not norm.strip():
             return None
         if re.search(r"ساعة\s+ونص|ساعة\s+ونصف", norm):
             return 90
@@ -73,7 +70,8 @@ def strip_duration_phrase(text: str) -> str:
     if not text:
         return text
     try:
-        norm = _normalize(text)
+        nt = normalize_with_offsets(text)
+        norm = _mask_offsets(nt.text)
         intro_re = re.compile(rf"(?:{'|'.join(map(re.escape, INTRODUCERS))})\s+[^\n.,؛?!]+", re.IGNORECASE)
         m = intro_re.search(norm)
         if not m:
@@ -81,8 +79,7 @@ def strip_duration_phrase(text: str) -> str:
             m = num_re.search(norm)
         if not m:
             return text.strip()
-        start, end = m.span()
-        return (text[:start] + " " + text[end:]).strip()
+        return nt.remove_spans(m.span()).strip()
     except Exception:
         return text
 
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import unicodedata
+from functools import lru_cache
+from typing import Dict, Tuple
+
+_ALEF_YEH = {"أ": "ا", "إ": "ا", "آ": "ا", "ى": "ي"}
+_ARABIC_DIGITS = "٠١٢٣٤٥٦٧٨٩"
+
+
+def _fold_char(ch: str) -> str:
+    # NFKC then NFD then dropping Mn equals NFKD minus Mn, which decomposes per character
+    out = "".join(c for c in unicodedata.normalize("NFKD", ch) if unicodedata.category(c) != "Mn")
+    out = "".join(_ALEF_YEH.get(c, c) for c in out)
+    return out.translate(str.maketrans(_ARABIC_DIGITS, "0123456789"))
+
+
+class _FoldTable(Dict[int, str]):
+    """
+    str.translate table: code point -> folded string. Latin-1, the Arabic blocks
+    and the presentation forms are precomputed; anything else is folded on first
+    sight (str.translate goes through __getitem__, so __missing__ applies) and
+    remembered only while fewer than `max_extra` such characters are kept, since
+    request text can bring in any code point.
+    """
+
+    def __init__(self, max_extra: int):
+        super().__init__()
+        self.max_extra = max_extra
+        self.base_size = 0
+
+    def __missing__(self, cp: int) -> str:
+        folded = _fold_char(chr(cp))
+        if len(self) - self.base_size < self.max_extra:
+            self[cp] = folded
+        return folded
+
+
+_TABLE = _FoldTable(max_extra=4096)
+for _lo, _hi in ((0x00, 0x100), (0x0600, 0x0780), (0x08A0, 0x0900), (0xFB50, 0xFE00), (0xFE70, 0xFF00)):
+    for _cp in range(_lo, _hi):
+        _TABLE[_cp] = _fold_char(chr(_cp))
+_TABLE.base_size = len(_TABLE)
+del _lo, _hi, _cp
+
+
+class NormalizedText:
+    """
+    Normalized text plus, for every normalized character, the index of the
+    original character it came from, so spans found in `text` can be cut out of
+    the original string even when diacritics were dropped or ligatures expanded.
+    """
+
+    __slots__ = ("original", "text", "_offsets")
+
+    def __init__(self, original: str, text: str, offsets: Tuple[int, ...]):
+        self.original = original
+        self.text = text
+        self._offsets = offsets  # len(text) + 1 entries; the last is len(original)
+
+    def original_span(self, span: Tuple[int, int]) -> Tuple[int, int]:
+        start, end = span
+        # end maps to the next kept character, so marks trailing the match go with it
+        return self._offsets[start], self._offsets[end]
+
+    def remove_spans(self, *spans: Tuple[int, int]) -> str:
+        """Original text with the given normalized spans replaced by a space each."""
+        out = self.original
+        for s, e in sorted((self.original_span(sp) for sp in spans), reverse=True):
+            out = out[:s] + " " + out[e:]
+        return out
+
+
+@lru_cache(maxsize=4096)
+def normalize(text: str) -> str:
+    """NFKC, diacritics stripped, alef/yeh unified, Arabic-Indic digits to ASCII (cached per string)."""
+    if not text:
+        return ""
+    if text.isascii():
+        return text
+    return text.translate(_TABLE)
+
+
+@lru_cache(maxsize=1024)
+def normalize_with_offsets(text: str) -> NormalizedText:
+    text = text or ""
+    if text.isascii():
+        return NormalizedText(text, text, tuple(range(len(text) + 1)))
+    parts = []
+    offsets = []
+    for i, ch in enumerate(text):
+        folded = _TABLE[ord(ch)]
+        parts.append(folded)
+        offsets.extend([i] * len(folded))
+    offsets.append(len(text))
+    return NormalizedText(text, "".join(parts), tuple(offsets))
+
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    out = {}
+    for name, fn in (("normalize", normalize), ("offsets", normalize_with_offsets)):
+        info = fn.cache_info()
+        out[name] = {"hits": info.hits, "misses": info.misses, "size": info.currsize, "max": info.maxsize}
+    out["table_entries"] = {"size": len(_TABLE)}
+    return out
@@ -1,34 +1,108 @@
 ﻿# -*- coding: utf-8 -*-
 from __future__ import annotations
 import re
-import unicodedata
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from functools import lru_cache
 from typing import Optional, Tuple
 
-try:
-    import pytz
-except ImportError:  # pragma: no cover
-    pytz = None
+from app.utils.arabic_normalizer import NormalizedText, normalize, normalize_with_offsets
+from app.utils.clock import in_zone, resolve_timezone
+from app.utils.phrase_matcher import trie_regex
 
 # ---- Helpers ----
 STOPWORDS = {"بدي", "بدى", "بدي", "ممكن", "لو", "سمحت"}
+# ة and ه are written interchangeably at the end of a word; normalize keeps them
+# apart, so both spellings are listed ("بكرة"/"بكره", "الساعة"/"الساعه")
 REL_DAY = {
     "اليوم": 0,
     "بكرة": 1,
+    "بكره": 1,
     "غداً": 1,
     "غدا": 1,
     "بعد بكرة": 2,
+    "بعد بكره": 2,
     "بعدبكرة": 2,
+    "بعدبكره": 2,
     "لبكرة": 1,
+    "لبكره": 1,
     "لبكرا": 1,
+    "بكرا": 1,
+    "بعد بكرا": 2,
+    "بعد غد": 2,
+    "بعد الغد": 2,
 }
-REL_DAY_NORM = { }
-for k, v in REL_DAY.items():
-    try:
-        REL_DAY_NORM[_normalize(k)] = v
-    except Exception:
-        REL_DAY_NORM[k] = v
-TIME_RE = re.compile(r"(?:الساعة\s*)?(\d{1,2})(?::(\d{1,2}))?\s*(ص|صباحاً|صباحا|م|مساءً|مساء|am|pm)?", re.IGNORECASE)
+REL_DAY_NORM = {normalize(k): v for k, v in REL_DAY.items()}
+# weekday names without the article, normalized; values are datetime.weekday()
+WEEKDAYS = {
+    "سبت": 5,
+    "احد": 6,
+    "اثنين": 0,
+    "اتنين": 0,
+    "ثلاثاء": 1,
+    "ثلاثا": 1,
+    "تلاتا": 1,
+    "اربعاء": 2,
+    "اربعا": 2,
+    "خميس": 3,
+    "جمعة": 4,
+    "جمعه": 4,
+}
+# "بعد <unit>" offsets, in minutes; a leading number multiplies them ("بعد 3 ساعات")
+OFFSET_UNITS = {
+    "دقيقة": 1,
+    "دقيقه": 1,
+    "دقائق": 1,
+    "دقايق": 1,
+    "دقيقتين": 2,
+    "ربع ساعة": 15,
+    "نص ساعة": 30,
+    "ساعة": 60,
+    "ساعه": 60,
+    "ساعات": 60,
+    "ساعتين": 120,
+    "ساعة ونص": 90,
+    "يوم": 1440,
+    "يومين": 2880,
+    "ايام": 1440,
+    "اسبوع": 10080,
+    "اسابيع": 10080,
+    "اسبوعين": 20160,
+}
+MERIDIEM = {
+    "ص": "am",
+    "صباحا": "am",
+    "الصبح": "am",
+    "الصباح": "am",
+    "am": "am",
+    "م": "pm",
+    "مساء": "pm",
+    "المسا": "pm",
+    "المساء": "pm",
+    "بالليل": "pm",
+    "pm": "pm",
+}
+_DURATION_WORDS = r"دقيقة|دقيقه|دقائق|دقايق|ساعة|ساعه|ساعات|يوم|ايام|اسبوع|اسابيع|شهر"
+# One pass over the normalized text; every alternative is a trie, so the longest
+# phrase wins at a position ("بعد بكرة" over "بكرة", "ساعة ونص" over "ساعة").
+# A bare number is only a clock time right after a day phrase ("بكرة 5"),
+# which is decided by the caller; numbers followed by a duration unit never are.
+# every alternative starts with one of these; the lookahead lets the scan skip
+# other positions without trying each branch
+_FIRST_CHARS = "".join(sorted({"ب", "ي", "ا"} | {k[0] for k in REL_DAY_NORM}))
+# day words start a word, or follow a clitic و/ب/ل that does ("وبكرة", "لبكرة",
+# "وبكرا"). The article is never free-standing here: it is spelled out where it
+# belongs ("اليوم", "بعد الغد", "الجمعة"), so "الغدا" (lunch) is not "غدا" (tomorrow).
+_WORD_START = r"(?:(?<!\w)|(?<=(?<!\w)[وبل])|(?<=(?<!\w)و[بل]))"
+DUE_SCANNER = re.compile(
+    rf"(?=[{_FIRST_CHARS}\d]){_WORD_START}(?:"
+    rf"(?P<offset>بعد\s+(?:(?P<offset_n>\d+(?:\.\d+)?)\s*)?(?P<offset_unit>{trie_regex(OFFSET_UNITS)}))(?!\w)"
+    rf"|(?P<day>{trie_regex(REL_DAY_NORM)})(?!\w)"
+    rf"|(?P<weekday>(?:يوم\s+(?:ال)?|ال)(?P<weekday_name>{trie_regex(WEEKDAYS)})"
+    rf"(?:\s+(?:الجاي|الجاية|القادم|القادمة))?)(?!\w)"
+    rf"|(?P<time>(?P<clock>الساع[ةه]\s*)?(?<![\d.:])(?P<hour>\d{{1,2}})(?::(?P<minute>\d{{2}}))?(?![\d.])"
+    rf"(?!\s*(?:{_DURATION_WORDS}))(?:\s*(?P<meridiem>{trie_regex(MERIDIEM)})(?!\w))?))",
+    re.IGNORECASE,
+)
 
 DURATION_UNITS = {
     "دقيقة": 1,
@@ -52,32 +126,21 @@ DURATION_UNITS = {
 INTRO = ["لمدة", "مدة", "مدتها", "مدته", "خلال", "مهلة", "على مدار"]
 UNIT_PATTERN = r"دقيقة|دقائق|دقايق|دقيقتين|ساعة|ساعات|ساعتين|يوم|يومين|أيام|ايام|أسبوعين|اسبوعين|أسبوع|اسبوع|شهرين|شهر"
 
-# ---- Normalization ----
-
-def _normalize(text: str) -> str:
-    if not text:
-        return ""
-    text = unicodedata.normalize("NFKC", text)
-    text = "".join(ch for ch in unicodedata.normalize("NFD", text) if unicodedata.category(ch) != "Mn")
-    text = text.replace("أ", "ا").replace("إ", "ا").replace("آ", "ا")
-    text = text.replace("ى", "ي")
-    text = text.translate(str.maketrans("٠١٢٣٤٥٦٧٨٩", "0123456789"))
-    return text
-
 # ---- Duration ----
 
 def extract_duration_minutes_and_clean(text: str) -> Tuple[Optional[int], str]:
     try:
-        norm = _normalize(text)
+        nt = normalize_with_offsets(text)
+        norm = nt.text
         if not norm:
             return None, text
         # special cases
         if re.search(r"ساعة\s+ونص|ساعة\s+ونصف", norm):
             span = re.search(r"ساعة\s+ونص|ساعة\s+ونصف", norm).span()
-            return 90, _remove_span(text, span)
+            return 90, _remove_span(nt, span)
         if re.search(r"نص\s+ساعة", norm):
             span = re.search(r"نص\s+ساعة", norm).span()
-            return 30, _remove_span(text, span)
+            return 30, _remove_span(nt, span)
 
         intro_re = re.compile(rf"(?:{'|'.join(map(re.escape, INTRO))})\s+([^\n.,؛?!]+)", re.IGNORECASE)
         m = intro_re.search(norm)
@@ -89,14 +152,14 @@ def extract_duration_minutes_and_clean(text: str) -> Tuple[Optional[int], str]:
             minutes = int(float(num_unit.group(1)) * DURATION_UNITS.get(num_unit.group(2), 0))
             if minutes > 0:
                 span = _offset_span(candidate_span, num_unit.span()) if candidate_span else num_unit.span()
-                return minutes, _remove_span(text, span)
+                return minutes, _remove_span(nt, span)
 
         unit_only = re.search(rf"\b({UNIT_PATTERN})\b", candidate, re.IGNORECASE)
         if unit_only:
             minutes = DURATION_UNITS.get(unit_only.group(1), 0)
             if minutes > 0:
                 span = _offset_span(candidate_span, unit_only.span()) if candidate_span else unit_only.span()
-                return minutes, _remove_span(text, span)
+                return minutes, _remove_span(nt, span)
     except Exception:
         return None, text
     return None, text
@@ -108,61 +171,126 @@ def _offset_span(parent_span, inner_span):
     return (parent_span[0] + inner_span[0], parent_span[0] + inner_span[1])
 
 
-def _remove_span(text: str, span: Tuple[int, int]) -> str:
-    start, end = span
-    cleaned = text[:start] + " " + text[end:]
-    return re.sub(r"\s+", " ", cleaned).strip()
+def _remove_span(nt: NormalizedText, span: Tuple[int, int]) -> str:
+    return re.sub(r"\s+", " ", nt.remove_spans(span)).strip()
 
 
 # ---- Due datetime ----
 
 def _tz_now(tzname: str, now: datetime) -> datetime:
-    if pytz:
-        try:
-            return now.astimezone(pytz.timezone(tzname))
-        except Exception:
-            return now
-    return now
+    tz = resolve_timezone(tzname)
+    if tz is None:
+        return now
+    try:
+        return in_zone(now, tz)
+    except Exception:
+        return now
+
+
+@lru_cache(maxsize=1024)
+def _day_tzinfo(tz, day: date):
+    # the zone's offset on that date (noon avoids the DST switch hour); pytz.localize is slow
+    return tz.localize(datetime(day.year, day.month, day.day, 12)).tzinfo
+
+
+def _at(base: datetime, days: int, hour: int, minute: int) -> datetime:
+    """Local wall-clock time `days` after base's date, with the zone's own offset for that date."""
+    day = (base + timedelta(days=days)).date()
+    tz = base.tzinfo
+    if tz is not None and hasattr(tz, "localize"):
+        # pytz: replace(tzinfo=zone) would give LMT, and base's offset is wrong across DST
+        tz = _day_tzinfo(tz, day)
+    return datetime(day.year, day.month, day.day, hour, minute, tzinfo=tz)
+
+
+def _clock(m: re.Match) -> Optional[Tuple[int, int]]:
+    hour = int(m.group("hour"))
+    minute = int(m.group("minute") or 0)
+    mer = MERIDIEM.get((m.group("meridiem") or "").lower())
+    if mer == "pm" and hour < 12:
+        hour += 12
+    if mer == "am" and hour == 12:
+        hour = 0
+    if hour > 23 or minute > 59:
+        return None
+    return hour, minute
+
+
+def _scan(norm: str) -> Tuple[Optional[re.Match], Optional[re.Match], Optional[re.Match]]:
+    """(day, offset, time) matches in normalized text; the first of each kind wins."""
+    day = offset = time_m = None
+    for m in DUE_SCANNER.finditer(norm):
+        kind = m.lastgroup  # the outer group of the alternative that matched
+        if kind == "time":
+            # bare numbers count only when they directly follow the day phrase
+            is_clock = m.group("clock") or m.group("minute") or m.group("meridiem")
+            follows_day = day is not None and not norm[day.end():m.start()].strip()
+            if time_m is None and (is_clock or follows_day) and _clock(m):
+                time_m = m
+        elif kind == "offset":
+            offset = offset or m
+        elif day is None:
+            day = m
+    return day, offset, time_m
+
+
+_MERIDIEM_WORD_RE = re.compile(rf"(?<!\w)(?:{trie_regex(MERIDIEM)})(?!\w)", re.IGNORECASE)
+
+
+def has_ambiguous_hour(text: str) -> bool:
+    """
+    True when the due clock is 1-11 with no morning/evening word anywhere
+    ("الساعة 2" may be 02:00 or 14:00); the parser reads it as is.
+    """
+    try:
+        norm = normalize_with_offsets(text).text
+        _, _, time_m = _scan(norm)
+        if time_m is None or time_m.group("meridiem"):
+            return False
+        return 1 <= int(time_m.group("hour")) <= 11 and not _MERIDIEM_WORD_RE.search(norm)
+    except Exception:
+        return False
 
 
 def extract_due_datetime_and_clean(text: str, timezone: str, now_dt: datetime) -> Tuple[Optional[datetime], str]:
     """Parse relative Arabic day/time. Default time when date-only: 09:00 local.
     Never raises; returns (due_dt, cleaned_text)."""
     try:
-        norm = _normalize(text)
+        nt = normalize_with_offsets(text)
         base = _tz_now(timezone, now_dt)
+        day, offset, time_m = _scan(nt.text)
+
         due = None
         removal_spans = []
+        exact = False  # sub-day offsets fix the time themselves
+        if offset is not None:
+            minutes = OFFSET_UNITS[offset.group("offset_unit")] * float(offset.group("offset_n") or 1)
+            removal_spans.append(offset.span())
+            exact = minutes < 1440
+            if exact:
+                due = (base + timedelta(minutes=minutes)).replace(second=0, microsecond=0)
+            else:
+                due = _at(base, int(minutes // 1440), 9, 0)
+        elif day is not None:
+            removal_spans.append(day.span())
+            if day.group("day") is not None:
+                days = REL_DAY_NORM[day.group("day")]
+            else:
+                days = (WEEKDAYS[day.group("weekday_name")] - base.weekday()) % 7 or 7
+            due = _at(base, days, 9, 0)
 
-        for phrase, delta in REL_DAY_NORM.items():
-            idx = norm.find(phrase)
-            if idx >= 0:
-                due_date = (base + timedelta(days=delta)).date()
-                removal_spans.append((idx, idx + len(phrase)))
-                due = datetime.combine(due_date, datetime.min.time()).replace(hour=9, minute=0, second=0, microsecond=0, tzinfo=base.tzinfo)
-                break
-
-        m = TIME_RE.search(norm)
-        if m:
-            hour = int(m.group(1)); minute = int(m.group(2) or 0); mer = (m.group(3) or "").lower()
-            if mer in {"م", "pm", "مساء", "مساءً"} and hour < 12:
-                hour += 12
-            if mer in {"ص", "am", "صباحا", "صباحاً"} and hour == 12:
-                hour = 0
-            removal_spans.append(m.span())
+        if time_m is not None and not exact:
+            hour, minute = _clock(time_m)
+            removal_spans.append(time_m.span())
             if due is None:
-                due_time = base.replace(hour=hour, minute=minute, second=0, microsecond=0)
-                if due_time < base:
-                    due_time += timedelta(days=1)
-                due = due_time
+                due = _at(base, 0, hour, minute)
+                if due < base:
+                    due = _at(base, 1, hour, minute)
             else:
-                due = due.replace(hour=hour, minute=minute, second=0, microsecond=0)
+                due = _at(due, 0, hour, minute)
 
-        cleaned = text
-        for s, e in sorted(removal_spans, reverse=True):
-            cleaned = cleaned[:s] + " " + cleaned[e:]
+        cleaned = nt.remove_spans(*removal_spans)
         cleaned = re.sub(r"\s+", " ", cleaned).strip()
         return due, cleaned
     except Exception:
         return None, text
-
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import functools
+from datetime import date, datetime, tzinfo
+from typing import Any, Dict, Optional
+
+import pytz
+
+
+@functools.lru_cache(maxsize=512)
+def resolve_timezone(name: Optional[str]) -> Optional[tzinfo]:
+    """
+    pytz zone for an IANA name, or None if the name is unknown. Both outcomes are
+    cached, so a client sending a bad zone on every request costs one lookup.
+    Bounded, since the names come from requests.
+    """
+    if not name:
+        return None
+    try:
+        return pytz.timezone(name)
+    except Exception:
+        return None
+
+
+def timezone_or_utc(name: Optional[str]) -> tzinfo:
+    return resolve_timezone(name) or pytz.UTC
+
+
+def timezone_cache_stats() -> Dict[str, int]:
+    info = resolve_timezone.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "max": info.maxsize}
+
+
+def in_zone(dt: datetime, tz: tzinfo) -> datetime:
+    """`dt` converted to `tz`, skipping the conversion when it is already there."""
+    if dt.tzinfo is not None and getattr(dt.tzinfo, "zone", None) == getattr(tz, "zone", object()):
+        return dt
+    return dt.astimezone(tz)
+
+
+class RequestClock:
+    """
+    One reading of "now" for a request, in the caller's zone. Created once at the
+    top of the route and handed down, so every parser and query sees the same
+    instant and the zone is resolved and `now` formatted only once.
+    """
+
+    __slots__ = ("timezone", "tz", "valid", "now", "_iso")
+
+    def __init__(self, timezone: Optional[str], now: Optional[datetime] = None):
+        tz = resolve_timezone(timezone)
+        self.valid = tz is not None
+        self.tz = tz or pytz.UTC
+        self.timezone = timezone if self.valid else "UTC"
+        self.now = in_zone(now, self.tz) if now is not None else datetime.now(self.tz)
+        self._iso: Optional[str] = None
+
+    @property
+    def iso(self) -> str:
+        if self._iso is None:
+            self._iso = self.now.isoformat()
+        return self._iso
+
+    @property
+    def ts(self) -> float:
+        return self.now.timestamp()
+
+    @property
+    def today(self) -> date:
+        return self.now.date()
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"timezone": self.timezone, "valid": self.valid, "now": self.iso}
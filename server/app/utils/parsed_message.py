@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from app.utils.arabic_duration_parser import extract_duration_minutes_and_clean
+from app.utils.arabic_time_parser import extract_due_datetime_and_clean, has_ambiguous_hour
+from app.utils.phrase_matcher import PhraseMatch, PhraseMatcher
+
+# Leading command words stripped from a title hint, in order. Each is optional and
+# greedy, so one anchored match behaves like applying the strips one after another.
+_TITLE_LEAD_PATTERNS = [
+    r"احذف(?:ها|هم|ه)?\s*",
+    r"أحذف(?:ها|هم|ه)?\s*",
+    r"حذف\s*",
+    r"امسح(?:ها|هم|ه)?\s*",
+    r"شيل(?:ها|هم|ه)?\s*",
+    r"اشطب(?:ها|هم|ه)?\s*",
+    r"(?:الغاء|إلغاء|الغي?)(?:ها|هم|ه)?\s*",
+    r"ألغي?(?:ها|هم|ه)?\s*",
+    r"بدي\s+",
+    r"بدّي\s+",
+    r"ذكّرني\s+ب?\s*",
+    r"ذكرني\s+ب?\s*",
+    r"لازم\s+",
+    r"مهمة\s*[:\-]?\s*",
+    r"موعد\s*[:\-]?\s*",
+]
+_TITLE_LEAD_RE = re.compile(
+    "^" + "".join(f"(?:{p})?\\s*" for p in _TITLE_LEAD_PATTERNS), re.IGNORECASE
+)
+
+_TITLE_PREFIXES = ["بدي", "بدّي", "أضف", "ضيف", "اضف", "سجل", "سجلي", "اعمل", "خلينا", "مهمة", "task", "لو سمحت", "ممكن"]
+_TITLE_PREFIX_RES = [re.compile(rf"^{re.escape(p)}\s+", re.IGNORECASE) for p in _TITLE_PREFIXES]
+_SPACES_RE = re.compile(r"\s+")
+
+TRIGGERS = PhraseMatcher(
+    {
+        "delete": ["احذف", "حذف", "امسح", "شيل", "اشطب", "الغ", "إلغاء مهمة", "delete", "remove"],
+        "list": ["مهامي", "شو مهامي", "اعرض المهام", "ورجيني مهامي", "ما هي المهام", "شو عندي"],
+        "create": ["بدي", "بدّي", "ذكرني", "ذكّرني", "ذكّر", "ذكر", "لازم", "مهمة", "موعد", "تذكير", "حجز", "اضف", "ضيف", "سجل", "create", "add"],
+    }
+)
+
+# Delete words count only as whole words (an object pronoun may be attached:
+# "امسحها"); as bare substrings "الغ" hits "الغدا" and "شيل" hits "اشيل".
+_DELETE_WORD_RE = re.compile(
+    r"(?<!\w)(?:احذف|أحذف|حذف|امسح|شيل|اشطب|الغ|الغي|ألغ|ألغي|الغاء|إلغاء|delete|remove)(?:ها|هم|ه)?(?!\w)"
+)
+# Create triggers that are commands rather than nouns: a delete word next to one
+# of these ("ذكرني اشيل الزبالة") is more likely part of the task than the intent.
+CREATE_COMMANDS = frozenset(
+    ["بدي", "بدّي", "ذكرني", "ذكّرني", "ذكّر", "ذكر", "لازم", "اضف", "ضيف", "سجل", "create", "add"]
+)
+
+
+def extract_title_hint(text: str) -> Optional[str]:
+    hint = _TITLE_LEAD_RE.sub("", (text or "").strip(), count=1).strip()
+    if len(hint) > 60:
+        hint = hint[:60].strip()
+    return hint or None
+
+
+def clean_title(text: str) -> str:
+    """Title from text whose due/duration phrases were already removed: drop command words, cap at 60."""
+    if not text:
+        return ""
+    cleaned = extract_title_hint(text) or text
+    for prefix_re in _TITLE_PREFIX_RES:
+        cleaned = prefix_re.sub("", cleaned)
+    cleaned = _SPACES_RE.sub(" ", cleaned).strip(" -،،,:")
+    if len(cleaned) > 60:
+        cleaned = cleaned[:60].strip()
+    return cleaned
+
+
+@dataclass
+class ParsedMessage:
+    """
+    Everything the rule-based extractor and the chat route need from one user
+    message, computed once per request: trigger labels/spans, duration, due
+    datetime and the cleaned title. `timings` holds per-stage milliseconds.
+    """
+
+    text: str
+    lower: str
+    timezone: str
+    now: datetime
+    triggers: Set[str]
+    trigger_spans: List[PhraseMatch]
+    duration_minutes: Optional[int]
+    due: Optional[datetime]
+    title_text: str  # message minus the duration and due phrases
+    title: str  # title_text after command-word cleanup
+    ambiguous_hour: bool = False  # due clock 1-11 with no morning/evening word
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def has_create_command(self) -> bool:
+        return any(s.label == "create" and s.phrase in CREATE_COMMANDS for s in self.trigger_spans)
+
+    @classmethod
+    def parse(cls, message: str, timezone: str, now: datetime) -> "ParsedMessage":
+        t0 = time.perf_counter()
+        text = (message or "").strip()
+        lower = text.lower()
+        triggers, spans = TRIGGERS.classify(lower)
+        if "delete" in triggers and not _DELETE_WORD_RE.search(lower):
+            triggers.discard("delete")
+        t1 = time.perf_counter()
+        duration_minutes, after_duration = extract_duration_minutes_and_clean(text)
+        t2 = time.perf_counter()
+        due, title_text = extract_due_datetime_and_clean(after_duration, timezone, now)
+        ambiguous_hour = due is not None and has_ambiguous_hour(after_duration)
+        t3 = time.perf_counter()
+        title = clean_title(title_text)
+        t4 = time.perf_counter()
+        timings = {
+            "triggers_ms": round((t1 - t0) * 1000, 3),
+            "duration_ms": round((t2 - t1) * 1000, 3),
+            "due_ms": round((t3 - t2) * 1000, 3),
+            "title_ms": round((t4 - t3) * 1000, 3),
+            "total_ms": round((t4 - t0) * 1000, 3),
+        }
+        return cls(
+            text=text,
+            lower=lower,
+            timezone=timezone,
+            now=now,
+            triggers=triggers,
+            trigger_spans=spans,
+            duration_minutes=duration_minutes,
+            due=due,
+            title_text=title_text,
+            title=title,
+            ambiguous_hour=ambiguous_hour,
+            timings=timings,
+        )
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Optional, Set, Tuple
+
+
+@dataclass(frozen=True)
+class PhraseMatch:
+    label: str
+    phrase: str
+    start: int
+    end: int
+
+
+class _Node:
+    __slots__ = ("children", "phrase")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.phrase: Optional[str] = None
+
+
+def _compile(node: _Node) -> str:
+    alts = [re.escape(ch) + _compile(child) for ch, child in sorted(node.children.items())]
+    if not alts:
+        return ""
+    body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+    if node.phrase is not None:
+        # a phrase ends here; the greedy optional keeps the longest match
+        body = f"(?:{body})?"
+    return body
+
+
+def trie_regex(phrases: Iterable[str]) -> str:
+    """
+    Regex source matching any of `phrases`, preferring the longest at a given
+    position (shared prefixes are factored, so it is one trie walk, not a list
+    of alternatives tried in turn). Empty phrases are ignored.
+    """
+    root = _Node()
+    for phrase in phrases:
+        if not phrase:
+            continue
+        node = root
+        for ch in phrase:
+            node = node.children.setdefault(ch, _Node())
+        node.phrase = phrase
+    return _compile(root)
+
+
+class PhraseMatcher:
+    """
+    Multi-phrase matcher in the spirit of Aho-Corasick: all phrases go into one
+    trie, built once, and the trie is compiled to a single regex so the scan
+    over the text is one pass inside the re engine instead of one `in` test per
+    phrase. At every position the longest phrase starting there is reported;
+    phrases contained in that match (e.g. "ذكر" inside "ذكرني") are accounted
+    for through a precomputed label closure, so `labels()` equals
+    `{label for label, phrase in ... if phrase in text}`.
+    """
+
+    def __init__(self, phrases: Mapping[str, Iterable[str]]):
+        self._label_of: Dict[str, str] = {}
+        root = _Node()
+        for label, items in phrases.items():
+            for phrase in items:
+                if not phrase:
+                    continue
+                # first label wins for a phrase listed twice
+                self._label_of.setdefault(phrase, label)
+                node = root
+                for ch in phrase:
+                    node = node.children.setdefault(ch, _Node())
+                node.phrase = phrase
+        # labels of every phrase occurring inside each phrase (itself included)
+        self._closure: Dict[str, FrozenSet[str]] = {
+            p: frozenset(self._label_of[q] for q in self._label_of if q in p) for p in self._label_of
+        }
+        body = _compile(root)
+        self._re = re.compile(f"(?=({body}))") if body else None
+
+    def find_all(self, text: str) -> List[PhraseMatch]:
+        """Longest phrase match starting at each position, in order (matches may overlap)."""
+        if self._re is None or not text:
+            return []
+        out = []
+        for m in self._re.finditer(text):
+            phrase = m.group(1)
+            out.append(PhraseMatch(self._label_of[phrase], phrase, m.start(), m.start() + len(phrase)))
+        return out
+
+    def labels(self, text: str) -> Set[str]:
+        found: Set[str] = set()
+        if self._re is None or not text:
+            return found
+        for m in self._re.finditer(text):
+            found |= self._closure[m.group(1)]
+        return found
+
+    def classify(self, text: str) -> Tuple[Set[str], List[PhraseMatch]]:
+        """(labels, spans) in one scan."""
+        spans = self.find_all(text)
+        found: Set[str] = set()
+        for s in spans:
+            found |= self._closure[s.phrase]
+        return found, spans
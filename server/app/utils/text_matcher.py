@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, Tuple
+
+from app.utils.arabic_normalizer import normalize
+
+# Titles longer than this are truncated before edit-distance scoring, which keeps
+# the worst-case cost of one candidate bounded.
+MAX_SIM_CHARS = 120
+
+_TOKEN_RE = re.compile(r"\w+")
+_ARTICLE_PREFIXES = ("وال", "بال", "كال", "فال", "لل", "ال")
+
+_STOPWORDS_RAW = {
+    "مهمة", "المهمة", "مهمه", "task", "في", "على", "من", "عن", "الى", "إلى", "مع",
+    "و", "يا", "بدي", "ممكن", "لو", "سمحت", "اللي", "هاي", "هذه", "هذا",
+}
+
+
+def normalize_text(text: str) -> str:
+    """Parser normalization (diacritics, alef/yeh, digits) + case and ta marbuta folding."""
+    return normalize(text or "").lower().replace("ة", "ه")
+
+
+def _stem(token: str) -> str:
+    for p in _ARTICLE_PREFIXES:
+        if token.startswith(p) and len(token) - len(p) >= 2:
+            return token[len(p):]
+    return token
+
+
+_STOPWORDS = frozenset(normalize_text(w) for w in _STOPWORDS_RAW)
+
+
+@lru_cache(maxsize=8192)
+def tokenize(text: str) -> Tuple[str, ...]:
+    """Normalized, lightly stemmed tokens with stopwords removed (cached per string)."""
+    return tuple(_stem(t) for t in _TOKEN_RE.findall(normalize_text(text)) if t not in _STOPWORDS)
+
+
+@lru_cache(maxsize=8192)
+def token_set(text: str) -> FrozenSet[str]:
+    return frozenset(tokenize(text))
+
+
+def edit_distance(a: str, b: str) -> int:
+    """
+    Levenshtein distance with Myers/Hyyrö bit-parallel rows: O(len(b)) big-int
+    operations for a pattern of any length, instead of the O(n*m) DP table.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    m = len(b)
+    if m == 0:
+        return len(a)
+    peq: Dict[str, int] = {}
+    for i, ch in enumerate(b):
+        peq[ch] = peq.get(ch, 0) | (1 << i)
+    full = (1 << m) - 1
+    high = 1 << (m - 1)
+    pv, mv, score = full, 0, m
+    for ch in a:
+        eq = peq.get(ch, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = (mv | ~(xh | pv)) & full
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        ph = ((ph << 1) | 1) & full
+        mh = (mh << 1) & full
+        pv = (mh | ~(xv | ph)) & full
+        mv = ph & xv
+    return score
+
+
+def similarity(a: str, b: str) -> float:
+    """1 - normalized edit distance, in [0, 1]."""
+    a, b = a[:MAX_SIM_CHARS], b[:MAX_SIM_CHARS]
+    longest = max(len(a), len(b))
+    if longest == 0:
+        return 1.0
+    return 1.0 - edit_distance(a, b) / longest
+
+
+def _token_similarity(q: str, t: str, floor: float) -> float:
+    longest = max(len(q), len(t))
+    # length difference alone bounds the best achievable similarity
+    if longest and 1.0 - abs(len(q) - len(t)) / longest <= floor:
+        return 0.0
+    return similarity(q, t)
+
+
+def _token_matches(q: str, t: str) -> bool:
+    if q == t:
+        return True
+    return len(q) >= 3 and len(t) >= 3 and (t.startswith(q) or q.startswith(t))
+
+
+@lru_cache(maxsize=16384)
+def _score(query: str, title: str) -> Tuple[int, float]:
+    q_tokens = tokenize(query)
+    t_tokens = token_set(title)
+    if not q_tokens or not t_tokens:
+        return 0, 0.0
+
+    overlap = 0
+    total = 0.0
+    for q in q_tokens:
+        if q in t_tokens or any(_token_matches(q, t) for t in t_tokens):
+            overlap += 1
+            total += 1.0
+            continue
+        best = 0.0
+        for t in t_tokens:
+            best = max(best, _token_similarity(q, t, best))
+        total += best
+    token_sim = total / len(q_tokens)
+    whole_sim = similarity(" ".join(q_tokens), " ".join(tokenize(title)))
+    return overlap, max(token_sim, whole_sim)
+
+
+def is_relevant(query: str, title: str, *, min_overlap: int = 1, min_sim: float = 0.65) -> Tuple[bool, int, float]:
+    """
+    Return (ok, overlap, similarity) for a query against a task title.
+    overlap counts query tokens found in the title (exact or shared 3+ char prefix);
+    similarity averages each query token's best edit-distance match, or the whole
+    phrase similarity if that is higher.
+    """
+    overlap, sim = _score(query or "", title or "")
+    return overlap >= min_overlap or sim >= min_sim, overlap, sim
+
+
+def candidate_score(query: str, title: str) -> float:
+    """Single ranking score in [0, 1] blending similarity and token coverage."""
+    overlap, sim = _score(query or "", title or "")
+    n = len(tokenize(query or "")) or 1
+    return round(0.6 * sim + 0.4 * min(overlap / n, 1.0), 4)
@@ -0,0 +1,83 @@
+"""
+Memory per conversation: the previous ConversationState dataclass (pending_op
+dict + duplicated legacy delete fields) vs the slotted state, measured with
+tracemalloc at N live conversations mid delete-flow.
+
+Run from server/:
+    python -m benchmarks.bench_conversation_state --conversations 100000
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from app.domain.conversation_state import ConversationState, candidate_tuple
+
+
+@dataclass
+class LegacyConversationState:
+    pending: bool = False
+    pending_intent: Optional[str] = None
+    expected_field: Optional[str] = None
+    entities: Dict[str, Any] = field(default_factory=dict)
+    created_at: float = field(default_factory=time.time)
+    pending_op: Dict[str, Any] = field(default_factory=dict)
+    mode: Optional[str] = None
+    step: Optional[str] = None
+    delete_query: Optional[str] = None
+    candidates: List[Dict[str, Any]] = field(default_factory=list)
+    selected_task_id: Optional[str] = None
+
+
+def _candidates(i: int):
+    return [{"taskId": f"task{i}-{j}", "title": f"اجتماع الفريق {j}", "score": 0.8} for j in range(3)]
+
+
+def _legacy(i: int) -> LegacyConversationState:
+    st = LegacyConversationState()
+    cands = _candidates(i)
+    # what set_delete_pending stored: the pending_op dict plus the legacy mirror fields
+    st.pending_op = {"type": "delete_task", "candidates": cands, "stage": "awaiting_choice",
+                     "selected_task_id": None, "query": "اجتماع"}
+    st.mode, st.step, st.candidates, st.delete_query = "delete", "awaiting_choice", cands, "اجتماع"
+    return st
+
+
+def _slotted(i: int) -> ConversationState:
+    st = ConversationState()
+    st.delete_stage = "awaiting_choice"
+    st.delete_candidates = tuple(candidate_tuple(c) for c in _candidates(i))
+    st.delete_query = "اجتماع"
+    return st
+
+
+def _measure(factory, n: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    states = {f"conv{i}": factory(i) for i in range(n)}
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del states
+    return used / n
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--conversations", type=int, default=100_000)
+    args = parser.parse_args()
+
+    legacy = _measure(_legacy, args.conversations)
+    slotted = _measure(_slotted, args.conversations)
+    print(f"conversations={args.conversations}")
+    print(f"legacy dataclass: {legacy:.0f} bytes/conversation ({legacy * args.conversations / 2**20:.1f} MiB)")
+    print(f"slotted state:    {slotted:.0f} bytes/conversation ({slotted * args.conversations / 2**20:.1f} MiB)")
+    print(f"reduction:        {(1 - slotted / legacy) * 100:.0f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+extract_due_datetime_and_clean throughput and coverage: the previous per-phrase
+`norm.find` loop + TIME_RE vs the single compiled DUE_SCANNER pass. "resolved"
+counts messages that got a due datetime locally (no model call needed for it).
+
+Run from server/:
+    python -m benchmarks.bench_due_scanner --rounds 5000
+"""
+from __future__ import annotations
+
+import argparse
+import re
+import time
+from datetime import datetime, timedelta
+
+import pytz
+
+from app.utils.arabic_normalizer import normalize_with_offsets
+from app.utils.arabic_time_parser import _tz_now, extract_due_datetime_and_clean
+
+TZ = "Asia/Gaza"
+MESSAGES = [
+    "ذكرني بكرة الساعة 5 اروح عند الطبيب",
+    "بعد بكرة اجتماع مع الفريق",
+    "ذكرني بعد ساعتين اتصل بأحمد",
+    "بعد أسبوع راجع العقد",
+    "يوم الخميس الساعة 7 م عشاء عائلي",
+    "الجمعة الجاية صلاة وزيارة",
+    "بعد 3 ايام دفع الفاتورة",
+    "بعد نص ساعة اطفي الفرن",
+    "اليوم الساعة 9:30 ص مكالمة",
+    "شو مهامي اليوم",
+    "اشتري 2 كيلو بندورة",
+    "مرحبا كيفك",
+]
+
+_OLD_REL_DAY = {"اليوم": 0, "بكرة": 1, "غداً": 1, "غدا": 1, "بعد بكرة": 2, "بعدبكرة": 2, "لبكرة": 1, "لبكرا": 1}
+_OLD_TIME_RE = re.compile(r"(?:الساعة\s*)?(\d{1,2})(?::(\d{1,2}))?\s*(ص|صباحاً|صباحا|م|مساءً|مساء|am|pm)?", re.IGNORECASE)
+
+
+def _old(text: str, now: datetime):
+    nt = normalize_with_offsets(text)
+    norm = nt.text
+    base = _tz_now(TZ, now)
+    due = None
+    spans = []
+    for phrase, delta in _OLD_REL_DAY.items():
+        idx = norm.find(phrase)
+        if idx >= 0:
+            due = (base + timedelta(days=delta)).replace(hour=9, minute=0, second=0, microsecond=0)
+            spans.append((idx, idx + len(phrase)))
+            break
+    m = _OLD_TIME_RE.search(norm)
+    if m:
+        hour = int(m.group(1)) % 24
+        minute = int(m.group(2) or 0) % 60
+        spans.append(m.span())
+        due = (due or base).replace(hour=hour, minute=minute, second=0, microsecond=0)
+    return due, re.sub(r"\s+", " ", nt.remove_spans(*spans)).strip()
+
+
+def _new(text: str, now: datetime):
+    return extract_due_datetime_and_clean(text, TZ, now)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=5000)
+    args = parser.parse_args()
+
+    now = datetime.now(pytz.timezone(TZ))
+    n = args.rounds * len(MESSAGES)
+    for name, fn in (("find loop", _old), ("scanner", _new)):
+        resolved = sum(1 for m in MESSAGES if fn(m, now)[0] is not None)
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            for m in MESSAGES:
+                fn(m, now)
+        elapsed = time.perf_counter() - start
+        print(f"{name:>9}: {n / elapsed:,.0f} msgs/s, resolved {resolved}/{len(MESSAGES)}")
+
+
+if __name__ == "__main__":
+    main()
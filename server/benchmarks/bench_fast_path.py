@@ -0,0 +1,72 @@
+"""
+Share of a typical message mix answered by the rule-based fast path, and the
+mean intent latency with the fast path on vs off, against the local fake
+Gemini endpoint with fixed latency.
+
+Run from server/:
+    python -m benchmarks.bench_fast_path --latency-ms 100
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from app.llm import gemini_adapter
+from app.llm.fast_path import FastPathStats
+from app.llm.gemini_keypool import GeminiKeyPool
+from app.settings import settings
+from benchmarks.fake_gemini import FakeGeminiServer
+
+NOW_ISO = "2026-01-01T09:00:00+02:00"
+MESSAGES = [
+    "شو مهامي",
+    "شو مهامي اليوم",
+    "اعرض المهام",
+    "احذف اجتماع الفريق",
+    "امسح موعد الطبيب",
+    "ذكرني بكرة الساعة 5 اروح عند الطبيب",
+    "بدي اشتري خبز",
+    "لازم اخلص التقرير بعد ساعتين",
+    "مرحبا كيفك",
+    "شو رأيك بالطقس",
+    "بدي اعرف شو مهامي",
+    "غير موعد الاجتماع",
+]
+
+
+async def _run(rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for m in MESSAGES:
+            await gemini_adapter.interpret_intent_async(m, "Asia/Gaza", NOW_ISO)
+    return (time.perf_counter() - start) / (rounds * len(MESSAGES))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    args = parser.parse_args()
+
+    server = FakeGeminiServer(latency_ms=args.latency_ms).start()
+    gemini_adapter._key_pool = GeminiKeyPool(keys=["bench-key"], base_url=server.base_url)
+    gemini_adapter._AVAILABLE_MODELS = [settings.gemini_model]
+    settings.intent_cache_enabled = False  # every round must reach the gate or the model
+    try:
+        for enabled in (False, True):
+            settings.rule_fast_path_enabled = enabled
+            gemini_adapter._fast_path = FastPathStats()
+            before = server.requests
+            mean = asyncio.run(_run(args.rounds))
+            stats = gemini_adapter.fast_path_stats()
+            print(
+                f"fast path {'on ' if enabled else 'off'}: mean={mean * 1000:.1f} ms/message "
+                f"gemini calls={server.requests - before} local_hit_rate={stats['local_hit_rate']:.2f}"
+            )
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
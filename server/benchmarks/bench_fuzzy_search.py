@@ -0,0 +1,81 @@
+"""
+fuzzy_search_tasks on a large user: pairwise is_relevant over every title
+(the previous implementation) vs the trigram-index shortlist.
+
+Run from server/:
+    python -m benchmarks.bench_fuzzy_search --titles 10000 --queries 200
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from app.domain.task_backends import InMemoryTaskBackend
+from app.domain.tasks import TaskStore
+from app.utils.text_matcher import is_relevant
+
+WORDS = [
+    "اجتماع", "الفريق", "العميل", "مراجعة", "تقرير", "شراء", "الحليب", "دفع", "فاتورة",
+    "الكهرباء", "موعد", "الطبيب", "دراسة", "امتحان", "الرياضيات", "تمرين", "رياضة",
+    "مكالمة", "الوالدة", "تنظيف", "البيت", "كتابة", "مقال", "تحضير", "عرض", "تقديمي",
+    "حجز", "تذكرة", "سفر", "صيانة", "السيارة", "قراءة", "كتاب", "اتصال", "بالبنك",
+]
+
+
+def _titles(n: int, rng: random.Random):
+    return [" ".join(rng.sample(WORDS, rng.randint(2, 4))) + f" {i}" for i in range(n)]
+
+
+def _pairwise(store: TaskStore, user_id: str, q: str, limit: int = 5):
+    scored = []
+    for t in store.list_tasks(user_id, status="all"):
+        ok, overlap, sim = is_relevant(q, t.title, min_overlap=1, min_sim=0.65)
+        if ok:
+            scored.append((t, sim, overlap))
+    scored.sort(key=lambda item: (item[2], item[1]), reverse=True)
+    return scored[:limit]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--titles", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    store = TaskStore(InMemoryTaskBackend())
+    for title in _titles(args.titles, rng):
+        store.create_task("u1", title)
+    queries = [" ".join(rng.sample(WORDS, rng.randint(1, 2))) for _ in range(args.queries)]
+
+    start = time.perf_counter()
+    store.fuzzy_search_tasks("u1", queries[0])  # builds the index once
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    baseline = [_pairwise(store, "u1", q) for q in queries]
+    pairwise = time.perf_counter() - start
+
+    start = time.perf_counter()
+    indexed = [store.fuzzy_search_tasks("u1", q) for q in queries]
+    index_time = time.perf_counter() - start
+
+    # With many exact ties (same overlap and similarity) the shortlist may pick different,
+    # equally-scored tasks, so compare the score rankings as well as the ids.
+    same_ids = sum(
+        [t.id for t, _, _ in a] == [t.id for t, _, _ in b] for a, b in zip(baseline, indexed)
+    )
+    same_scores = sum(
+        [(o, round(s, 6)) for _, s, o in a] == [(o, round(s, 6)) for _, s, o in b]
+        for a, b in zip(baseline, indexed)
+    )
+    print(f"titles={args.titles} queries={args.queries} index_build={build * 1000:.1f}ms")
+    print(f"pairwise: {pairwise / args.queries * 1000:.2f} ms/query")
+    print(f"indexed:  {index_time / args.queries * 1000:.2f} ms/query")
+    print(f"speedup:  {pairwise / index_time:.1f}x")
+    print(f"identical score rankings={same_scores}/{args.queries} identical ids={same_ids}/{args.queries}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Concurrent throughput of the intent path inside one event loop (one worker).
+
+Compares the blocking interpret_intent (what /v1/chat used to call from its
+async handler) against interpret_intent_async, both talking to a local fake
+Gemini endpoint with fixed latency.
+
+Run from server/:
+    python -m benchmarks.bench_intent_async --requests 200 --concurrency 50 --latency-ms 100
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from app.llm import gemini_adapter
+from app.llm.gemini_keypool import GeminiKeyPool
+from app.settings import settings
+from benchmarks.fake_gemini import FakeGeminiServer
+
+NOW_ISO = "2026-01-01T09:00:00+02:00"
+
+
+async def _run(call, total: int, concurrency: int) -> float:
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with sem:
+            await call(f"شو مهامي {i}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return time.perf_counter() - start
+
+
+async def _blocking(message: str):
+    # What the route did before: a sync Gemini call straight from async code
+    gemini_adapter.interpret_intent(message, "Asia/Hebron", NOW_ISO)
+
+
+async def _async(message: str):
+    await gemini_adapter.interpret_intent_async(message, "Asia/Hebron", NOW_ISO)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    args = parser.parse_args()
+
+    server = FakeGeminiServer(latency_ms=args.latency_ms).start()
+    gemini_adapter._key_pool = GeminiKeyPool(keys=["bench-key"], base_url=server.base_url)
+    gemini_adapter._AVAILABLE_MODELS = [settings.gemini_model]
+    # measure the Gemini path itself, not the local fast path or the intent cache
+    settings.rule_fast_path_enabled = False
+    settings.intent_cache_enabled = False
+
+    try:
+        for name, call in (("blocking", _blocking), ("async", _async)):
+            elapsed = asyncio.run(_run(call, args.requests, args.concurrency))
+            print(
+                f"{name:9s} requests={args.requests} concurrency={args.concurrency} "
+                f"elapsed={elapsed:.2f}s throughput={args.requests / elapsed:.1f} req/s"
+            )
+        print(f"fake endpoint: requests={server.requests} connections={server.connections}")
+        print(f"pool: {gemini_adapter.key_pool_stats()}")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Intent cache on a repetitive message stream: users repeat a few phrasings far
+more than anything else. Fast path off, so every message would otherwise be a
+Gemini call; reports hit rate, Gemini calls and mean latency with the cache off
+and on, against the local fake Gemini endpoint.
+
+Run from server/:
+    python -m benchmarks.bench_intent_cache --messages 300 --latency-ms 100
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import time
+
+from app.llm import gemini_adapter
+from app.llm.gemini_keypool import GeminiKeyPool
+from app.llm.intent_cache import IntentCache
+from app.settings import settings
+from benchmarks.fake_gemini import FakeGeminiServer
+
+NOW_ISO = "2026-01-01T09:00:00+02:00"
+PHRASES = [
+    "شو مهامي",
+    "شو مهامي اليوم",
+    "اعرض المهام اليوم",
+    "شو عندي بكرة",
+    "ورجيني مهامي",
+    "ايش المطلوب مني",
+    "شو عندي هالاسبوع",
+    "مهامي المتأخرة",
+]
+
+
+def _stream(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    weights = [1 / (i + 1) for i in range(len(PHRASES))]  # Zipf-like
+    out = []
+    for i in range(n):
+        phrase = rng.choices(PHRASES, weights)[0]
+        # some one-off messages that never repeat
+        out.append(phrase if rng.random() < 0.85 else f"{phrase} رقم {i}")
+    return out
+
+
+async def _run(messages) -> float:
+    start = time.perf_counter()
+    for m in messages:
+        await gemini_adapter.interpret_intent_async(m, "Asia/Gaza", NOW_ISO)
+    return (time.perf_counter() - start) / len(messages)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=300)
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    args = parser.parse_args()
+
+    server = FakeGeminiServer(latency_ms=args.latency_ms).start()
+    gemini_adapter._key_pool = GeminiKeyPool(keys=["bench-key"], base_url=server.base_url)
+    gemini_adapter._AVAILABLE_MODELS = [settings.gemini_model]
+    settings.rule_fast_path_enabled = False
+    messages = _stream(args.messages)
+    try:
+        for enabled in (False, True):
+            settings.intent_cache_enabled = enabled
+            gemini_adapter._intent_cache = IntentCache(10_000, 600, 3600)
+            before = server.requests
+            mean = asyncio.run(_run(messages))
+            stats = gemini_adapter.intent_cache_stats()
+            print(
+                f"cache {'on ' if enabled else 'off'}: mean={mean * 1000:.1f} ms/message "
+                f"gemini calls={server.requests - before} hit_rate={stats['hit_rate']:.2f}"
+            )
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Arabic normalization: the previous per-call NFKC + NFD + category filter +
+replace chain vs the shared translate-table normalizer, uncached and with the
+per-string LRU (the same message is normalized by several parsers per turn).
+
+Run from server/:
+    python -m benchmarks.bench_normalizer --rounds 20000
+"""
+from __future__ import annotations
+
+import argparse
+import time
+import unicodedata
+
+from app.utils import arabic_normalizer
+
+MESSAGES = [
+    "ذَكِّرْنِي بُكْرَة الساعة ٥ أروح عند الطبيب",
+    "لازم أخلص التقرير خلال ساعتين قبل الاجتماع",
+    "احذف مهمة الاجتماع مع العميل إلى الأسبوع الجاي",
+    "شو مهامي اليوم",
+]
+
+
+def _old(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text)
+    text = "".join(ch for ch in unicodedata.normalize("NFD", text) if unicodedata.category(ch) != "Mn")
+    text = text.replace("أ", "ا").replace("إ", "ا").replace("آ", "ا")
+    text = text.replace("ى", "ي")
+    return text.translate(str.maketrans("٠١٢٣٤٥٦٧٨٩", "0123456789"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=20000)
+    args = parser.parse_args()
+
+    uncached = arabic_normalizer.normalize.__wrapped__
+    assert [_old(m) for m in MESSAGES] == [uncached(m) for m in MESSAGES]
+    n = args.rounds * len(MESSAGES)
+    for name, fn in (("unicodedata", _old), ("translate", uncached), ("translate+lru", arabic_normalizer.normalize)):
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            for m in MESSAGES:
+                fn(m)
+        elapsed = time.perf_counter() - start
+        print(f"{name:>13}: {elapsed / n * 1e6:.2f} us/call")
+
+
+if __name__ == "__main__":
+    main()
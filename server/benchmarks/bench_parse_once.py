@@ -0,0 +1,88 @@
+"""
+Duration/due parsing per fallback create turn: the previous flow ran each parser
+three times (rule_based_extract, its _clean_title, then the chat create branch
+on the returned title) vs one ParsedMessage.parse shared by all three.
+
+Run from server/:
+    python -m benchmarks.bench_parse_once --rounds 2000
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+import app.utils.parsed_message as pm
+from app.utils.arabic_duration_parser import extract_duration_minutes_and_clean
+from app.utils.arabic_time_parser import extract_due_datetime_and_clean
+from app.utils.parsed_message import ParsedMessage, clean_title
+
+TZ = "Asia/Gaza"
+MESSAGES = [
+    "ذكرني بكرة الساعة 5 اروح عند الطبيب",
+    "لازم اخلص التقرير خلال ساعتين قبل الاجتماع مع الفريق",
+    "بدي احجز تذكرة سفر بعد بكرة الساعة 9 الصبح",
+    "مهمة: مراجعة العقد لمدة نص ساعة",
+]
+
+calls: Counter = Counter()
+
+
+def _duration(text):
+    calls["duration"] += 1
+    return extract_duration_minutes_and_clean(text)
+
+
+def _due(text, tz, now):
+    calls["due"] += 1
+    return extract_due_datetime_and_clean(text, tz, now)
+
+
+def _old(message: str, now: datetime):
+    # rule_based_extract
+    duration, after = _duration(message.strip())
+    due, cleaned = _due(after, TZ, now)
+    # its _clean_title re-parsed the already cleaned text in UTC
+    _, again = _due(cleaned, "UTC", now)
+    _, again = _duration(again)
+    title = clean_title(again)
+    # chat create branch re-parsed the returned title
+    duration2, after2 = _duration(title)
+    due2, title = _due(after2, TZ, now)
+    return title
+
+
+def _new(message: str, now: datetime):
+    return ParsedMessage.parse(message, TZ, now).title
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    now = datetime.now(timezone.utc)
+    # count the new path's parser calls through the module it imports them into
+    pm.extract_duration_minutes_and_clean = _duration
+    pm.extract_due_datetime_and_clean = _due
+
+    n = args.rounds * len(MESSAGES)
+    for name, fn in (("parse x3", _old), ("parse once", _new)):
+        calls.clear()
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            for m in MESSAGES:
+                fn(m, now)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{name:>10}: {elapsed / n * 1e6:.1f} us/message, "
+            f"duration calls/msg={calls['duration'] / n:.0f} due calls/msg={calls['due'] / n:.0f}"
+        )
+
+    timings = ParsedMessage.parse(MESSAGES[0], TZ, now).timings
+    print("per-stage (one message):", timings)
+
+
+if __name__ == "__main__":
+    main()
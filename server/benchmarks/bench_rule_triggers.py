@@ -0,0 +1,77 @@
+"""
+Trigger classification + title-hint cleanup in rule_based_extract: the previous
+per-list `any(k in lower ...)` scans and 15 sequential re.sub calls vs the
+PhraseMatcher automaton and the single precompiled lead-word regex.
+
+Run from server/:
+    python -m benchmarks.bench_rule_triggers --rounds 20000
+"""
+from __future__ import annotations
+
+import argparse
+import re
+import time
+
+from app.utils.parsed_message import TRIGGERS, extract_title_hint
+
+DELETE = ["احذف", "حذف", "امسح", "شيل", "اشطب", "الغ", "إلغاء مهمة", "delete", "remove"]
+CREATE = ["بدي", "بدّي", "ذكرني", "ذكّرني", "ذكّر", "ذكر", "لازم", "مهمة", "موعد", "تذكير", "حجز", "اضف", "ضيف", "سجل", "create", "add"]
+LIST = ["مهامي", "شو مهامي", "اعرض المهام", "ورجيني مهامي", "ما هي المهام", "شو عندي"]
+LEAD = [
+    r"^احذف\s*", r"^أحذف\s*", r"^حذف\s*", r"^امسح\s*", r"^شيل\s*", r"^اشطب\s*", r"^الغ\s*",
+    r"^ألغي\s*", r"^بدي\s+", r"^بدّي\s+", r"^ذكّرني\s+ب?\s*", r"^ذكرني\s+ب?\s*", r"^لازم\s+",
+    r"^مهمة\s*[:\-]?\s*", r"^موعد\s*[:\-]?\s*",
+]
+
+MESSAGES = [
+    "ذكرني بكرة الساعة 5 اروح عند الطبيب",
+    "شو مهامي اليوم",
+    "احذف مهمة الاجتماع مع العميل",
+    "مرحبا كيفك",
+    "لازم اخلص التقرير خلال ساعتين قبل الاجتماع مع الفريق",
+    "بدي احجز تذكرة سفر للأسبوع الجاي",
+    "ورجيني مهامي المنجزة",
+    "امسح موعد الطبيب",
+]
+
+
+def _old(message: str):
+    lower = message.strip().lower()
+    if any(k in lower for k in DELETE):
+        label = "delete"
+    elif any(k in lower for k in LIST):
+        label = "list"
+    elif any(k in lower for k in CREATE):
+        label = "create"
+    else:
+        label = "chat"
+    hint = message.strip()
+    for pat in LEAD:
+        hint = re.sub(pat, "", hint, flags=re.IGNORECASE).strip()
+    return label, hint[:60].strip() or None
+
+
+def _new(message: str):
+    triggers = TRIGGERS.labels(message.strip().lower())
+    label = next((l for l in ("delete", "list", "create") if l in triggers), "chat")
+    return label, extract_title_hint(message)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=20000)
+    args = parser.parse_args()
+
+    assert [_old(m) for m in MESSAGES] == [_new(m) for m in MESSAGES]
+    n = args.rounds * len(MESSAGES)
+    for name, fn in (("any()+re.sub", _old), ("automaton", _new)):
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            for m in MESSAGES:
+                fn(m)
+        elapsed = time.perf_counter() - start
+        print(f"{name:>13}: {elapsed / n * 1e6:.2f} us/message ({n / elapsed:,.0f} msgs/s)")
+
+
+if __name__ == "__main__":
+    main()
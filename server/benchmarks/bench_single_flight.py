@@ -0,0 +1,64 @@
+"""
+Double-send / client-retry bursts: each burst fires the same message
+`--dupes` times at once through interpret_intent_async. Fast path and intent
+cache are off so only single-flight can save the calls; reports Gemini calls
+and wall time per burst with coalescing off and on, against the local fake
+Gemini endpoint.
+
+Run from server/:
+    python -m benchmarks.bench_single_flight --bursts 20 --dupes 3 --latency-ms 100
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from app.llm import gemini_adapter
+from app.llm.gemini_keypool import GeminiKeyPool
+from app.llm.single_flight import SingleFlight
+from app.settings import settings
+from benchmarks.fake_gemini import FakeGeminiServer
+
+NOW_ISO = "2026-01-01T09:00:00+02:00"
+
+
+async def _run(bursts: int, dupes: int) -> float:
+    start = time.perf_counter()
+    for i in range(bursts):
+        message = f"شو عندي مهام رقم {i}"
+        await asyncio.gather(
+            *(gemini_adapter.interpret_intent_async(message, "Asia/Gaza", NOW_ISO) for _ in range(dupes))
+        )
+    return (time.perf_counter() - start) / bursts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bursts", type=int, default=20)
+    parser.add_argument("--dupes", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    args = parser.parse_args()
+
+    server = FakeGeminiServer(latency_ms=args.latency_ms).start()
+    gemini_adapter._key_pool = GeminiKeyPool(keys=["bench-key"], base_url=server.base_url)
+    gemini_adapter._AVAILABLE_MODELS = [settings.gemini_model]
+    settings.rule_fast_path_enabled = False
+    settings.intent_cache_enabled = False
+    try:
+        for enabled in (False, True):
+            settings.single_flight_enabled = enabled
+            gemini_adapter._single_flight = SingleFlight()
+            before = server.requests
+            per_burst = asyncio.run(_run(args.bursts, args.dupes))
+            stats = gemini_adapter.single_flight_stats()
+            print(
+                f"single-flight {'on ' if enabled else 'off'}: {per_burst * 1000:.1f} ms/burst "
+                f"gemini calls={server.requests - before} coalesced={stats['coalesced']}"
+            )
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
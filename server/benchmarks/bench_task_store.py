@@ -0,0 +1,66 @@
+"""
+Offline task-store throughput: AsyncTaskStore over the in-memory backend with
+injected latency/failures standing in for Firestore.
+
+Run from server/:
+    python -m benchmarks.bench_task_store --users 50 --ops 20 --latency-ms 20 --jitter-ms 10
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from app.domain.task_backends import FaultInjectingBackend, InMemoryTaskBackend
+from app.domain.tasks import AsyncTaskStore, StorePool, TaskStore
+
+
+async def _user_session(astore: AsyncTaskStore, user_id: str, ops: int, errors: list):
+    for i in range(ops):
+        try:
+            if i % 4 == 3:
+                await astore.list_tasks(user_id, status="all")
+            else:
+                await astore.create_task(user_id, f"مهمة رقم {i}")
+        except Exception as exc:
+            errors.append(exc)
+
+
+async def _run(args) -> None:
+    backend = FaultInjectingBackend(
+        InMemoryTaskBackend(),
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        failure_rate=args.failure_rate,
+        seed=7,
+    )
+    pool = StorePool(max_workers=args.workers, max_pending=args.max_pending)
+    astore = AsyncTaskStore(TaskStore(backend), pool=pool)
+    errors: list = []
+
+    start = time.perf_counter()
+    await asyncio.gather(*(_user_session(astore, f"u{u}", args.ops, errors) for u in range(args.users)))
+    elapsed = time.perf_counter() - start
+
+    total = args.users * args.ops
+    print(
+        f"ops={total} elapsed={elapsed:.2f}s throughput={total / elapsed:.1f} ops/s "
+        f"errors={len(errors)} backend_calls={backend.calls}"
+    )
+    print(f"pool: {pool.stats()}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--ops", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--max-pending", type=int, default=256)
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Per-candidate cost of app.utils.text_matcher.
+
+Run from server/:
+    python -m benchmarks.bench_text_matcher --n 5000
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import timeit
+
+from app.utils import text_matcher as tm
+
+WORDS = ["اجتماع", "الفريق", "العميل", "مراجعة", "تقرير", "شراء", "الحليب", "فاتورة", "الكهرباء", "موعد", "الطبيب"]
+
+
+def _dp_distance(a: str, b: str) -> int:
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return prev[-1]
+
+
+def _per_call_us(fn, n: int) -> float:
+    return timeit.timeit(fn, number=n) / n * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=5000)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    titles = [" ".join(rng.sample(WORDS, 3)) + f" {i}" for i in range(args.n)]
+    long_a = "مراجعة تقرير الفريق الشهري " * 4
+    long_b = "مراجعه تقارير الفريق الشهريه " * 4
+
+    it = iter(range(10**9))
+    print(f"normalize_text:         {_per_call_us(lambda: tm.normalize_text(titles[next(it) % args.n]), args.n):8.2f} us")
+    tm.tokenize.cache_clear()
+    it = iter(range(10**9))
+    print(f"tokenize (cold):        {_per_call_us(lambda: tm.tokenize(titles[next(it) % args.n]), args.n):8.2f} us")
+    print(f"tokenize (cached):      {_per_call_us(lambda: tm.tokenize(titles[0]), args.n):8.2f} us")
+    print(f"edit_distance bitpar:   {_per_call_us(lambda: tm.edit_distance(long_a, long_b), 2000):8.2f} us  (len {len(long_a)})")
+    print(f"edit_distance DP:       {_per_call_us(lambda: _dp_distance(long_a, long_b), 200):8.2f} us")
+
+    tm._score.cache_clear()
+    it = iter(range(10**9))
+    cold = _per_call_us(lambda: tm.is_relevant("مراجعه تقرير", titles[next(it) % args.n]), args.n)
+    print(f"is_relevant (cold):     {cold:8.2f} us/candidate")
+    it = iter(range(10**9))
+    warm = _per_call_us(lambda: tm.is_relevant("مراجعه تقرير", titles[next(it) % args.n]), args.n)
+    print(f"is_relevant (cached):   {warm:8.2f} us/candidate")
+    worst = _per_call_us(lambda: tm.similarity("ب" * 500, "ت" * 500), 200)
+    print(f"similarity worst-case:  {worst:8.2f} us  (inputs capped at {tm.MAX_SIM_CHARS} chars)")
+
+
+if __name__ == "__main__":
+    main()
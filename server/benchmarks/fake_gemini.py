@@ -0,0 +1,111 @@
+"""
+Minimal local stand-in for the Gemini generateContent endpoint.
+
+Speaks just enough HTTP/1.1 (keep-alive, Content-Length bodies) for the
+google-genai SDK, answers every request with a fixed structured-output
+payload after `latency_ms`, and counts requests/connections so benchmarks
+can report connection reuse.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from typing import Optional
+
+DEFAULT_INTENT = {
+    "intent": "list_tasks",
+    "title": None,
+    "due": {"kind": "none", "iso": None, "confidence": 0.0},
+    "duration_minutes": None,
+    "needsClarification": False,
+    "clarifyQuestion": None,
+    "titleQuery": None,
+    "taskId": None,
+    "needsConfirmation": False,
+    "confirmMessage": None,
+    "confidence": 0.9,
+}
+
+
+class FakeGeminiServer:
+    def __init__(self, latency_ms: float = 100.0, intent: Optional[dict] = None):
+        self.latency_ms = latency_ms
+        self.intent = intent or DEFAULT_INTENT
+        self.requests = 0
+        self.connections = 0
+        self.port = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def _body(self) -> bytes:
+        return json.dumps(
+            {
+                "candidates": [
+                    {
+                        "content": {"role": "model", "parts": [{"text": json.dumps(self.intent)}]},
+                        "finishReason": "STOP",
+                    }
+                ]
+            }
+        ).encode("utf-8")
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.decode("latin-1").split("\r\n"):
+                    if line.lower().startswith("content-length:"):
+                        length = int(line.split(":", 1)[1].strip())
+                if length:
+                    await reader.readexactly(length)
+                self.requests += 1
+                await asyncio.sleep(self.latency_ms / 1000.0)
+                body = self._body()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\n"
+                    b"Content-Type: application/json\r\n"
+                    + f"Content-Length: {len(body)}\r\n\r\n".encode("ascii")
+                    + body
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.CancelledError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._handle, "127.0.0.1", 0)
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    def start(self) -> "FakeGeminiServer":
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    async def _shutdown(self):
+        self._server.close()
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._loop.stop()
+
+    def stop(self) -> None:
+        if self._loop:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop)
+        self._thread.join(timeout=2)
@@ -0,0 +1,142 @@
+"""
+Minimal local stand-in for a Redis server.
+
+Speaks RESP2 over TCP and implements only what RespStateBackend uses:
+PING, AUTH, SELECT, GET, SET (with PX), DEL, WATCH, UNWATCH, MULTI, EXEC,
+DISCARD. WATCH/EXEC follow Redis semantics (EXEC returns nil when a watched
+key was written by anyone since WATCH). Counts connections and commands.
+"""
+from __future__ import annotations
+
+import socketserver
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: "_Server"
+
+    def _read_command(self) -> Optional[List[bytes]]:
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            return line.strip().split()
+        args = []
+        for _ in range(int(line[1:-2])):
+            n = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(n + 2)[:-2])
+        return args
+
+    @staticmethod
+    def _bulk(value: Optional[bytes]) -> bytes:
+        if value is None:
+            return b"$-1\r\n"
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+
+    def handle(self) -> None:
+        fake = self.server.fake
+        with fake.lock:
+            fake.connections += 1
+        watched: Dict[bytes, int] = {}
+        queued: Optional[List[List[bytes]]] = None
+        while True:
+            args = self._read_command()
+            if args is None:
+                return
+            cmd = args[0].upper()
+            with fake.lock:
+                fake.commands += 1
+                if queued is not None and cmd not in (b"EXEC", b"DISCARD", b"MULTI", b"WATCH"):
+                    queued.append(args)
+                    reply = b"+QUEUED\r\n"
+                elif cmd == b"MULTI":
+                    queued = []
+                    reply = b"+OK\r\n"
+                elif cmd == b"DISCARD":
+                    queued, watched = None, {}
+                    reply = b"+OK\r\n"
+                elif cmd == b"EXEC":
+                    if queued is None:
+                        reply = b"-ERR EXEC without MULTI\r\n"
+                    elif any(fake.mod.get(k, 0) != v for k, v in watched.items()):
+                        reply = b"*-1\r\n"
+                    else:
+                        parts = [fake.apply(c) for c in queued]
+                        reply = b"*%d\r\n" % len(parts) + b"".join(parts)
+                    queued, watched = None, {}
+                elif cmd == b"WATCH":
+                    for k in args[1:]:
+                        watched[k] = fake.mod.get(k, 0)
+                    reply = b"+OK\r\n"
+                elif cmd == b"UNWATCH":
+                    watched = {}
+                    reply = b"+OK\r\n"
+                else:
+                    reply = fake.apply(args)
+            self.wfile.write(reply)
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class FakeRespServer:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+        self.mod: Dict[bytes, int] = {}  # per-key write counter, for WATCH
+        self.connections = 0
+        self.commands = 0
+        self._server = _Server(("127.0.0.1", 0), _Handler)
+        self._server.fake = self
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"redis://127.0.0.1:{self._server.server_address[1]}/0"
+
+    def start(self) -> "FakeRespServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        item = self.data.get(key)
+        if item is None:
+            return None
+        value, expires = item
+        if expires is not None and time.time() >= expires:
+            del self.data[key]
+            return None
+        return value
+
+    def apply(self, args: List[bytes]) -> bytes:
+        """Run one non-transactional command; caller holds self.lock."""
+        cmd = args[0].upper()
+        if cmd in (b"PING",):
+            return b"+PONG\r\n"
+        if cmd in (b"AUTH", b"SELECT"):
+            return b"+OK\r\n"
+        if cmd == b"GET":
+            return _Handler._bulk(self._get(args[1]))
+        if cmd == b"SET":
+            expires = None
+            if len(args) >= 5 and args[3].upper() == b"PX":
+                expires = time.time() + int(args[4]) / 1000.0
+            self.data[args[1]] = (args[2], expires)
+            self.mod[args[1]] = self.mod.get(args[1], 0) + 1
+            return b"+OK\r\n"
+        if cmd == b"DEL":
+            n = 0
+            for k in args[1:]:
+                if self.data.pop(k, None) is not None:
+                    n += 1
+                    self.mod[k] = self.mod.get(k, 0) + 1
+            return b":%d\r\n" % n
+        return b"-ERR unknown command '%s'\r\n" % cmd
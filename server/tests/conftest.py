@@ -0,0 +1,4 @@
+import os
+
+# Run the suite against the in-memory task backend (no Firestore credentials needed)
+os.environ.setdefault("TASK_STORE_BACKEND", "memory")
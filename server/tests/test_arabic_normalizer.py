@@ -0,0 +1,52 @@
+from datetime import datetime
+
+import pytz
+
+from app.utils.arabic_normalizer import cache_stats, normalize, normalize_with_offsets
+from app.utils.arabic_time_parser import REL_DAY_NORM, extract_due_datetime_and_clean
+
+
+def test_normalize_folds_diacritics_alef_yeh_digits():
+    assert normalize("أَحْمَد إلى آخر مستشفى ٣٠") == "احمد الي اخر مستشفي 30"
+    assert normalize("ﻻ") == "لا"  # presentation-form ligature expands to two letters
+    assert normalize("") == ""
+    assert normalize("plain ascii") == "plain ascii"
+
+
+def test_normalize_is_cached_per_raw_string():
+    before = cache_stats()["normalize"]["hits"]
+    normalize("بُكْرَة الساعة ٥")
+    normalize("بُكْرَة الساعة ٥")
+    assert cache_stats()["normalize"]["hits"] >= before + 1
+
+
+def test_offsets_map_spans_back_to_original():
+    nt = normalize_with_offsets("ﻻزم بُكْرَة")
+    assert nt.text == "لازم بكرة"
+    start = nt.text.index("بكرة")
+    s, e = nt.original_span((start, start + len("بكرة")))
+    assert nt.original[s:e] == "بُكْرَة"  # trailing fatha goes with the match
+    assert nt.original_span((0, 2)) == (0, 1)  # both letters of the ligature come from one char
+    assert nt.remove_spans((start, start + 4)).strip() == "ﻻزم"
+
+
+def test_due_removal_keeps_diacritized_title_intact():
+    now = datetime.now(pytz.timezone("Asia/Gaza"))
+    due, cleaned = extract_due_datetime_and_clean("اتَّصِلْ بِأَحْمَد بُكْرَة الساعة ٥", "Asia/Gaza", now)
+    assert due is not None
+    assert cleaned == "اتَّصِلْ بِأَحْمَد"
+
+
+def test_relative_day_keys_are_normalized():
+    assert "غداً" not in REL_DAY_NORM and REL_DAY_NORM["غدا"] == 1
+
+
+def test_fold_table_growth_is_bounded():
+    from app.utils.arabic_normalizer import _FoldTable
+
+    table = _FoldTable(max_extra=8)
+    table.update({cp: chr(cp) for cp in range(0x80)})
+    table.base_size = len(table)
+    text = "".join(chr(cp) for cp in range(0x4E00, 0x4E40)) + "ｆｕｌｌ"
+    assert text.translate(table).endswith("full")  # still folded past the cap
+    assert len(table) - table.base_size == 8
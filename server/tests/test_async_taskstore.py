@@ -0,0 +1,93 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.domain.tasks import AsyncTaskStore, StoreOverloadedError, StorePool
+
+
+class SlowStore:
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.threads = set()
+
+    def list_tasks(self, user_id, **kwargs):
+        self.threads.add(threading.get_ident())
+        time.sleep(self.delay)
+        return [user_id]
+
+
+def test_async_store_overlaps_calls():
+    pool = StorePool(max_workers=8, max_pending=16)
+    astore = AsyncTaskStore(SlowStore(0.05), pool=pool)
+
+    async def run():
+        return await asyncio.gather(*(astore.list_tasks(f"u{i}") for i in range(8)))
+
+    start = time.perf_counter()
+    results = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+
+    assert results == [[f"u{i}"] for i in range(8)]
+    assert elapsed < 0.3  # 8 x 50ms would take 400ms serialized
+    stats = pool.stats()
+    assert stats["completed"] == 8
+    assert stats["queue_depth"] == 0
+
+
+def test_async_store_rejects_when_saturated():
+    pool = StorePool(max_workers=1, max_pending=2)
+    astore = AsyncTaskStore(SlowStore(0.05), pool=pool)
+
+    async def run():
+        return await asyncio.gather(
+            *(astore.list_tasks("u1") for _ in range(4)), return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+    rejected = [r for r in results if isinstance(r, StoreOverloadedError)]
+    assert len(rejected) == 2
+    stats = pool.stats()
+    assert stats["rejected"] == 2
+    assert stats["max_queue_depth"] >= 1
+
+
+def test_store_pool_propagates_errors():
+    pool = StorePool(max_workers=1, max_pending=1)
+
+    def boom():
+        raise ValueError("x")
+
+    with pytest.raises(ValueError):
+        asyncio.run(pool.run(boom))
+    assert pool.stats()["failed"] == 1
+
+
+def test_cancelled_caller_keeps_the_slot_until_the_job_ends():
+    pool = StorePool(max_workers=1, max_pending=1)
+    started, release = threading.Event(), threading.Event()
+
+    def blocking():
+        started.set()
+        release.wait(2)
+        return "done"
+
+    async def run():
+        caller = asyncio.create_task(pool.run(blocking))
+        await asyncio.to_thread(started.wait, 2)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        # the job still occupies the only worker: its slot is not free yet
+        with pytest.raises(StoreOverloadedError):
+            await pool.run(lambda: None)
+        assert pool.stats()["running"] == 1
+        release.set()
+        while pool.stats()["completed"] < 1:
+            await asyncio.sleep(0.01)
+        return await pool.run(lambda: "next")
+
+    assert asyncio.run(run()) == "next"
+    stats = pool.stats()
+    assert (stats["completed"], stats["rejected"], stats["queue_depth"]) == (2, 1, 0)
@@ -0,0 +1,38 @@
+from datetime import datetime
+
+import pytz
+
+from app.utils.clock import RequestClock, in_zone, resolve_timezone, timezone_or_utc
+
+
+def test_resolve_timezone_caches_hits_and_misses():
+    resolve_timezone.cache_clear()
+    assert resolve_timezone("Asia/Gaza") is pytz.timezone("Asia/Gaza")
+    assert resolve_timezone("Not/AZone") is None
+    assert resolve_timezone("Not/AZone") is None
+    assert resolve_timezone("Asia/Gaza") is not None
+    info = resolve_timezone.cache_info()
+    assert (info.hits, info.misses) == (2, 2)
+    assert timezone_or_utc("Not/AZone") is pytz.UTC
+    assert resolve_timezone(None) is None
+
+
+def test_request_clock_reads_now_once():
+    fixed = datetime(2026, 10, 17, 7, 0, tzinfo=pytz.UTC)
+    clock = RequestClock("Asia/Gaza", now=fixed)
+    assert clock.valid and clock.timezone == "Asia/Gaza"
+    assert clock.now.hour == 10 and clock.ts == fixed.timestamp()
+    assert clock.iso is clock.iso  # formatted once
+    assert clock.today.day == 17
+
+
+def test_request_clock_falls_back_to_utc():
+    clock = RequestClock("Mars/Olympus")
+    assert not clock.valid and clock.timezone == "UTC" and clock.tz is pytz.UTC
+
+
+def test_in_zone_skips_conversion_for_same_zone():
+    gaza = pytz.timezone("Asia/Gaza")
+    now = datetime.now(gaza)
+    assert in_zone(now, gaza) is now
+    assert in_zone(now, pytz.UTC).tzinfo is pytz.UTC
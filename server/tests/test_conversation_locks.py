@@ -0,0 +1,79 @@
+import asyncio
+
+from app.domain.conversation_locks import ConversationLocks
+
+
+async def _turn(locks, key, log, delay=0.02):
+    async with locks.hold(key):
+        log.append(("start", key))
+        await asyncio.sleep(delay)
+        log.append(("end", key))
+
+
+def test_same_conversation_is_serialized():
+    locks = ConversationLocks(max_entries=100, stripes=4)
+    log = []
+
+    async def main():
+        await asyncio.gather(*(_turn(locks, "c1", log) for _ in range(3)))
+
+    asyncio.run(main())
+    # every start is immediately followed by its own end
+    assert [e for e, _ in log] == ["start", "end"] * 3
+    stats = locks.stats()
+    assert stats["acquired"] == 3 and stats["contended"] == 2
+    assert stats["wait_seconds_max"] > 0
+    assert len(locks) == 0  # self-cleaning
+
+
+def test_different_conversations_run_in_parallel():
+    locks = ConversationLocks(max_entries=100, stripes=4)
+    log = []
+
+    async def main():
+        await asyncio.gather(*(_turn(locks, f"c{i}", log, delay=0.05) for i in range(10)))
+
+    loop_start = asyncio.run(_timed(main))
+    assert loop_start < 0.25
+    assert locks.stats()["contended"] == 0
+    assert locks.stats()["peak"] == 10
+    assert len(locks) == 0
+
+
+async def _timed(fn):
+    start = asyncio.get_running_loop().time()
+    await fn()
+    return asyncio.get_running_loop().time() - start
+
+
+def test_full_table_falls_back_to_stripes():
+    locks = ConversationLocks(max_entries=1, stripes=1)
+    log = []
+
+    async def main():
+        await asyncio.gather(_turn(locks, "a", log), _turn(locks, "b", log), _turn(locks, "b", log))
+
+    asyncio.run(main())
+    stats = locks.stats()
+    assert stats["stripe_fallbacks"] == 2
+    assert [e for e, k in log if k == "b"] == ["start", "end", "start", "end"]
+    assert len(locks) == 0
+
+
+def test_striped_key_keeps_its_stripe_after_the_table_frees_up():
+    locks = ConversationLocks(max_entries=1, stripes=4)
+    log = []
+
+    async def late(key, delay):
+        await asyncio.sleep(delay)
+        await _turn(locks, key, log, delay=0.02)
+
+    async def main():
+        # "a" fills the table, the first "b" overflows onto a stripe; the second
+        # "b" arrives after "a" left the table and must still wait for the first
+        await asyncio.gather(_turn(locks, "a", log, delay=0.01), _turn(locks, "b", log, delay=0.06), late("b", 0.03))
+
+    asyncio.run(main())
+    assert [e for e, k in log if k == "b"] == ["start", "end", "start", "end"]
+    assert locks.stats()["stripe_fallbacks"] == 2
+    assert len(locks) == 0 and not locks._striped
@@ -0,0 +1,100 @@
+import time
+
+from app.domain import conversation_state
+from app.domain.conversation_state import ConversationStore
+
+
+def _store(**kwargs):
+    return ConversationStore(
+        max_states=kwargs.get("max_states", 100),
+        ttl_seconds=kwargs.get("ttl_seconds", 60),
+        sweep_interval=kwargs.get("sweep_interval", 0),
+    )
+
+
+def test_module_api_keeps_semantics():
+    key = "conv-semantics"
+    conversation_state.update_state(key, pending=True, pending_intent="create_task")
+    state = conversation_state.get_state(key)
+    assert state.pending and state.pending_intent == "create_task"
+    assert conversation_state.get_state(key) is state
+
+    conversation_state.clear_state(key)
+    assert conversation_state.get_state(key).pending is False
+
+
+def test_lru_cap_evicts_least_recently_used():
+    store = _store(max_states=3)
+    for key in ("a", "b", "c"):
+        store.get(key)
+    store.get("a")  # a is now most recent
+    store.get("d")
+
+    assert len(store) == 3
+    assert store.stats()["evicted"] == 1
+    assert "b" not in store._states
+    assert "a" in store._states
+
+
+def test_sweep_drops_idle_states(monkeypatch):
+    from app.domain import conversation_state as cs
+
+    now = [1000.0]
+    monkeypatch.setattr(cs.time, "time", lambda: now[0])
+    store = _store(ttl_seconds=10)
+    store.get("idle")
+    store.get("active")
+    now[0] += 8
+    store.touch("active")
+    now[0] += 5
+
+    assert store.sweep() == 1
+    assert list(store._states) == ["active"]
+    stats = store.stats()
+    assert stats["live"] == 1 and stats["expired"] == 1
+
+
+def test_background_sweeper_runs():
+    store = _store(ttl_seconds=0.01, sweep_interval=0.01)
+    try:
+        store.get("k")
+        deadline = time.time() + 2
+        while len(store) and time.time() < deadline:
+            time.sleep(0.01)
+        assert len(store) == 0
+        assert store.stats()["sweeps"] >= 1
+    finally:
+        store.stop()
+
+
+def test_memory_accounting_tracks_updates_and_drops():
+    store = _store()
+    state = store.get("k")
+    empty = store.stats()["approx_bytes"]
+    assert empty > 0
+
+    state.entities = {"title": "اجتماع الفريق" * 20}
+    store.touch("k")
+    assert store.stats()["approx_bytes"] > empty
+
+    store.clear("k")
+    assert store.stats()["approx_bytes"] == 0
+
+
+def test_delete_flow_has_one_canonical_representation():
+    key = "conv-delete"
+    conversation_state.set_delete_pending(
+        key,
+        stage="awaiting_choice",
+        candidates=[{"taskId": "t1", "title": "اجتماع", "score": 0.9}, ("t2", "اجتماع العميل", 0.7)],
+        query="اجتماع",
+    )
+    state = conversation_state.get_state(key)
+    assert state.delete_stage == "awaiting_choice"
+    assert state.delete_candidates == (("t1", "اجتماع", 0.9), ("t2", "اجتماع العميل", 0.7))
+    assert state.candidate_dicts()[0] == {"taskId": "t1", "title": "اجتماع", "score": 0.9}
+    assert not hasattr(state, "__dict__")
+
+    conversation_state.clear_delete_state(key)
+    assert state.delete_stage is None and state.delete_candidates == ()
+    conversation_state.clear_state(key)
@@ -0,0 +1,85 @@
+from datetime import datetime
+
+import pytz
+
+from app.utils.arabic_duration_parser import extract_duration_minutes_and_clean
+from app.utils.arabic_time_parser import extract_due_datetime_and_clean, has_ambiguous_hour
+
+TZ = "Asia/Gaza"
+GAZA = pytz.timezone(TZ)
+NOW = GAZA.localize(datetime(2026, 10, 17, 10, 0))  # Saturday
+
+
+def _due(text):
+    return extract_due_datetime_and_clean(text, TZ, NOW)
+
+
+def test_longest_day_phrase_wins():
+    due, cleaned = _due("بعد بكرة اجتماع")
+    assert (due.day, due.hour) == (19, 9)
+    assert cleaned == "اجتماع"
+
+
+def test_relative_offsets():
+    due, cleaned = _due("ذكرني بعد ساعتين اتصل")
+    assert (due.hour, due.minute) == (12, 0) and cleaned == "ذكرني اتصل"
+    assert _due("بعد 3 ساعات")[0].hour == 13
+    assert _due("بعد نص ساعة")[0].minute == 30
+    due, _ = _due("بعد يومين الساعة 8")
+    assert (due.day, due.hour) == (19, 8)
+
+
+def test_weekdays_and_clock():
+    due, cleaned = _due("يوم الخميس الساعة 7 م اجتماع")
+    assert (due.day, due.hour) == (22, 19) and cleaned == "اجتماع"
+    assert _due("السبت")[0].day == 24  # same weekday means next week
+    assert _due("بكرة 5 المسا")[0].hour == 17
+
+
+def test_dates_get_their_own_dst_offset():
+    # Gaza leaves DST on Oct 24 2026; a week ahead must not reuse today's offset
+    due, _ = _due("بعد أسبوع")
+    assert due.utcoffset() == GAZA.localize(datetime(2026, 10, 24, 9)).utcoffset()
+    assert due.utcoffset() != NOW.utcoffset()
+
+
+def test_bare_numbers_and_durations_are_not_times():
+    assert _due("اشتري 2 خبز") == (None, "اشتري 2 خبز")
+    assert _due("لمدة 3 ساعات")[0] is None
+    assert _due("الساعة 25")[0] is None
+
+
+def test_offsets_are_not_durations():
+    assert extract_duration_minutes_and_clean("بعد ساعتين اتصل") == (None, "بعد ساعتين اتصل")
+    assert extract_duration_minutes_and_clean("اتصل لمدة ساعتين")[0] == 120
+
+
+def test_day_words_start_a_word():
+    # "الغدا" is lunch, not "غدا" (tomorrow) behind an article
+    assert _due("اجهز الغدا") == (None, "اجهز الغدا")
+    due, cleaned = _due("ذكرني بالغدا الساعة 2")
+    assert cleaned == "ذكرني بالغدا"
+    assert due == _due("ذكرني الساعة 2")[0]
+    due, cleaned = _due("بدي اجهز الغدا بكرة الساعة 2")
+    assert (due.day, due.hour) == (18, 2) and cleaned == "بدي اجهز الغدا"
+
+
+def test_clitics_before_day_words():
+    assert _due("صحيني مبكرة") == (None, "صحيني مبكرة")  # early, not بكرة
+    assert (_due("وبكرة الساعة 5")[0].day, _due("لغدا")[0].day) == (18, 18)
+    assert _due("وبعد ساعتين")[0].hour == 12
+
+
+def test_ambiguous_hours():
+    assert has_ambiguous_hour("بكرة الساعة 2")
+    assert not has_ambiguous_hour("بكرة الساعة 2 م")
+    assert not has_ambiguous_hour("بكرة الصبح الساعة 8")
+    assert not has_ambiguous_hour("الساعة 14") and not has_ambiguous_hour("بكرة")
+
+
+def test_teh_marbuta_and_heh_spellings():
+    for text in ("بكرة الساعة 5 اجتماع", "بكره الساعه 5 اجتماع", "بكرة الساعه 5 اجتماع", "بكره الساعة 5 اجتماع"):
+        due, cleaned = _due(text)
+        assert (due.day, due.hour) == (18, 5) and cleaned == "اجتماع", text
+    assert _due("بعد بكره")[0].day == 19
+    assert _due("لبكره")[0].day == 18
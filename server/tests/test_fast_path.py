@@ -0,0 +1,136 @@
+import asyncio
+
+import pytest
+
+import app.llm.gemini_adapter as adapter
+from app.llm.fast_path import FastPathStats
+from app.llm.gemini_keypool import GeminiKeyPool
+from app.settings import settings
+from benchmarks.fake_gemini import FakeGeminiServer
+
+NOW_ISO = "2026-01-01T09:00:00+02:00"
+
+
+@pytest.fixture
+def gemini(monkeypatch):
+    server = FakeGeminiServer(latency_ms=1).start()
+    monkeypatch.setattr(adapter, "_key_pool", GeminiKeyPool(keys=["k1"], base_url=server.base_url))
+    monkeypatch.setattr(adapter, "_AVAILABLE_MODELS", [settings.gemini_model])
+    monkeypatch.setattr(adapter, "_fast_path", FastPathStats())
+    monkeypatch.setattr(settings, "rule_fast_path_enabled", True)
+    monkeypatch.setattr(settings, "rule_fast_path_min_confidence", 0.8)
+    monkeypatch.setattr(settings, "rule_fast_path_sample_rate", 0.0)
+    monkeypatch.setattr(settings, "intent_cache_enabled", False)
+    yield server
+    server.stop()
+
+
+def _interpret_all(*messages):
+    # one event loop per test: the SDK's aio client is bound to the loop it first ran on
+    async def run():
+        return [await adapter.interpret_intent_async(m, "Asia/Gaza", NOW_ISO) for m in messages]
+
+    return asyncio.run(run())
+
+
+def test_confident_messages_skip_gemini(gemini):
+    (lst, meta), (dele, _), (create, _) = _interpret_all(
+        "شو مهامي", "احذف الاجتماع", "ذكرني اتصل بأحمد بكرة الساعة 5 المسا"
+    )
+    assert lst.intent == "list_tasks" and meta["llm_used"] == "rule_fast_path"
+    assert dele.intent == "delete_task" and dele.title_query == "الاجتماع"
+    assert create.intent == "create_task" and create.due.kind == "resolved"
+    assert gemini.requests == 0
+    stats = adapter.fast_path_stats()
+    assert stats["local_hits"] == 3 and stats["llm_calls_avoided"] == 3
+    assert stats["by_intent"] == {"list_tasks": 1, "delete_task": 1, "create_task": 1}
+
+
+def test_ambiguous_messages_go_to_gemini(gemini):
+    # the second has list and create triggers together
+    results = _interpret_all("مرحبا كيفك", "بدي اعرف شو مهامي")
+    assert [meta["llm_used"] for _, meta in results] == ["gemini", "gemini"]
+    assert gemini.requests == 2
+    stats = adapter.fast_path_stats()
+    assert stats["below_threshold"] == 2 and stats["local_hit_rate"] == 0.0
+
+
+def test_threshold_comes_from_settings(gemini, monkeypatch):
+    monkeypatch.setattr(settings, "rule_fast_path_min_confidence", 0.95)
+    assert _interpret_all("احذف الاجتماع")[0][1]["llm_used"] == "gemini"
+
+
+def test_intents_come_from_settings(gemini, monkeypatch):
+    monkeypatch.setattr(settings, "rule_fast_path_intents", "list_tasks")
+    results = _interpret_all("احذف الاجتماع", "شو مهامي")
+    assert [meta["llm_used"] for _, meta in results] == ["gemini", "rule_fast_path"]
+
+
+def test_sampled_local_answers_record_disagreement(gemini, monkeypatch):
+    monkeypatch.setattr(settings, "rule_fast_path_sample_rate", 1.0)
+
+    async def run():
+        res, meta = await adapter.interpret_intent_async("احذف الاجتماع", "Asia/Gaza", NOW_ISO)
+        await asyncio.gather(*adapter._shadow_tasks)
+        return res, meta
+
+    res, meta = asyncio.run(run())
+    assert meta["llm_used"] == "rule_fast_path"  # the user still gets the local answer
+    stats = adapter.fast_path_stats()
+    # the fake model always answers list_tasks
+    assert stats["sampled"] == 1 and stats["disagreements"] == 1
+    seen = stats["recent_disagreements"][0]
+    assert (seen["local"], seen["llm"], seen["confidence"]) == ("delete_task", "list_tasks", 0.9)
+    assert "الاجتماع" not in str(stats) and len(seen["message_hash"]) == 12
+
+
+CREATE_LOOKALIKES = [
+    "بدي اجهز الغدا بكرة الساعة 2",
+    "ذكرني بالغسيل بكرة الساعة 5",
+    "ذكرني اشيل الزبالة بكرة الساعة 9",
+    "ذكرني بالحذف التلقائي",
+]
+
+
+def test_delete_words_inside_other_words_are_not_deletes(gemini):
+    results = _interpret_all(*CREATE_LOOKALIKES)
+    for message, (res, meta) in zip(CREATE_LOOKALIKES, results):
+        assert res.intent != "delete_task", message
+        assert adapter.rule_based_extract(message, "Asia/Gaza").intent == "create_task", message
+    assert adapter.fast_path_stats()["by_intent"].get("delete_task", 0) == 0
+
+
+def test_delete_next_to_a_create_command_goes_to_gemini(gemini):
+    (res, meta), = _interpret_all("بدي احذف الاجتماع")
+    assert meta["llm_used"] == "gemini"
+    assert adapter.rule_based_extract("بدي احذف الاجتماع", "Asia/Gaza").confidence < 0.8
+
+
+def test_whole_word_deletes_still_local(gemini):
+    results = _interpret_all("امسحها", "الغي موعد الدكتور", "الغاء مهمة الرياضة")
+    assert [res.intent for res, _ in results] == ["delete_task"] * 3
+    assert [meta["llm_used"] for _, meta in results] == ["rule_fast_path"] * 3
+    assert results[0][0].title_query is None and results[2][0].title_query == "الرياضة"
+
+
+NOUN_ONLY = [
+    "خلص مهمة الرياضة",
+    "عدّل مهمة الرياضة لبكرة",
+    "غيّر موعد الاجتماع لبكرة الساعة 5",
+    "كم مهمة عندي؟",
+    "مهمة",
+]
+
+
+def test_task_nouns_without_a_command_go_to_gemini(gemini):
+    results = _interpret_all(*NOUN_ONLY)
+    assert [meta["llm_used"] for _, meta in results] == ["gemini"] * len(NOUN_ONLY)
+    for message in NOUN_ONLY:
+        assert adapter.rule_based_extract(message, "Asia/Gaza").confidence < 0.8, message
+    assert gemini.requests == len(NOUN_ONLY)
+
+
+def test_hour_without_morning_or_evening_goes_to_gemini(gemini):
+    results = _interpret_all("بدي اروح على الغدا بكرة الساعة 2", "ذكرني اتصل بأحمد بكرة الساعة 9", "ذكرني بكرة الساعة 2 م")
+    assert [meta["llm_used"] for _, meta in results] == ["gemini", "gemini", "rule_fast_path"]
+    assert results[2][0].due.iso.startswith("2026-01-02T14:00")
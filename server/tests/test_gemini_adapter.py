@@ -0,0 +1,109 @@
+import asyncio
+
+import app.llm.gemini_adapter as adapter
+from app.llm.gemini_keypool import GeminiKeyPool
+from app.settings import settings
+from benchmarks.fake_gemini import FakeGeminiServer
+
+NOW_ISO = "2026-01-01T09:00:00+02:00"
+
+
+def test_async_interpret_without_keys_falls_back(monkeypatch):
+    monkeypatch.setattr(adapter, "_key_pool", None)
+    monkeypatch.setattr(settings, "rule_fast_path_enabled", False)
+    res, meta = asyncio.run(adapter.interpret_intent_async("شو مهامي", "Asia/Hebron", NOW_ISO))
+    assert res.intent == "list_tasks"
+    assert meta["llm_used"] == "fallback_rule"
+
+
+def test_async_interpret_uses_gemini(monkeypatch):
+    server = FakeGeminiServer(latency_ms=5).start()
+    try:
+        monkeypatch.setattr(adapter, "_key_pool", GeminiKeyPool(keys=["k1"], base_url=server.base_url))
+        monkeypatch.setattr(adapter, "_AVAILABLE_MODELS", [settings.gemini_model])
+
+        async def run():
+            return await asyncio.gather(
+                *(adapter.interpret_intent_async(f"msg {i}", "Asia/Hebron", NOW_ISO) for i in range(5))
+            )
+
+        results = asyncio.run(run())
+        assert all(res.intent == "list_tasks" for res, _ in results)
+        assert all(meta["used_key_index"] == 0 for _, meta in results)
+        assert server.requests == 5
+    finally:
+        server.stop()
+
+
+def test_retry_after_hints():
+    assert adapter._retry_after(Exception("429 RESOURCE_EXHAUSTED {'retryDelay': '27s'}")) == 27.0
+    assert adapter._retry_after(Exception("Quota exceeded. Please retry in 3.5s.")) == 3.5
+    assert adapter._retry_after(Exception("503 unavailable")) is None
+
+
+def test_no_capacity_falls_back_without_calling_gemini(monkeypatch):
+    server = FakeGeminiServer(latency_ms=1).start()
+    try:
+        pool = GeminiKeyPool(keys=["k1"], base_url=server.base_url)
+        pool.cool_down(pool.acquire(), 60)
+        monkeypatch.setattr(adapter, "_key_pool", pool)
+        monkeypatch.setattr(adapter, "_AVAILABLE_MODELS", [settings.gemini_model])
+        monkeypatch.setattr(settings, "rule_fast_path_enabled", False)
+        monkeypatch.setattr(settings, "intent_cache_enabled", False)
+        monkeypatch.setattr(settings, "gemini_capacity_wait_seconds", 0.05)
+        res, meta = asyncio.run(adapter.interpret_intent_async("شو مهامي", "Asia/Hebron", NOW_ISO))
+        assert meta["llm_used"] == "fallback_rule" and meta["last_error_type"] == "capacity"
+        assert server.requests == 0
+    finally:
+        server.stop()
+
+
+def test_cancelled_call_releases_the_key_without_a_failure(monkeypatch):
+    server = FakeGeminiServer(latency_ms=300).start()
+    try:
+        pool = GeminiKeyPool(keys=["k1"], base_url=server.base_url)
+        monkeypatch.setattr(adapter, "_key_pool", pool)
+        monkeypatch.setattr(adapter, "_AVAILABLE_MODELS", [settings.gemini_model])
+        monkeypatch.setattr(settings, "rule_fast_path_enabled", False)
+        monkeypatch.setattr(settings, "intent_cache_enabled", False)
+        monkeypatch.setattr(settings, "single_flight_enabled", False)
+
+        async def run():
+            call = asyncio.create_task(adapter.interpret_intent_async("شو مهامي", "Asia/Hebron", NOW_ISO))
+            await asyncio.sleep(0.05)
+            call.cancel()
+            await asyncio.gather(call, return_exceptions=True)
+
+        asyncio.run(run())
+        key = pool.health_stats()["keys"][0]
+        assert (key["in_flight"], key["failures"], key["errors"]) == (0, 0, {})
+        assert key["cooling_for"] == 0
+    finally:
+        server.stop()
+
+
+class _FailingClient:
+    def __init__(self, error):
+        async def generate_content(**kwargs):
+            raise error
+
+        self.aio = type("Aio", (), {"models": type("Models", (), {"generate_content": staticmethod(generate_content)})})
+
+
+def test_only_quota_errors_cool_the_key_down(monkeypatch):
+    monkeypatch.setattr(adapter, "_AVAILABLE_MODELS", [settings.gemini_model])
+    monkeypatch.setattr(adapter, "RETRY_BACKOFF_SECONDS", 0)
+    monkeypatch.setattr(settings, "rule_fast_path_enabled", False)
+    monkeypatch.setattr(settings, "intent_cache_enabled", False)
+    monkeypatch.setattr(settings, "single_flight_enabled", False)
+
+    def cooling_after(error):
+        pool = GeminiKeyPool(keys=["k1"])
+        monkeypatch.setattr(pool, "client_for", lambda handle: _FailingClient(error))
+        monkeypatch.setattr(adapter, "_key_pool", pool)
+        asyncio.run(adapter.interpret_intent_async("شو مهامي", "Asia/Hebron", NOW_ISO))
+        return pool.health_stats()["keys"][0]["cooling_for"]
+
+    assert cooling_after(Exception("503 unavailable")) == 0
+    assert cooling_after(Exception("deadline exceeded")) == 0
+    assert 26 < cooling_after(Exception("429 RESOURCE_EXHAUSTED {'retryDelay': '27s'}")) <= 27
@@ -0,0 +1,148 @@
+from app.llm.gemini_keypool import GeminiKeyPool
+
+
+def test_client_reused_per_key():
+    pool = GeminiKeyPool(keys=["k1", "k2"])
+    c1 = pool.client_for("k1")
+    assert pool.client_for("k1") is c1
+    assert pool.client_for("k2") is not c1
+
+    stats = pool.client_stats()
+    assert stats["clients"] == 2
+    assert stats["clients_created"] == 2
+    assert stats["client_requests"] == 3
+    assert stats["reuse_ratio"] == round(1 / 3, 4)
+    pool.close_clients()
+    assert pool.client_stats()["clients"] == 0
+
+
+def test_client_registry_is_thread_safe():
+    from concurrent.futures import ThreadPoolExecutor
+
+    pool = GeminiKeyPool(keys=["k1"])
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        clients = list(ex.map(lambda _: pool.client_for("k1"), range(64)))
+    assert all(c is clients[0] for c in clients)
+    assert pool.client_stats()["clients_created"] == 1
+    pool.close_clients()
+
+
+def test_aclose_closes_async_pools_and_limits_come_from_settings(monkeypatch):
+    import asyncio
+
+    from app.settings import settings
+
+    monkeypatch.setattr(settings, "gemini_http_max_connections", 3)
+    monkeypatch.setattr(settings, "gemini_http_timeout_seconds", 7.0)
+    pool = GeminiKeyPool(keys=["k1"])
+    pool.client_for("k1")
+    entry = pool._clients["k1"]
+    assert entry.async_http_client.timeout.read == 7.0
+    assert entry.http_client._transport._pool._max_connections == 3
+
+    asyncio.run(pool.aclose_clients())
+    assert entry.http_client.is_closed and entry.async_http_client.is_closed
+    assert pool.client_stats()["clients"] == 0
+
+
+def test_app_shutdown_closes_key_pool(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import app.llm.gemini_adapter as adapter
+    from app.main import app
+
+    pool = GeminiKeyPool(keys=["k1"])
+    monkeypatch.setattr(adapter, "_key_pool", pool)
+    with TestClient(app):
+        pool.client_for("k1")
+        entry = pool._clients["k1"]
+    assert entry.async_http_client.is_closed
+
+
+def _keys(handles):
+    return [h.key if h is not None else None for h in handles]
+
+
+def test_least_loaded_key_wins():
+    pool = GeminiKeyPool(keys=["k1", "k2", "k3"], rpm_limit=10)
+    picks = [pool.acquire() for _ in range(6)]
+    # equal headroom takes turns; afterwards every key has spent the same share
+    assert _keys(picks) == ["k1", "k2", "k3", "k1", "k2", "k3"]
+    assert [h.index for h in picks[:3]] == [0, 1, 2]
+    pool.cool_down(picks[0], 30)
+    assert set(_keys([pool.acquire(), pool.acquire()])) == {"k2", "k3"}
+
+
+def test_token_quota_steers_to_the_key_with_room():
+    pool = GeminiKeyPool(keys=["k1", "k2"], tpm_limit=1000)
+    assert pool.acquire(tokens=800).key == "k1"
+    k2 = pool.acquire(tokens=100)
+    assert k2.key == "k2"
+    assert pool.acquire(tokens=100).key == "k2"  # k1 has 200 left, k2 800
+    pool.record_success(k2, 0.1, extra_tokens=700)  # the real call was bigger than estimated
+    assert pool.acquire(tokens=150).key == "k1"
+
+
+def test_exhausted_pool_waits_for_refill_or_gives_up():
+    import time
+
+    pool = GeminiKeyPool(keys=["k1"], rpm_limit=600)  # 10 per second
+    for _ in range(600):
+        assert pool.acquire().key == "k1"
+    assert pool.acquire(timeout=0) is None
+    start = time.monotonic()
+    assert pool.acquire(timeout=1.0).key == "k1"
+    assert 0.05 < time.monotonic() - start < 0.5
+    stats = pool.capacity_stats()
+    assert stats["capacity_timeouts"] == 1 and stats["capacity_waits"] >= 1
+
+
+def test_async_acquire_respects_retry_after_and_deadline():
+    import asyncio
+
+    pool = GeminiKeyPool(keys=["k1"])
+    pool.cool_down(pool.acquire(), 0.1)
+
+    async def run():
+        return await pool.acquire_async(timeout=0.05), await pool.acquire_async(timeout=0.5)
+
+    first, second = asyncio.run(run())
+    assert first is None and second.key == "k1"
+    assert pool.capacity_stats()["retry_after_cooldowns"] == 1
+
+
+def test_health_stats_per_key():
+    pool = GeminiKeyPool(keys=["secret-1", "secret-2"])
+    a, b = pool.acquire(), pool.acquire()
+    pool.record_success(a, 0.100)
+    pool.record_failure(b, "quota", 0.020)
+    c = pool.acquire()
+    pool.record_success(c, 0.200)
+    stats = pool.health_stats()
+    k1, k2 = stats["keys"]
+    assert (k1["calls"], k1["success_rate"], k1["in_flight"]) == (2, 1.0, 0)
+    assert k1["latency_ewma_ms"] == 120.0  # 100 then 0.2 of the way to 200
+    assert (k2["success_rate"], k2["errors"], k2["last_error_type"]) == (0.0, {"quota": 1}, "quota")
+    assert "secret" not in str(stats)
+
+
+def test_concurrent_acquire_and_settle_keeps_counts_exact():
+    from concurrent.futures import ThreadPoolExecutor
+
+    pool = GeminiKeyPool(keys=["k1", "k2", "k3", "k4"])
+
+    def call(i):
+        handle = pool.acquire()
+        assert pool.keys[handle.index] == handle.key
+        if i % 5:
+            pool.record_success(handle, 0.01)
+        else:
+            pool.record_failure(handle, "timeout", 0.01)
+
+    with ThreadPoolExecutor(max_workers=16) as ex:
+        list(ex.map(call, range(2000)))
+    keys = pool.health_stats()["keys"]
+    assert sum(k["successes"] for k in keys) == 1600
+    assert sum(k["errors"].get("timeout", 0) for k in keys) == 400
+    assert all(k["in_flight"] == 0 for k in keys)
+    assert pool.capacity_stats()["acquired"] == 2000
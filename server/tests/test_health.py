@@ -7,3 +7,18 @@ def test_health_ok():
     r = client.get("/health")
     assert r.status_code == 200
     assert r.json() == {"status": "ok"}
+
+
+def test_keypool_endpoint_never_shows_keys(monkeypatch):
+    import app.llm.gemini_adapter as adapter
+    from app.llm.gemini_keypool import GeminiKeyPool
+
+    pool = GeminiKeyPool(keys=["secret-a", "secret-b"])
+    pool.record_success(pool.acquire(), 0.05)
+    monkeypatch.setattr(adapter, "_key_pool", pool)
+    r = client.get("/v1/debug/keypool")
+    assert r.status_code == 200
+    body = r.json()
+    assert [k["index"] for k in body["keys"]] == [0, 1]
+    assert body["keys"][0]["successes"] == 1
+    assert "secret" not in r.text
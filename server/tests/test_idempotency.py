@@ -0,0 +1,164 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.routes.chat as chat
+from app.main import app
+from app.middlewares.idempotency import IdempotencyMiddleware, IdempotencyStore
+from app.settings import settings
+
+client = TestClient(app)
+AUTH = {"Authorization": "Bearer x"}
+BODY = {"userId": "u1", "message": "ذكرني اشتري خبز", "timezone": "Asia/Hebron", "requestId": "r-1"}
+
+
+@pytest.fixture
+def turns(monkeypatch):
+    import app.middlewares.idempotency as idem
+
+    monkeypatch.setattr(idem, "idempotency_store", IdempotencyStore(max_entries=100, ttl_seconds=60))
+    monkeypatch.setattr(settings, "idempotency_enabled", True)
+    calls = []
+
+    async def fake_turn(req, rid, dialect, conv_key):
+        calls.append(req.message)
+        return {"reply": f"تم {len(calls)}", "requestId": rid}
+
+    monkeypatch.setattr(chat, "_chat_turn", fake_turn)
+    return calls
+
+
+def test_retry_replays_the_stored_bytes(turns):
+    first = client.post("/v1/chat", headers=AUTH, json=BODY)
+    again = client.post("/v1/chat", headers=AUTH, json=BODY)
+    assert turns == [BODY["message"]]
+    assert again.status_code == first.status_code == 200
+    assert again.content == first.content
+    assert again.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+
+
+def test_key_includes_user_and_missing_request_id_is_not_replayed(turns):
+    client.post("/v1/chat", headers=AUTH, json=BODY)
+    client.post("/v1/chat", headers=AUTH, json={**BODY, "userId": "u2"})
+    no_id = {k: v for k, v in BODY.items() if k != "requestId"}
+    client.post("/v1/chat", headers=AUTH, json=no_id)
+    client.post("/v1/chat", headers=AUTH, json=no_id)
+    assert len(turns) == 4
+
+
+def test_reused_request_id_with_another_body_conflicts(turns):
+    client.post("/v1/chat", headers=AUTH, json=BODY)
+    r = client.post("/v1/chat", headers=AUTH, json={**BODY, "message": "احذف الخبز"})
+    assert r.status_code == 409 and r.json()["error"]["code"] == "invalid_request"
+    assert len(turns) == 1
+
+
+def test_unauthorized_retry_is_not_replayed(turns):
+    client.post("/v1/chat", headers=AUTH, json=BODY)
+    assert client.post("/v1/chat", json=BODY).status_code == 401
+
+
+def _call(mw, body: bytes):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/v1/chat", "headers": []}
+    return mw(scope, receive, send), sent
+
+
+def test_retry_waits_for_the_in_flight_original(monkeypatch):
+    monkeypatch.setattr(settings, "idempotency_enabled", True)
+    store = IdempotencyStore(max_entries=10, ttl_seconds=60)
+    runs = []
+
+    async def slow_app(scope, receive, send):
+        runs.append((await receive())["body"])
+        await asyncio.sleep(0.05)
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": b'{"reply":"ok"}'})
+
+    mw = IdempotencyMiddleware(slow_app, store)
+    body = json.dumps(BODY).encode()
+
+    async def run():
+        (a, sent_a), (b, sent_b) = _call(mw, body), _call(mw, body)
+        await asyncio.gather(a, b)
+        return sent_a, sent_b
+
+    sent_a, sent_b = asyncio.run(run())
+    assert len(runs) == 1
+    assert sent_a[-1]["body"] == sent_b[-1]["body"] == b'{"reply":"ok"}'
+    stats = store.stats()
+    assert (stats["stores"], stats["replays"], stats["waited"], stats["in_progress"]) == (1, 1, 1, 0)
+
+
+def test_server_errors_are_not_kept(monkeypatch):
+    monkeypatch.setattr(settings, "idempotency_enabled", True)
+    store = IdempotencyStore(max_entries=10, ttl_seconds=60)
+    statuses = iter([500, 200])
+
+    async def flaky_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": next(statuses), "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    mw = IdempotencyMiddleware(flaky_app, store)
+    body = json.dumps(BODY).encode()
+
+    async def run():
+        for _ in range(3):
+            call, sent = _call(mw, body)
+            await call
+            yield sent[0]["status"]
+
+    async def collect():
+        return [s async for s in run()]
+
+    assert asyncio.run(collect()) == [500, 200, 200]
+    assert store.stats()["abandoned"] == 1 and store.stats()["replays"] == 1
+
+
+def test_failed_turn_is_not_replayed(monkeypatch):
+    import app.middlewares.idempotency as idem
+
+    store = IdempotencyStore(max_entries=100, ttl_seconds=60)
+    monkeypatch.setattr(idem, "idempotency_store", store)
+    monkeypatch.setattr(settings, "idempotency_enabled", True)
+    monkeypatch.setattr(settings, "rule_fast_path_enabled", False)
+    calls = []
+
+    async def broken_interpret(*args, **kwargs):
+        calls.append(1)
+        raise RuntimeError("gemini down")
+
+    monkeypatch.setattr(chat, "interpret_intent_async", broken_interpret)
+    body = {**BODY, "requestId": "r-failed", "message": "شو الأخبار"}
+    first = client.post("/v1/chat", headers=AUTH, json=body)
+    again = client.post("/v1/chat", headers=AUTH, json=body)
+    assert first.status_code == again.status_code == 200
+    assert "idempotent-replayed" not in again.headers
+    assert len(calls) == 2
+    assert store.stats()["stores"] == 0 and store.stats()["abandoned"] == 2
+
+
+def test_conflict_message_is_localized(turns):
+    from app.i18n.messages import MESSAGES
+
+    client.post("/v1/chat", headers=AUTH, json=BODY)
+    r = client.post("/v1/chat", headers=AUTH, json={**BODY, "message": "احذف الخبز"})
+    assert r.json()["error"]["message"] == MESSAGES["pal"]["ERR_IDEMPOTENCY_CONFLICT"]
+
+
+def test_reformatted_retry_is_replayed_not_a_conflict(turns):
+    first = client.post("/v1/chat", headers=AUTH, json=BODY)
+    reordered = json.dumps(dict(reversed(list(BODY.items()))), indent=2, ensure_ascii=True)
+    again = client.post("/v1/chat", headers={**AUTH, "Content-Type": "application/json"}, content=reordered)
+    assert again.status_code == 200 and again.headers["idempotent-replayed"] == "true"
+    assert again.content == first.content and len(turns) == 1
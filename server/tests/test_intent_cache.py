@@ -0,0 +1,110 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+import pytz
+
+import app.llm.gemini_adapter as adapter
+import app.llm.intent_cache as intent_cache
+from app.llm.gemini_keypool import GeminiKeyPool
+from app.llm.intent_cache import IntentCache, message_key
+from app.settings import settings
+from benchmarks.fake_gemini import DEFAULT_INTENT, FakeGeminiServer
+
+GAZA = pytz.timezone("Asia/Gaza")
+
+
+def test_message_key_folds_spelling_noise():
+    assert message_key("شو  مهامي؟") == message_key("شو مهامي") == "شو مهامي"
+    assert message_key("أعرض المهام!") == message_key("اعرض المهام")
+
+
+def test_time_bucket_separates_hours_and_days():
+    cache = IntentCache(max_entries=10, ttl_seconds=60, bucket_seconds=3600)
+    at_9 = GAZA.localize(datetime(2026, 3, 1, 9, 5))
+    at_9_50 = GAZA.localize(datetime(2026, 3, 1, 9, 50))
+    at_10 = GAZA.localize(datetime(2026, 3, 1, 10, 0))
+    assert cache.key("m", "Asia/Gaza", at_9) == cache.key("m", "Asia/Gaza", at_9_50)
+    assert cache.key("m", "Asia/Gaza", at_9) != cache.key("m", "Asia/Gaza", at_10)
+    assert cache.key("m", "Asia/Gaza", at_9) != cache.key("m", "UTC", at_9)
+
+
+def test_ttl_and_lru(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(intent_cache.time, "monotonic", lambda: clock[0])
+    cache = IntentCache(max_entries=2, ttl_seconds=10, bucket_seconds=3600)
+    for k in ("a", "b"):
+        cache.put((k, "UTC", 0), k.upper(), resolved=False, anchorable=False)
+    assert cache.get(("a", "UTC", 0), lambda r: r) == "A"
+    cache.put(("c", "UTC", 0), "C", resolved=False, anchorable=False)  # evicts b, the least recent
+    assert cache.get(("b", "UTC", 0), lambda r: r) is None
+    clock[0] += 11
+    assert cache.get(("a", "UTC", 0), lambda r: r) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evicted"], stats["expired"]) == (1, 2, 1, 1)
+
+
+def test_resolved_results_need_a_local_anchor():
+    cache = IntentCache(max_entries=10, ttl_seconds=60, bucket_seconds=3600)
+    assert not cache.put(("x", "UTC", 0), "R", resolved=True, anchorable=False)
+    assert cache.stats()["bypassed_resolved"] == 1
+    assert cache.put(("y", "UTC", 0), "R", resolved=True, anchorable=True)
+    assert cache.get(("y", "UTC", 0), lambda r: r + "'") == "R'"
+    assert cache.get(("y", "UTC", 0), lambda r: None) is None
+    assert cache.stats()["reanchored"] == 1
+
+
+@pytest.fixture
+def fresh(monkeypatch):
+    monkeypatch.setattr(settings, "rule_fast_path_enabled", False)
+    monkeypatch.setattr(settings, "intent_cache_enabled", True)
+    monkeypatch.setattr(adapter, "_intent_cache", IntentCache(100, 600, 3600))
+    monkeypatch.setattr(adapter, "_AVAILABLE_MODELS", [settings.gemini_model])
+
+    def start(intent=None):
+        server = FakeGeminiServer(latency_ms=1, intent=intent).start()
+        monkeypatch.setattr(adapter, "_key_pool", GeminiKeyPool(keys=["k1"], base_url=server.base_url))
+        return server
+
+    return start
+
+
+def _interpret_all(*calls):
+    async def run():
+        return [await adapter.interpret_intent_async(m, "Asia/Gaza", now) for m, now in calls]
+
+    return asyncio.run(run())
+
+
+def test_repeated_message_served_from_cache(fresh):
+    server = fresh()
+    try:
+        now = "2026-03-01T09:00:00+02:00"
+        results = _interpret_all(("شو مهامي", now), ("شو  مهامي؟", now))
+        assert [meta["llm_used"] for _, meta in results] == ["gemini", "intent_cache"]
+        assert server.requests == 1
+        assert adapter.intent_cache_stats()["hit_rate"] == 0.5
+    finally:
+        server.stop()
+
+
+def test_resolved_due_is_reanchored_on_hit(fresh):
+    intent = dict(DEFAULT_INTENT, intent="create_task", title="اجتماع")
+    intent["due"] = {"kind": "resolved", "iso": "2026-03-01T11:05:00+02:00", "confidence": 0.9}
+    server = fresh(intent)
+    try:
+        results = _interpret_all(
+            ("بعد ساعتين اجتماع", "2026-03-01T09:00:00+02:00"),
+            ("بعد ساعتين اجتماع", "2026-03-01T09:30:00+02:00"),
+            ("اجتماع مهم جداً", "2026-03-01T09:30:00+02:00"),  # no local due: not cacheable
+            ("اجتماع مهم جداً", "2026-03-01T09:31:00+02:00"),
+        )
+        (_, m1), (second, m2), (_, m3), (_, m4) = results
+        assert (m1["llm_used"], m2["llm_used"]) == ("gemini", "intent_cache")
+        # the model's 5-minute offset from the local parse, re-applied to the second request
+        assert second.due.iso.startswith("2026-03-01T11:35")
+        assert (m3["llm_used"], m4["llm_used"]) == ("gemini", "gemini")
+        assert server.requests == 3
+        assert adapter.intent_cache_stats()["bypassed_resolved"] == 2
+    finally:
+        server.stop()
@@ -0,0 +1,75 @@
+import asyncio
+from datetime import datetime
+
+import pytz
+
+import app.routes.chat as chat
+import app.utils.parsed_message as pm
+from app.core.types import ChatRequest
+from app.llm.gemini_adapter import rule_based_extract
+from app.utils.parsed_message import ParsedMessage, clean_title
+
+TZ = "Asia/Gaza"
+
+
+def test_parse_extracts_everything_once():
+    now = pytz.timezone(TZ).localize(datetime(2026, 3, 1, 10, 0))
+    p = ParsedMessage.parse("ذكرني اتصل بأحمد بكرة الساعة 5 لمدة ساعة", TZ, now)
+    assert p.triggers == {"create"}
+    assert p.duration_minutes == 60
+    assert p.due is not None and (p.due.day, p.due.hour) == (2, 5)
+    assert p.title == "اتصل بأحمد"
+    assert set(p.timings) == {"triggers_ms", "duration_ms", "due_ms", "title_ms", "total_ms"}
+
+
+def test_clean_title_strips_leading_prefixes():
+    assert clean_title("بدي ممكن اشتري خبز") == "اشتري خبز"
+    assert clean_title("  سجل   موعد   الطبيب ") == "موعد الطبيب"
+    assert clean_title("") == ""
+
+
+def test_rule_based_extract_reuses_parsed(monkeypatch):
+    parsed = ParsedMessage.parse("ذكرني بكرة الساعة 5 اروح عند الطبيب", TZ, datetime.now(pytz.timezone(TZ)))
+
+    def boom(*a, **k):
+        raise AssertionError("parser called again")
+
+    monkeypatch.setattr(pm, "extract_duration_minutes_and_clean", boom)
+    monkeypatch.setattr(pm, "extract_due_datetime_and_clean", boom)
+    res = rule_based_extract(parsed.text, TZ, parsed)
+    assert res.intent == "create_task"
+    assert res.title == parsed.title
+    assert res.due.iso == parsed.due.isoformat()
+
+
+def test_chat_turn_parses_each_stage_once(monkeypatch):
+    calls = {"duration": 0, "due": 0}
+    real_duration, real_due = pm.extract_duration_minutes_and_clean, pm.extract_due_datetime_and_clean
+
+    def duration(text):
+        calls["duration"] += 1
+        return real_duration(text)
+
+    def due(text, tz, now):
+        calls["due"] += 1
+        return real_due(text, tz, now)
+
+    monkeypatch.setattr(pm, "extract_duration_minutes_and_clean", duration)
+    monkeypatch.setattr(pm, "extract_due_datetime_and_clean", due)
+    monkeypatch.setattr(chat, "extract_duration_minutes_and_clean", duration)
+    monkeypatch.setattr(chat, "extract_due_datetime_and_clean", due)
+    created = {}
+
+    async def fake_execute(**kwargs):
+        created.update(kwargs["entities"])
+        return {"type": "create_task", "payload": {}}
+
+    monkeypatch.setattr(chat, "execute_intent", fake_execute)
+    req = ChatRequest(userId="u1", message="ذكرني اتصل بأحمد بكرة الساعة 5 لمدة ساعة", timezone=TZ)
+    out = asyncio.run(chat._chat_turn(req, "r1", "pal", "parse-once"))
+
+    assert calls == {"duration": 1, "due": 1}
+    assert created["title"] == "اتصل بأحمد"
+    assert created["duration_minutes"] == 60
+    assert created["due_at"] is not None
+    assert out["meta"]["parse"]["total_ms"] >= 0
@@ -0,0 +1,45 @@
+import random
+
+from app.utils.parsed_message import TRIGGERS, extract_title_hint
+from app.utils.phrase_matcher import PhraseMatch, PhraseMatcher
+
+
+def test_find_all_reports_longest_match_with_spans():
+    m = PhraseMatcher({"create": ["ذكر", "ذكرني"], "list": ["مهامي", "شو مهامي"]})
+    text = "ذكرني شو مهامي"
+    assert m.find_all(text) == [
+        PhraseMatch("create", "ذكرني", 0, 5),
+        PhraseMatch("list", "شو مهامي", 6, 14),
+        PhraseMatch("list", "مهامي", 9, 14),
+    ]
+    labels, spans = m.classify(text)
+    assert labels == {"create", "list"}
+    assert text[spans[0].start:spans[0].end] == "ذكرني"
+
+
+def test_labels_match_substring_semantics():
+    # phrases contained in longer phrases of another label still count
+    m = PhraseMatcher({"delete": ["إلغاء مهمة"], "create": ["مهمة", "add"]})
+    assert m.labels("بدي إلغاء مهمة") == {"delete", "create"}
+    assert m.labels("nothing here") == set()
+    assert PhraseMatcher({}).labels("x") == set()
+
+    phrases = {
+        label: [p for p in ps]
+        for label, ps in {"a": ["ab", "abc", "c"], "b": ["bc", "cab"], "c": ["bca", "aa"]}.items()
+    }
+    m = PhraseMatcher(phrases)
+    rng = random.Random(3)
+    for _ in range(2000):
+        text = "".join(rng.choice("abc ") for _ in range(rng.randint(0, 12)))
+        expected = {label for label, ps in phrases.items() if any(p in text for p in ps)}
+        assert m.labels(text) == expected, text
+
+
+def test_rule_triggers_and_title_hint():
+    assert TRIGGERS.labels("احذف مهمة الاجتماع") == {"delete", "create"}
+    assert TRIGGERS.labels("شو مهامي اليوم") == {"list"}
+    assert extract_title_hint("احذف مهمة: الاجتماع") == "الاجتماع"
+    assert extract_title_hint("ذكرني ب شراء الحليب") == "شراء الحليب"
+    assert extract_title_hint("بدي") == "بدي"
+    assert extract_title_hint("احذف") is None
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import time
+from datetime import datetime
+
+import pytest
+import pytz
+
+import app.llm.gemini_adapter as adapter
+from app.llm.gemini_keypool import GeminiKeyPool
+from app.llm.single_flight import SingleFlight, flight_key
+from app.settings import settings
+from benchmarks.fake_gemini import FakeGeminiServer
+
+NOW_ISO = "2026-01-01T09:00:00+02:00"
+GAZA = pytz.timezone("Asia/Gaza")
+
+
+def test_flight_key_is_per_minute_and_zone():
+    at = GAZA.localize(datetime(2026, 3, 1, 9, 5, 10))
+    assert flight_key("شو مهامي؟", "Asia/Gaza", at) == flight_key("شو  مهامي", "Asia/Gaza", at.replace(second=50))
+    assert flight_key("m", "Asia/Gaza", at) != flight_key("m", "Asia/Gaza", at.replace(minute=6))
+    assert flight_key("m", "Asia/Gaza", at) != flight_key("m", "UTC", at)
+
+
+def test_threads_share_one_call():
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def work():
+        calls.append(1)
+        release.wait(2)
+        return "v"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", work))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    release.set()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True]
+    stats = flight.stats()
+    assert (stats["leaders"], stats["coalesced"], stats["in_flight"]) == (1, 3, 0)
+
+
+def test_errors_reach_every_waiter_and_are_not_remembered():
+    flight = SingleFlight()
+
+    async def boom():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("x")
+
+    async def run():
+        out = await asyncio.gather(*(flight.do_async("k", boom) for _ in range(3)), return_exceptions=True)
+        again = await flight.do_async("k", lambda: asyncio.sleep(0, result="ok"))
+        return out, again
+
+    out, again = asyncio.run(run())
+    assert all(isinstance(e, RuntimeError) for e in out)
+    assert again == ("ok", False)
+    assert flight.stats()["errors"] == 1
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    flight = SingleFlight()
+
+    async def run():
+        leader = asyncio.create_task(flight.do_async("k", lambda: asyncio.sleep(0.05, result="v")))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do_async("k", lambda: asyncio.sleep(0, result="other")))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(run()) == ("v", True)
+
+
+@pytest.fixture
+def gemini(monkeypatch):
+    server = FakeGeminiServer(latency_ms=50).start()
+    monkeypatch.setattr(adapter, "_key_pool", GeminiKeyPool(keys=["k1"], base_url=server.base_url))
+    monkeypatch.setattr(adapter, "_AVAILABLE_MODELS", [settings.gemini_model])
+    monkeypatch.setattr(adapter, "_single_flight", SingleFlight())
+    monkeypatch.setattr(settings, "rule_fast_path_enabled", False)
+    monkeypatch.setattr(settings, "intent_cache_enabled", False)
+    monkeypatch.setattr(settings, "single_flight_enabled", True)
+    yield server
+    server.stop()
+
+
+def _concurrently(*messages):
+    async def run():
+        return await asyncio.gather(*(adapter.interpret_intent_async(m, "Asia/Gaza", NOW_ISO) for m in messages))
+
+    return asyncio.run(run())
+
+
+def test_double_send_makes_one_gemini_call(gemini):
+    results = _concurrently("شو مهامي", "شو مهامي", "شو مهامي؟", "شي تاني")
+    assert gemini.requests == 2
+    assert [meta.get("coalesced", False) for _, meta in results] == [False, True, True, False]
+    assert results[0][0] == results[1][0] and results[0][0] is not results[1][0]
+    assert results[0][1] is not results[1][1]
+    stats = adapter.single_flight_stats()
+    assert (stats["leaders"], stats["coalesced"], stats["llm_calls_saved"]) == (2, 2, 2)
+
+
+def test_disabled_calls_gemini_for_each(gemini, monkeypatch):
+    monkeypatch.setattr(settings, "single_flight_enabled", False)
+    _concurrently("شو مهامي", "شو مهامي")
+    assert gemini.requests == 2
+    assert adapter.single_flight_stats()["leaders"] == 0
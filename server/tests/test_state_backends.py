@@ -0,0 +1,191 @@
+import sqlite3
+import time
+
+import pytest
+
+from app.domain.conversation_state import ConversationStore
+from app.domain.state_backends import (
+    RespStateBackend,
+    SQLiteStateBackend,
+    StateConflictError,
+    state_backend_from_env,
+)
+from benchmarks.fake_resp import FakeRespServer
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def make_backend(request, tmp_path):
+    """Factory for backends that share one store, like two uvicorn workers would."""
+    if request.param == "sqlite":
+        path = str(tmp_path / "state.db")
+        yield lambda ttl=60: SQLiteStateBackend(path, ttl)
+    else:
+        server = FakeRespServer().start()
+        backends = []
+
+        def make(ttl=60):
+            backends.append(RespStateBackend(server.url, ttl))
+            return backends[-1]
+
+        yield make
+        for b in backends:
+            b.close()
+        server.stop()
+
+
+def _start_delete(state):
+    state.delete_stage = "awaiting_choice"
+    state.delete_candidates = (("t1", "اجتماع الفريق", 0.9), ("t2", "اجتماع العميل", 0.7))
+    state.delete_query = "اجتماع"
+
+
+def test_state_is_shared_between_workers(make_backend):
+    worker_a, worker_b = make_backend(), make_backend()
+    assert worker_a.get("c1").delete_stage is None
+
+    worker_a.mutate("c1", _start_delete)
+    seen = worker_b.get("c1")
+    assert seen.delete_stage == "awaiting_choice"
+    assert seen.delete_candidates == (("t1", "اجتماع الفريق", 0.9), ("t2", "اجتماع العميل", 0.7))
+    assert seen.version == 1
+
+    worker_b.mutate("c1", lambda st: setattr(st, "selected_task_id", "t2"))
+    assert worker_a.get("c1").selected_task_id == "t2"
+    assert worker_a.get("c1").version == 2
+
+    worker_a.clear("c1")
+    assert worker_b.get("c1").version == 0
+
+
+def test_concurrent_write_is_retried_not_lost(make_backend):
+    worker_a, worker_b = make_backend(), make_backend()
+    worker_a.mutate("c1", _start_delete)
+    raced = []
+
+    def pick(state):
+        if not raced:
+            # another worker updates the conversation between our read and write
+            raced.append(True)
+            worker_b.mutate("c1", lambda st: setattr(st, "delete_query", "اجتماع الفريق"))
+        state.selected_task_id = "t1"
+
+    result = worker_a.mutate("c1", pick)
+    assert result.version == 3
+    final = worker_b.get("c1")
+    assert (final.delete_query, final.selected_task_id) == ("اجتماع الفريق", "t1")
+    assert worker_a.stats()["conflicts"] == 1
+
+
+def test_persistent_conflict_raises(make_backend):
+    worker_a, worker_b = make_backend(), make_backend()
+    worker_a.mutate("c1", _start_delete)
+
+    def always_raced(state):
+        worker_b.mutate("c1", lambda st: None)
+
+    with pytest.raises(StateConflictError):
+        worker_a.mutate("c1", always_raced)
+
+
+def test_records_expire(make_backend):
+    backend = make_backend(ttl=0.05)
+    backend.mutate("c1", _start_delete)
+    time.sleep(0.1)
+    assert backend.get("c1").delete_stage is None
+    # an expired record can be recreated from version 0
+    assert backend.mutate("c1", _start_delete).delete_stage == "awaiting_choice"
+
+
+def test_redis_mutation_is_two_round_trips():
+    server = FakeRespServer().start()
+    backend = RespStateBackend(server.url, 60)
+    try:
+        backend.mutate("c1", _start_delete)
+        assert backend.round_trips == 2
+        assert server.connections == 1
+        backend.mutate("c1", _start_delete)
+        assert server.connections == 1  # pooled
+    finally:
+        backend.close()
+        server.stop()
+
+
+def test_env_selects_backend(monkeypatch, tmp_path):
+    from app.settings import settings
+
+    assert isinstance(state_backend_from_env(), ConversationStore)
+    monkeypatch.setattr(settings, "conversation_state_backend", "sqlite")
+    monkeypatch.setattr(settings, "conversation_state_sqlite_path", str(tmp_path / "s.db"))
+    assert isinstance(state_backend_from_env(), SQLiteStateBackend)
+    monkeypatch.setattr(settings, "conversation_state_backend", "nope")
+    with pytest.raises(ValueError):
+        state_backend_from_env()
+
+
+def test_turn_write_on_stale_state_is_refused(make_backend):
+    worker_a, worker_b = make_backend(), make_backend()
+    worker_a.mutate("c1", _start_delete)
+    turn = worker_a.get("c1")  # read at the start of a chat turn
+
+    worker_b.mutate("c1", lambda st: setattr(st, "delete_stage", None))  # another worker's turn
+    with pytest.raises(StateConflictError):
+        worker_a.mutate("c1", lambda st: setattr(st, "selected_task_id", "t1"), turn.version)
+    with pytest.raises(StateConflictError):
+        worker_a.clear("c1", turn.version)
+    assert worker_b.get("c1").delete_stage is None and worker_b.get("c1").selected_task_id is None
+
+
+def test_turn_writes_follow_their_own_version(monkeypatch, tmp_path):
+    import asyncio
+    import threading
+
+    from app.domain import conversation_state
+
+    monkeypatch.setattr(conversation_state, "_store", SQLiteStateBackend(str(tmp_path / "s.db"), 60))
+    threads = []
+    real_get = conversation_state.get_state
+
+    def spy_get(key):
+        threads.append(threading.current_thread().name)
+        return real_get(key)
+
+    monkeypatch.setattr(conversation_state, "get_state", spy_get)
+
+    async def turn():
+        state = await conversation_state.get_state_async("c1")
+        await conversation_state.set_delete_pending_async("c1", stage="awaiting_query", base=state)
+        await conversation_state.set_delete_pending_async("c1", stage="awaiting_choice", query="x", base=state)
+        await conversation_state.clear_delete_state_async("c1", base=state)
+        return state.version
+
+    assert asyncio.run(turn()) == 3
+    assert threads and threads[0].startswith("taskstore")  # off the event loop
+
+
+def test_state_backend_error_is_a_chat_error_reply(monkeypatch, tmp_path):
+    from fastapi.testclient import TestClient
+
+    from app.domain import conversation_state
+    from app.main import app
+
+    class Down(SQLiteStateBackend):
+        def _load(self, session, key):
+            raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(conversation_state, "_store", Down(str(tmp_path / "s.db"), 60))
+    r = TestClient(app).post(
+        "/v1/chat", headers={"Authorization": "Bearer x"},
+        json={"userId": "u1", "message": "شو مهامي", "timezone": "Asia/Hebron"},
+    )
+    assert r.status_code == 200 and r.json()["reply"] == "صار خطأ داخلي بسيط. جرّبي مرة ثانية."
+
+
+def test_backend_must_implement_storage_hooks():
+    from app.domain.state_backends import SharedStateBackend
+
+    class Partial(SharedStateBackend):
+        def _load(self, session, key):
+            return None
+
+    with pytest.raises(TypeError):
+        Partial(60)
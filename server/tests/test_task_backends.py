@@ -0,0 +1,119 @@
+import pytest
+
+from app.domain.task_backends import (
+    FaultInjectingBackend,
+    InjectedBackendError,
+    InMemoryTaskBackend,
+    TaskBackend,
+    backend_from_env,
+)
+
+
+def test_env_selects_memory_backend():
+    assert backend_from_env().name == "memory"
+
+
+def test_backend_must_implement_the_interface():
+    class ReadOnly(TaskBackend):
+        def get(self, user_id, task_id):
+            return None
+
+    with pytest.raises(TypeError):
+        ReadOnly()
+
+
+def test_memory_backend_status_index():
+    b = InMemoryTaskBackend()
+    t1 = b.create("u1", {"title": "a", "status": "todo"})
+    t2 = b.create("u1", {"title": "b", "status": "todo"})
+    b.create("u2", {"title": "c", "status": "todo"})
+
+    b.update("u1", t2, {"status": "done"})
+    assert [tid for tid, _ in b.list("u1", "todo")] == [t1]
+    assert [tid for tid, _ in b.list("u1", "done")] == [t2]
+    assert len(b.list("u1", "all")) == 2
+    assert b.get("u1", t2)["status"] == "done"
+
+
+def test_memory_backend_due_index():
+    b = InMemoryTaskBackend()
+    early = b.create("u1", {"title": "early", "status": "todo", "dueAt": 100})
+    mid = b.create("u1", {"title": "mid", "status": "todo", "dueAt": 200})
+    late = b.create("u1", {"title": "late", "status": "todo", "dueAt": 300})
+    b.create("u1", {"title": "none", "status": "todo", "dueAt": None})
+
+    assert [tid for tid, _ in b.list_due_range("u1", "todo", 100, 300)] == [early, mid]
+
+    b.update("u1", early, {"dueAt": 400})
+    assert [tid for tid, _ in b.list_due_range("u1", "todo", 100, 300)] == [mid]
+
+    assert b.delete("u1", mid) is True
+    assert b.delete("u1", mid) is False
+    assert [tid for tid, _ in b.list_due_range("u1", "all", 0, 350)] == [late]
+
+
+def test_memory_backend_update_missing_raises():
+    with pytest.raises(KeyError):
+        InMemoryTaskBackend().update("u1", "nope", {"title": "x"})
+
+
+def test_fault_injection_wrapper():
+    b = FaultInjectingBackend(InMemoryTaskBackend(), failure_rate=1.0, seed=1)
+    with pytest.raises(InjectedBackendError):
+        b.create("u1", {"title": "a", "status": "todo"})
+    assert b.calls == 1 and b.failures == 1
+
+    ok = FaultInjectingBackend(InMemoryTaskBackend(), latency_ms=1, jitter_ms=1, seed=1)
+    tid = ok.create("u1", {"title": "a", "status": "todo"})
+    assert ok.get("u1", tid)["title"] == "a"
+
+
+class NotFound(Exception):
+    pass
+
+
+class _FakeDocRef:
+    def __init__(self, docs, task_id, calls):
+        self.docs, self.task_id, self.calls = docs, task_id, calls
+
+    def get(self):
+        self.calls.append("get")
+        raise AssertionError("delete/update must not read first")
+
+    def update(self, patch):
+        self.calls.append("update")
+        if self.task_id not in self.docs:
+            raise NotFound(self.task_id)
+        self.docs[self.task_id].update(patch)
+
+    def delete(self, option=None):
+        self.calls.append("delete")
+        if option == "exists" and self.task_id not in self.docs:
+            raise NotFound(self.task_id)
+        self.docs.pop(self.task_id, None)
+
+
+class _FakeCollection:
+    def __init__(self):
+        self.docs = {"t1": {"title": "a"}}
+        self.calls = []
+
+    def document(self, task_id):
+        return _FakeDocRef(self.docs, task_id, self.calls)
+
+
+def test_firestore_mutations_are_single_writes(monkeypatch):
+    from app.domain.task_backends import FirestoreTaskBackend
+
+    col = _FakeCollection()
+    b = FirestoreTaskBackend()
+    monkeypatch.setattr(b, "_collection", lambda user_id: col)
+    monkeypatch.setattr(b, "_server_timestamp", lambda: 0)
+    monkeypatch.setattr(b, "_must_exist", lambda: "exists")
+
+    b.update("u1", "t1", {"title": "b"})
+    with pytest.raises(KeyError):
+        b.update("u1", "missing", {"title": "b"})
+    assert b.delete("u1", "t1") is True
+    assert b.delete("u1", "t1") is False
+    assert col.calls == ["update", "update", "delete", "delete"]
@@ -0,0 +1,129 @@
+from app.domain.task_backends import InMemoryTaskBackend
+from app.domain.task_cache import TaskSnapshotCache
+from app.domain.task_index import TitleIndex
+from app.domain.tasks import Task, TaskStore
+
+
+class CountingBackend(InMemoryTaskBackend):
+    def __init__(self):
+        super().__init__()
+        self.list_calls = 0
+        self.get_calls = 0
+
+    def list(self, user_id, status="all"):
+        self.list_calls += 1
+        return super().list(user_id, status)
+
+    def get(self, user_id, task_id):
+        self.get_calls += 1
+        return super().get(user_id, task_id)
+
+
+def _store(backend=None, **cache_kwargs):
+    cache = TaskSnapshotCache(
+        max_bytes=cache_kwargs.get("max_bytes", 1 << 20),
+        ttl_seconds=cache_kwargs.get("ttl_seconds", 60),
+    )
+    return TaskStore(backend or CountingBackend(), cache=cache)
+
+
+def test_multi_turn_reads_hit_backend_once():
+    store = _store()
+    a = store.create_task("u1", "اجتماع الفريق")
+    store.create_task("u1", "شراء الحليب")
+
+    assert [t.title for t in store.list_tasks("u1", status="all")] == ["اجتماع الفريق", "شراء الحليب"]
+    store.search_tasks("u1", "اجتماع")
+    store.fuzzy_search_tasks("u1", "الحليب")
+    assert store.get_task("u1", a.id).title == "اجتماع الفريق"
+    assert store.backend.list_calls == 1
+    assert store.backend.get_calls == 0
+
+    stats = store.cache.stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 3
+    assert stats["users"] == 1
+
+
+def test_writes_go_through_to_cached_snapshot():
+    store = _store()
+    a = store.create_task("u1", "اجتماع الفريق")
+    store.list_tasks("u1")
+
+    b = store.create_task("u1", "مكالمة العميل")
+    store.update_task("u1", a.id, status="done")
+    assert [t.id for t in store.list_tasks("u1", status="todo")] == [b.id]
+    assert [t.id for t in store.list_tasks("u1", status="done")] == [a.id]
+
+    assert store.delete_task("u1", b.id)
+    assert store.list_tasks("u1", status="todo") == []
+    assert store.get_task("u1", b.id) is None
+    assert store.backend.list_calls == 1
+    # cached view matches the backend
+    assert [t.id for t in store.list_tasks("u1", status="all")] == [
+        tid for tid, _ in InMemoryTaskBackend.list(store.backend, "u1")
+    ]
+
+
+def test_update_of_missing_task_drops_it_from_cache():
+    store = _store()
+    a = store.create_task("u1", "اجتماع الفريق")
+    store.list_tasks("u1")
+    InMemoryTaskBackend.delete(store.backend, "u1", a.id)  # removed behind the store's back
+
+    assert store.update_task("u1", a.id, title="x") is None
+    assert store.list_tasks("u1") == []
+
+
+def test_ttl_expiry_reloads(monkeypatch):
+    from app.domain import task_cache
+
+    now = [1000.0]
+    monkeypatch.setattr(task_cache.time, "time", lambda: now[0])
+    store = _store(ttl_seconds=10)
+    store.create_task("u1", "اجتماع الفريق")
+    store.list_tasks("u1")
+    now[0] += 11
+    store.list_tasks("u1")
+    assert store.backend.list_calls == 2
+    assert store.cache.stats()["expirations"] == 1
+
+
+def test_lru_eviction_bounded_by_bytes():
+    cache = TaskSnapshotCache(max_bytes=3700, ttl_seconds=60)
+    for user in ("u1", "u2", "u3"):
+        cache.put(user, TitleIndex([Task(id=user, title="اجتماع الفريق", status="todo")]), 0)
+    cache.get("u1")  # u1 becomes most recently used
+    cache.put("u4", TitleIndex([Task(id="x", title="شراء الحليب", status="todo")]), 0)
+
+    stats = cache.stats()
+    assert stats["bytes"] <= 3700
+    assert stats["evictions"] == 1
+    assert cache.get("u1") is not None
+    assert cache.get("u2") is None
+
+
+def test_load_racing_a_write_is_not_cached():
+    cache = TaskSnapshotCache(max_bytes=1 << 20, ttl_seconds=60)
+    generation = cache.generation("u1")
+    cache.upsert("u1", Task(id="a", title="new", status="todo"))  # write lands mid-load
+    cache.put("u1", TitleIndex(), generation)
+    assert cache.get("u1") is None
+
+
+def test_mutations_take_one_backend_round_trip():
+    from app.domain.task_backends import FaultInjectingBackend
+
+    backend = FaultInjectingBackend(InMemoryTaskBackend())
+    store = _store(backend)
+    ids = [store.create_task("u1", f"مهمة {i}").id for i in range(10)]
+    store.list_tasks("u1")
+    before = backend.calls
+
+    for task_id in ids:
+        assert store.update_task("u1", task_id, title="محدثة", status="done").title == "محدثة"
+    for task_id in ids:
+        assert store.delete_task("u1", task_id) is True
+    # update used to write and then read the doc back
+    assert backend.calls - before == 2 * len(ids)
+    assert store.list_tasks("u1", status="all") == []
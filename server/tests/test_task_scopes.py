@@ -0,0 +1,67 @@
+from datetime import datetime
+
+import pytz
+
+from app.domain.task_backends import InMemoryTaskBackend
+from app.domain.tasks import TaskStore, due_window
+from app.routes.chat import _detect_list_scope
+
+GAZA = pytz.timezone("Asia/Gaza")
+
+
+def _ts(*args) -> float:
+    return GAZA.localize(datetime(*args)).timestamp()
+
+
+class CountingBackend(InMemoryTaskBackend):
+    def __init__(self):
+        super().__init__()
+        self.list_calls = 0
+        self.range_calls = 0
+
+    def list(self, user_id, status="all"):
+        self.list_calls += 1
+        return super().list(user_id, status)
+
+    def list_due_range(self, user_id, status, start, end):
+        self.range_calls += 1
+        return super().list_due_range(user_id, status, start, end)
+
+
+def test_due_window_scopes():
+    now = _ts(2025, 1, 15, 10, 30)  # Wednesday
+    assert due_window("all", "Asia/Gaza", now) is None
+    assert due_window("today", "Asia/Gaza", now) == (_ts(2025, 1, 15), _ts(2025, 1, 16))
+    # weeks start on Saturday
+    assert due_window("week", "Asia/Gaza", now) == (_ts(2025, 1, 11), _ts(2025, 1, 18))
+    assert due_window("overdue", "Asia/Gaza", now) == (float("-inf"), now)
+    assert due_window("upcoming:3", "Asia/Gaza", now) == (now, now + 3 * 86400)
+    assert due_window("upcoming", "Bad/Zone", now) == (now, now + 7 * 86400)
+
+
+def test_scoped_list_uses_range_query_then_snapshot():
+    backend = CountingBackend()
+    store = TaskStore(backend)
+    now = datetime.now(pytz.UTC).timestamp()
+    late = store.create_task("u1", "متأخرة", due_at=int(now - 3600))
+    soon = store.create_task("u1", "قريبة", due_at=int(now + 3600))
+    store.create_task("u1", "بعيدة", due_at=int(now + 30 * 86400))
+    store.create_task("u1", "بدون موعد")
+
+    assert [t.id for t in store.list_tasks("u1", scope="overdue")] == [late.id]
+    assert [t.id for t in store.list_tasks("u1", scope="upcoming:2")] == [soon.id]
+    assert (backend.list_calls, backend.range_calls) == (0, 2)
+
+    # once the snapshot is cached, scoped lists are answered from it
+    store.list_tasks("u1", scope="all")
+    assert [t.id for t in store.list_tasks("u1", scope="upcoming:2")] == [soon.id]
+    assert (backend.list_calls, backend.range_calls) == (1, 2)
+
+
+def test_detect_list_scope():
+    assert _detect_list_scope("شو مهامي اليوم") == ("todo", "today")
+    assert _detect_list_scope("مهام هالأسبوع") == ("todo", "week")
+    assert _detect_list_scope("المهام المتأخرة") == ("todo", "overdue")
+    assert _detect_list_scope("شو عندي خلال ٣ أيام") == ("todo", "upcoming:3")
+    assert _detect_list_scope("المهام الجاية") == ("todo", "upcoming")
+    assert _detect_list_scope("اعرض الكل") == ("all", "all")
@@ -1,3 +1,4 @@
+from app.domain.task_backends import InMemoryTaskBackend
 from app.domain.tasks import TaskStore
 
 def test_search_tasks_returns_matches():
@@ -10,3 +11,84 @@ def test_search_tasks_returns_matches():
     res = store.search_tasks(user, "اجتماع")
     assert len(res) == 2
     assert all("اجتماع" in t.title for t in res)
+
+
+class CountingBackend(InMemoryTaskBackend):
+    def __init__(self):
+        super().__init__()
+        self.list_calls = 0
+
+    def list(self, user_id, status="all"):
+        self.list_calls += 1
+        return super().list(user_id, status)
+
+
+def test_search_tasks_uses_index_after_first_query():
+    backend = CountingBackend()
+    store = TaskStore(backend)
+    store.create_task("u1", "اجتماع الفريق", None)
+
+    assert [t.title for t in store.search_tasks("u1", "اجتماع")] == ["اجتماع الفريق"]
+    assert backend.list_calls == 1
+
+    # writes are applied to the index incrementally
+    t2 = store.create_task("u1", "اجتماع العميل", None)
+    store.search_tasks("u1", "اجتماع")
+    store.search_tasks("u1", "العميل")
+    assert backend.list_calls == 1
+    assert [t.id for t in store.search_tasks("u1", "العميل")] == [t2.id]
+
+    store.update_task("u1", t2.id, title="مكالمة العميل")
+    assert [t.title for t in store.search_tasks("u1", "اجتماع")] == ["اجتماع الفريق"]
+    assert [t.title for t in store.search_tasks("u1", "مكالمة")] == ["مكالمة العميل"]
+
+    store.update_task("u1", t2.id, status="done")
+    assert store.search_tasks("u1", "مكالمة") == []
+
+    store.delete_task("u1", t2.id)
+    assert store.search_tasks("u1", "العميل") == []
+    assert backend.list_calls == 1
+
+
+def test_search_tasks_substring_and_normalization():
+    store = TaskStore(InMemoryTaskBackend())
+    store.create_task("u1", "شراء الحليب", None)
+    store.create_task("u1", "مراجعة إيميلات", None)
+
+    assert [t.title for t in store.search_tasks("u1", "حليب")] == ["شراء الحليب"]
+    assert [t.title for t in store.search_tasks("u1", "شراء الح")] == ["شراء الحليب"]
+    # hamza-insensitive: "ايميلات" matches "إيميلات"
+    assert [t.title for t in store.search_tasks("u1", "ايميل")] == ["مراجعة إيميلات"]
+    assert store.search_tasks("u1", "الحليب شراء") == []
+
+
+def test_trigram_index_top_k_and_status_filter(monkeypatch):
+    from app.domain import task_index
+
+    idx = task_index.TrigramIndex()
+    idx.add("a", "اجتماع الفريق", "todo")
+    idx.add("b", "اجتماع العميل", "done")
+    idx.add("c", "شراء الحليب", "todo")
+
+    top = idx.top_k("اجتماع", 5)
+    assert {tid for tid, _ in top} == {"a", "b"}
+    assert [tid for tid, _ in idx.top_k("اجتماع", 5, status="todo")] == ["a"]
+    assert [tid for tid, _ in idx.top_k("الحليب", 1)] == ["c"]
+
+    # pure-python fallback scores the same
+    monkeypatch.setattr(task_index, "np", None)
+    assert idx.top_k("اجتماع", 5) == top
+
+
+def test_trigram_index_remove_and_compact():
+    from app.domain.task_index import TrigramIndex
+
+    idx = TrigramIndex()
+    for i in range(200):
+        idx.add(f"t{i}", f"مهمة رقم {i}", "todo")
+    for i in range(150):
+        idx.remove(f"t{i}")
+    assert len(idx) == 50
+    ids = {tid for tid, _ in idx.top_k("مهمة رقم 199", 200)}
+    assert ids == {f"t{i}" for i in range(150, 200)}
+    assert idx.top_k("مهمة رقم 199", 1)[0][0] == "t199"
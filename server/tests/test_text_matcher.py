@@ -0,0 +1,46 @@
+import random
+
+from app.utils.text_matcher import candidate_score, edit_distance, is_relevant, similarity, tokenize
+
+
+def _dp_distance(a, b):
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return prev[-1]
+
+
+def test_bit_parallel_edit_distance_matches_dp():
+    rng = random.Random(0)
+    for _ in range(500):
+        a = "".join(rng.choice("abدة") for _ in range(rng.randint(0, 90)))
+        b = "".join(rng.choice("abدة") for _ in range(rng.randint(0, 90)))
+        assert edit_distance(a, b) == _dp_distance(a, b)
+
+
+def test_tokenize_normalizes_and_strips_article():
+    assert tokenize("اشتري الحليب") == ("اشتري", "حليب")
+    assert tokenize("مُراجعة إيميلات") == ("مراجعه", "ايميلات")
+    assert tokenize("مهمة") == ()
+
+
+def test_is_relevant_overlap_and_similarity():
+    ok, overlap, sim = is_relevant("حليب", "اشتري حليب")
+    assert ok and overlap == 1 and sim == 1.0
+
+    ok, overlap, sim = is_relevant("فاتوره", "دفع فاتورة الكهرباء")
+    assert ok and overlap == 1
+
+    ok, overlap, sim = is_relevant("اجتمع", "اجتماع الفريق", min_overlap=2)
+    assert ok and overlap == 0 and sim >= 0.65
+
+    ok, overlap, _ = is_relevant("دكتور", "موعد الطبيب")
+    assert not ok and overlap == 0
+
+
+def test_candidate_score_ranks_better_match_higher():
+    assert candidate_score("اجتماع الفريق", "اجتماع الفريق") > candidate_score("اجتماع الفريق", "اجتماع العميل")
+    assert similarity("", "") == 1.0